@@ -0,0 +1,5 @@
+"""
+Benchmarks of the parser, run from the repository root as modules, e.g.
+
+    python -m benchmarks.layout_profiles testcases
+"""
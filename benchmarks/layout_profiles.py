@@ -0,0 +1,88 @@
+"""
+Measures every layout profile on a sample corpus: the time spent per page
+and the fields whose values differ from the results of the `accurate`
+profile.
+
+    python -m benchmarks.layout_profiles <dir|glob|manifest> [repeat]
+"""
+import sys
+import time
+
+from pdf_parser import PdfParser, PdfParserProvider, LAYOUT_PROFILES, \
+    PAGE_RESULT_TABLES, collect_pdf_files
+
+def result_fields(results):
+    """
+    Flattens the results of a document into a dictionary of
+    (table, record number, field) to value
+    """
+    fields = {}
+    for field, value in results['company_record'].iteritems():
+        fields[('company_record', 0, field)] = value
+    for table in PAGE_RESULT_TABLES:
+        for index, record in enumerate(results[table]):
+            for field, value in record.items():
+                fields[(table, index, field)] = value
+    return fields
+
+def run_profile(provider, paths, profile, repeat):
+    """
+    Parses every document `repeat` times with `profile`, returns the number
+    of pages parsed, the best total time and the fields of every document
+    """
+    best = None
+    for _ in range(repeat):
+        pages = 0
+        fields = []
+        start = time.time()
+        for path in paths:
+            parser_obj = PdfParser({"input_pdf_file": path})
+            provider.load_pdf_file(parser_obj, layout_profile=profile)
+            pages += len(parser_obj.parsed_output_text)
+            fields.append(result_fields(parser_obj.get_results()))
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return pages, best, fields
+
+def diff_fields(expected, actual):
+    """
+    Returns the number of fields compared and the fields which differ
+    """
+    differing = []
+    for key in sorted(set(expected) | set(actual)):
+        if expected.get(key) != actual.get(key):
+            differing.append(key)
+    return len(set(expected) | set(actual)), differing
+
+def main(argv):
+    if not argv:
+        print "Usage: python -m benchmarks.layout_profiles <dir|glob|manifest> [repeat]"
+        return 2
+    paths = collect_pdf_files(argv[0])
+    repeat = int(argv[1]) if len(argv) > 1 else 3
+    provider = PdfParserProvider()
+
+    runs = {}
+    for profile in sorted(LAYOUT_PROFILES):
+        runs[profile] = run_profile(provider, paths, profile, repeat)
+
+    _, accurate_time, accurate_fields = runs["accurate"]
+    print "\n%-10s %6s %12s %8s %16s" % ("profile", "pages", "ms/page", "speedup", "differing fields")
+    for profile in sorted(LAYOUT_PROFILES):
+        pages, elapsed, fields = runs[profile]
+        compared = 0
+        differing = []
+        for path, expected, actual in zip(paths, accurate_fields, fields):
+            count, keys = diff_fields(expected, actual)
+            compared += count
+            differing.extend((path,) + key for key in keys)
+        print "%-10s %6d %12.2f %7.2fx %9d / %-6d" % \
+            (profile, pages, 1000.0 * elapsed / max(pages, 1),
+             accurate_time / elapsed if elapsed else 0.0, len(differing), compared)
+        for key in differing:
+            print "    %s: %s[%d].%s" % key
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,82 @@
+"""
+Insert throughput of SqliteSink. A corpus is parsed once, its results are
+then loaded `--documents` times under distinct registration numbers into a
+fresh database for every batch size, and loaded a second time to measure
+the replacement of companies already in the database.
+
+    python -m benchmarks.sqlite_sink [--corpus <dir|glob|manifest>]
+                                     [--documents N] [--batch 1,10,100,1000]
+
+On the synthetic corpus (about 30 rows per company) one document per
+transaction loads about 1,200 companies/s (37,000 rows/s), 10 to 1000
+documents per transaction 2,000 to 2,500 companies/s (60,000 to 75,000
+rows/s). Replacing companies already loaded is 10 to 25% slower.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from pdf_parser import PdfParser, PdfParserProvider, SqliteSink, PAGE_RESULT_TABLES, \
+    collect_pdf_files
+from benchmarks import synthetic
+
+def parse_corpus(paths):
+    provider = PdfParserProvider()
+    results = []
+    for path in paths:
+        parser_obj = PdfParser({"input_pdf_file": path, "page_processes": 1})
+        provider.load_pdf_file(parser_obj)
+        results.append(parser_obj.get_results())
+    return results
+
+def load(path, results, documents, batch_documents):
+    """
+    Loads `documents` companies cycling through `results`, returns the
+    seconds it took and the rows written
+    """
+    rows = 0
+    start = time.time()
+    with SqliteSink(path, batch_documents=batch_documents) as sink:
+        for index in xrange(documents):
+            document_results = dict(results[index % len(results)])
+            company_record = dict(document_results["company_record"])
+            company_record["registration_no"] = "B%08d" % index
+            document_results["company_record"] = company_record
+            sink.write_results(document_results, "document%d.pdf" % index)
+            rows += 1 + sum(len(document_results[table]) for table in PAGE_RESULT_TABLES)
+    return time.time() - start, rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Insert throughput of SqliteSink")
+    parser.add_argument("--corpus", help="PDFs to parse, a synthetic corpus by default")
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--batch", default="1,10,100,1000",
+                        help="documents per transaction, comma separated")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="sqlite_sink")
+    try:
+        if args.corpus:
+            paths = collect_pdf_files(args.corpus)
+        else:
+            paths = synthetic.generate_corpus(os.path.join(work_dir, "corpus"))
+        results = parse_corpus(paths)
+
+        print "\n%8s %10s %12s %10s %12s %10s" % \
+            ("batch", "insert s", "companies/s", "rows/s", "replace s", "companies/s")
+        for batch_documents in [int(batch) for batch in args.batch.split(",")]:
+            path = os.path.join(work_dir, "batch%d.db" % batch_documents)
+            seconds, rows = load(path, results, args.documents, batch_documents)
+            replace_seconds, _ = load(path, results, args.documents, batch_documents)
+            print "%8d %10.3f %12.0f %10.0f %12.3f %12.0f" % \
+                (batch_documents, seconds, args.documents / seconds, rows / seconds,
+                 replace_seconds, args.documents / replace_seconds)
+    finally:
+        shutil.rmtree(work_dir)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Per-stage timings of the parser: load_pdf_file, _get_text and every
+populate_* extractor are timed on each call while a corpus is parsed. The
+corpus is generated by benchmarks.synthetic unless one is given. Results
+are saved as JSON and can be compared with the results of an earlier run.
+
+    python -m benchmarks.stages [--corpus <dir|glob|manifest>] [--repeat N]
+                                [--output results.json] [--baseline old.json]
+"""
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from pdf_parser import PdfParser, PdfParserProvider, SECTION_EXTRACTORS, \
+    collect_pdf_files, file_sha256
+from benchmarks import synthetic
+
+STAGES = ["load_pdf_file", "_get_text"] + [extractor for _, extractor in SECTION_EXTRACTORS]
+
+class StageTimer:
+
+    """
+    Replaces the stage methods of a PdfParserProvider with wrappers
+    recording the duration of every call
+    """
+    def __init__(self, provider, stages=STAGES):
+        self.times = dict((stage, []) for stage in stages)
+        for stage in stages:
+            setattr(provider, stage, self._wrap(getattr(provider, stage), self.times[stage]))
+
+    def _wrap(self, method, times):
+        def timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                times.append(time.time() - start)
+        return timed
+
+    def summary(self):
+        stages = {}
+        for stage, times in self.times.iteritems():
+            times = sorted(times)
+            stages[stage] = {"calls": len(times),
+                             "total_s": sum(times),
+                             "mean_ms": 1000.0 * sum(times) / len(times) if times else 0.0,
+                             "median_ms": 1000.0 * times[len(times) // 2] if times else 0.0,
+                             "min_ms": 1000.0 * times[0] if times else 0.0,
+                             "max_ms": 1000.0 * times[-1] if times else 0.0}
+        return stages
+
+def run(paths, conf, repeat):
+    """
+    Parses every document of `paths` `repeat` times, returns the stage
+    timings and the page count of every document
+    """
+    provider = PdfParserProvider()
+    timer = StageTimer(provider)
+    documents = []
+    for iteration in range(repeat):
+        for path in paths:
+            parser_conf = dict(conf)
+            parser_conf["input_pdf_file"] = path
+            parser_obj = PdfParser(parser_conf)
+            provider.load_pdf_file(parser_obj)
+            if not iteration:
+                documents.append({"path": path, "sha256": file_sha256(path),
+                                  "pages": len(parser_obj.parsed_output_text)})
+    return timer.summary(), documents
+
+def compare(results, baseline, threshold):
+    """
+    Prints the mean time of every stage against the baseline, returns the
+    stages which got slower by more than `threshold`
+    """
+    regressions = []
+    print "\n%-40s %12s %12s %8s" % ("stage", "baseline ms", "ms", "ratio")
+    for stage in STAGES:
+        current = results["stages"].get(stage)
+        previous = baseline.get("stages", {}).get(stage)
+        if not current or not previous or not previous["mean_ms"]:
+            continue
+        ratio = current["mean_ms"] / previous["mean_ms"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(stage)
+            flag = "  REGRESSION"
+        print "%-40s %12.3f %12.3f %7.2fx%s" % \
+            (stage, previous["mean_ms"], current["mean_ms"], ratio, flag)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage benchmark of pdf_parser")
+    parser.add_argument("--corpus", help="PDFs to parse, a synthetic corpus by default")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--conf", default="{}",
+                        help="PdfParser conf as JSON, pages are always parsed serially")
+    parser.add_argument("--output", help="file the results are saved to as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown of a stage reported as a regression")
+    args = parser.parse_args(argv)
+
+    conf = json.loads(args.conf)
+    # page workers run in other processes where the stages are not timed
+    conf["page_processes"] = 1
+    corpus_dir = None
+    if args.corpus:
+        paths = collect_pdf_files(args.corpus)
+    else:
+        corpus_dir = tempfile.mkdtemp(prefix="bizfiles")
+        paths = synthetic.generate_corpus(corpus_dir)
+    try:
+        stages, documents = run(paths, conf, args.repeat)
+    finally:
+        if corpus_dir:
+            shutil.rmtree(corpus_dir)
+
+    results = {"created": datetime.now().isoformat(),
+               "python": platform.python_version(),
+               "platform": platform.platform(),
+               "conf": conf,
+               "repeat": args.repeat,
+               "corpus": args.corpus or "synthetic",
+               "documents": documents,
+               "stages": stages}
+
+    print "\n%-40s %6s %10s %10s %10s" % ("stage", "calls", "total s", "mean ms", "median ms")
+    for stage in STAGES:
+        summary = stages[stage]
+        print "%-40s %6d %10.3f %10.3f %10.3f" % \
+            (stage, summary["calls"], summary["total_s"], summary["mean_ms"],
+             summary["median_ms"])
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
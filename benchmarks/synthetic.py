@@ -0,0 +1,384 @@
+"""
+Generator of synthetic bizfile-style PDFs. The documents follow the layout
+the extractors of pdf_parser expect: a receipt header, the company record,
+capital, charges, shareholders, group share and officers tables, the
+auditors and the disclaimer closing every page. Tables running over the
+end of a page continue on the next one under a repeated heading.
+
+    python -m benchmarks.synthetic <output dir> [options]
+"""
+import argparse
+import os
+import random
+
+from pdfminer.fontmetrics import FONT_METRICS
+
+# Helvetica 10pt, distance between the y1 pdfminer reports and the baseline
+ASCENT = 7.93
+LINE_HEIGHT = 11
+DISCLAIMER = "WHILST EVERY ENDEAVOR IS MADE TO ENSURE THAT INFORMATION PROVIDED IS " \
+             "UPDATED AND CORRECT. THE AUTHORITY"
+PAGE_TOP = 800.0
+# Characters of the font with to_unicode, see write_pdf
+FIRST_CHAR = 32
+LAST_CHAR = 126
+PAGE_BOTTOM = 60.0
+
+# Documents of the default corpus
+DEFAULT_SPECS = [
+    dict(seed=1),
+    dict(seed=2, charges=12, shareholders=9, officers=9, groups=2),
+    dict(seed=3, charges=0, shareholders=1, officers=1, groups=0, split=False),
+    dict(seed=4, charges=30, shareholders=25, officers=25, groups=3, group_members=3),
+    dict(seed=5, capital=0, paidup=0, shareholders=0, groups=0),
+    dict(seed=6, charges=5, shareholders=6, officers=6, extra_pages=10),
+]
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _to_unicode_cmap(code_offset=0):
+    """
+    ToUnicode CMap stream of the printable ASCII characters, each shown by
+    the code of the character less `code_offset`
+    """
+    cmap = ["/CIDInit /ProcSet findresource begin", "12 dict begin", "begincmap",
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+            "/CMapName /Adobe-Identity-UCS def", "/CMapType 2 def",
+            "1 begincodespacerange", "<00> <FF>", "endcodespacerange",
+            "%d beginbfchar" % (LAST_CHAR - FIRST_CHAR + 1)]
+    cmap.extend("<%02X> <%04X>" % (code - code_offset, code)
+                for code in range(FIRST_CHAR, LAST_CHAR + 1))
+    cmap.extend(["endbfchar", "endcmap", "CMapName currentdict /CMap defineresource pop",
+                 "end", "end"])
+    stream = "\n".join(cmap)
+    return "<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+
+def write_pdf(pages, path, to_unicode=False, code_offset=0):
+    """
+    Writes `pages`, lists of (x, y1, text) boxes, as a PDF with one
+    Helvetica content stream per page. `text` may span several lines.
+    With `to_unicode` the font also has the Widths and the ToUnicode CMap
+    of the printable ASCII characters, like the subsets of fonts embedded
+    by PDF producers, which pdfminer parses for every document; the text
+    and its layout are the same. A `code_offset` shows every character by
+    its code less the offset, as subset fonts number their glyphs, only
+    the ToUnicode CMap tells the text.
+    """
+    to_unicode = to_unicode or code_offset != 0
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+               "/Encoding /WinAnsiEncoding >>"]
+    if to_unicode:
+        widths = FONT_METRICS["Helvetica"][1]
+        objects[2] = "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica " \
+                     "/Encoding /WinAnsiEncoding /FirstChar %d /LastChar %d /Widths [%s] " \
+                     "/ToUnicode 4 0 R >>" % \
+                     (FIRST_CHAR - code_offset, LAST_CHAR - code_offset,
+                      " ".join(str(widths[unichr(code)]) for code
+                               in range(FIRST_CHAR, LAST_CHAR + 1)))
+        objects.append(_to_unicode_cmap(code_offset))
+    kids = []
+    for boxes in pages:
+        operators = []
+        for x, y1, text in boxes:
+            for line_num, line in enumerate(text.split("\n")):
+                if code_offset:
+                    line = "<%s>" % "".join("%02X" % (ord(c) - code_offset) for c in line)
+                else:
+                    line = "(%s)" % _escape(line)
+                operators.append("BT /F1 10 Tf 1 0 0 1 %.2f %.2f Tm %s Tj ET" % \
+                    (x, y1 - ASCENT - LINE_HEIGHT * line_num, line))
+        stream = "\n".join(operators)
+        objects.append("<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       "/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % \
+                       len(objects))
+        kids.append(len(objects))
+    objects[1] = "<< /Type /Pages /Kids [%s] /Count %d >>" % \
+        (" ".join("%d 0 R" % kid for kid in kids), len(kids))
+
+    output = ["%PDF-1.4\n"]
+    size = len(output[0])
+    offsets = []
+    for number, body in enumerate(objects):
+        offsets.append(size)
+        chunk = "%d 0 obj\n%s\nendobj\n" % (number + 1, body)
+        output.append(chunk)
+        size += len(chunk)
+    output.append("xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    output.extend("%010d 00000 n \n" % offset for offset in offsets)
+    output.append("trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % \
+                  (len(objects) + 1, size))
+    with open(path, 'wb') as pdf_file:
+        pdf_file.write("".join(output))
+
+class Document:
+
+    """
+    Pages of a document being generated, boxes are placed top down
+    """
+    def __init__(self):
+        self.pages = [[]]
+        self.y = PAGE_TOP
+
+    def new_page(self):
+        self.pages[-1].append((40, 30.0, DISCLAIMER))
+        self.pages.append([])
+        self.y = PAGE_TOP
+
+    def need(self, height):
+        if self.y - height < PAGE_BOTTOM:
+            self.new_page()
+
+    def put(self, x, y, text):
+        self.pages[-1].append((x, round(y, 2), text))
+
+    def close(self):
+        self.pages[-1].append((40, 30.0, DISCLAIMER))
+        return self.pages
+
+def _date(rng):
+    return "%02d/%02d/%04d" % (rng.randint(1, 28), rng.randint(1, 12), rng.randint(1990, 2017))
+
+def _company_record(doc, rng):
+    y = doc.y
+    doc.put(40, y, "RECEIPT NO.")
+    doc.put(200, y + 1, "RCP%06d" % rng.randint(0, 999999))
+    doc.put(400, y, "Date: %s" % _date(rng))
+    y -= 30
+    for label, value in [("Registration No.", "2018%05dA" % rng.randint(0, 99999)),
+                         ("Company Name.", "ACME %d PTE. LTD." % rng.randint(1, 999)),
+                         ("Former Name if any", ""),
+                         ("Incorporation Date.", _date(rng)),
+                         ("Company Type", "LOCAL COMPANY"),
+                         ("Status", "Live Company"),
+                         ("Status Date", _date(rng))]:
+        doc.put(40, y, label)
+        doc.put(180, y, ":")
+        if value:
+            doc.put(200, y, value)
+        y -= 20
+    doc.put(40, y, "Activities (I)")
+    doc.put(200, y - 4, "ACTIVITY ONE %d" % rng.randint(0, 99))
+    doc.put(40, y - 24, "Description")
+    doc.put(200, y - 28, "DESC ONE")
+    y -= 54
+    doc.put(40, y, "Activities (II)")
+    doc.put(200, y - 4, "ACTIVITY TWO")
+    doc.put(40, y - 30, "Description")
+    doc.put(200, y - 34, "DESC TWO")
+    y -= 60
+    doc.put(40, y, "Registered Office Address")
+    doc.put(200, y - 4, "%d MAIN STREET SINGAPORE" % rng.randint(1, 99))
+    doc.put(40, y - 30, "Date of Address")
+    doc.put(200, y - 34, _date(rng))
+    y -= 60
+    for label in ["Date of Last AGM", "Date of Last AR", "Date of A/C Laid at Last AGM",
+                  "Date of Lodgment of AR, A/C"]:
+        doc.put(40, y, label)
+        doc.put(260, y, ":")
+        doc.put(300, y, _date(rng))
+        y -= 20
+    doc.y = y - 20
+
+def _capital(doc, rng, heading, offset, rows, share_types):
+    doc.need(offset + 26 * rows)
+    y = doc.y
+    doc.put(40, y, heading)
+    y -= offset
+    for row in range(rows):
+        doc.put(40, y, str(rng.randint(1, 10 ** 6)))
+        doc.put(200, y, "SINGAPORE, DOLLARS")
+        doc.put(350, y, share_types[row % len(share_types)])
+        y -= 26
+    doc.y = y - 30
+
+def _charges(doc, rng, charges):
+    doc.need(28.34 + 24)
+    y = doc.y
+    doc.put(40, y, "Charge No.")
+    doc.put(150, y, "Date Registered")
+    y -= 28.34
+    for _ in range(charges):
+        if y < PAGE_BOTTOM:
+            doc.new_page()
+            y = doc.y
+            doc.put(40, y, "Charge No.")
+            doc.put(150, y, "Date Registered")
+            y -= 28.34
+        doc.put(40, y, "C2018%05d" % rng.randint(0, 99999))
+        doc.put(150, y, _date(rng))
+        doc.put(280, y, "ALL MONIES")
+        doc.put(400, y, "BANK %d" % rng.randint(0, 50))
+        y -= 24
+    doc.y = y - 40
+
+def _shareholders(doc, rng, shareholders, split):
+    doc.need(97.34 + 99)
+    y = doc.y
+    doc.put(40, y, "Shareholder(s)")
+    y -= 97.34
+    number = 0
+    while number < shareholders:
+        if y - 75 < PAGE_BOTTOM:
+            doc.new_page()
+            y = doc.y
+            doc.put(40, y, "Shareholder(s)")
+            y -= 97.34
+        doc.put(40, y, str(number + 1))
+        doc.put(70, y, "HOLDER %d" % number)
+        doc.put(200, y, "S%07dZ" % rng.randint(0, 9999999))
+        doc.put(300, y, "SINGAPORE CITIZEN")
+        doc.put(420, y, "ACRA")
+        if split and number == shareholders // 2 and number > 0:
+            # the address and the shares continue on the next page
+            doc.new_page()
+            y = doc.y
+            doc.put(40, y, "Shareholder(s)")
+            y -= 97.34
+            doc.put(40, y, "%d HOLDER ROAD" % number)
+            doc.put(40, y - 24, str(rng.randint(1, 1000)))
+            doc.put(200, y - 24, "SINGAPORE, DOLLARS")
+            y -= 24 + 70
+            number += 1
+            continue
+        doc.put(40, y - 27, "%d HOLDER ROAD" % number)
+        doc.put(40, y - 48, "Ordinary(Number)")
+        doc.put(200, y - 48, "Currency")
+        doc.put(40, y - 75, str(rng.randint(1, 1000)))
+        doc.put(200, y - 75, "SINGAPORE, DOLLARS")
+        y -= 99
+        number += 1
+    doc.y = y - 40
+
+def _group_shares(doc, rng, group, members):
+    doc.need(23 + 27 + 21 + 108 * members)
+    y = doc.y
+    letter = "ABCDEFGHIJ"[group % 10]
+    doc.put(40, y, "Group Share : %s (Shares co-owned by shareholders listed under "
+                   "this group)" % letter)
+    y -= 23
+    doc.put(40, y, "Ordinary(Number)")
+    doc.put(200, y, "Currency")
+    y -= 27
+    doc.put(40, y, str(rng.randint(1, 1000)))
+    doc.put(200, y, "SINGAPORE, DOLLARS")
+    y -= 21
+    for member in range(members):
+        doc.put(40, y, str(member + 1))
+        doc.put(70, y, "MEMBER %s%d" % (letter, member))
+        doc.put(200, y, "G%07dX" % rng.randint(0, 9999999))
+        doc.put(300, y, "MALAYSIAN")
+        doc.put(420, y, "ACRA")
+        doc.put(40, y - 27, "%d GROUP LANE" % member)
+        y -= 27 + 25
+    doc.y = y - 40
+
+def _officers(doc, rng, officers, split):
+    doc.need(98 + 61)
+    y = doc.y
+    doc.put(40, y, "Officers/Authorised Representative(s)")
+    y -= 98
+    number = 0
+    while number < officers:
+        if y - 35 < PAGE_BOTTOM:
+            doc.new_page()
+            y = doc.y
+            doc.put(40, y, "Officers/Authorised Representative(s)")
+            y -= 98
+        doc.put(40, y, "OFFICER %d" % number)
+        doc.put(150, y, "S%07dB" % rng.randint(0, 9999999))
+        doc.put(250, y, "SINGAPORE CITIZEN")
+        doc.put(380, y, "ACRA")
+        doc.put(480, y, _date(rng))
+        if split and number == officers // 2 and number > 0:
+            # the address and the position continue on the next page
+            doc.new_page()
+            y = doc.y
+            doc.put(40, y, "Officers/Authorised Representative(s)")
+            y -= 98
+            doc.put(40, y, "%d OFFICER AVENUE" % number)
+            doc.put(350, y, "Director")
+            y -= 49
+            number += 1
+            continue
+        doc.put(40, y - 35, "%d OFFICER AVENUE" % number)
+        doc.put(350, y - 35, "Director" if number % 2 else "Secretary")
+        y -= 35 + 49
+        number += 1
+    doc.y = y - 40
+
+def build_pages(seed=0, charges=3, capital=2, paidup=1, shareholders=4, groups=1,
+                group_members=2, officers=4, extra_pages=0, split=True):
+    """
+    Returns the pages of a synthetic bizfile. `split` makes the shareholders
+    and officers tables break in the middle of a row, `extra_pages` appends
+    pages of notes without any table.
+    """
+    rng = random.Random(seed)
+    doc = Document()
+    _company_record(doc, rng)
+    if capital:
+        _capital(doc, rng, "Capital", 75.37, capital, ["ORDINARY", "PREFERENCE"])
+    if paidup:
+        _capital(doc, rng, "Paid-Up Capital", 50.37, paidup, ["ORDINARY"])
+    if charges:
+        _charges(doc, rng, charges)
+    if shareholders:
+        _shareholders(doc, rng, shareholders, split)
+    for group in range(groups):
+        _group_shares(doc, rng, group, group_members)
+    if officers:
+        _officers(doc, rng, officers, split)
+    doc.need(60)
+    doc.put(40, doc.y, "Audit Firms")
+    doc.put(40, doc.y - 51.34, "AUDITORS %d LLP" % rng.randint(0, 9))
+    for _ in range(extra_pages):
+        doc.new_page()
+        for line in range(60):
+            doc.put(40, PAGE_TOP - 12 * line,
+                    "Note %d of the appendix to this filing, no tables follow" % line)
+    return doc.close()
+
+def generate_corpus(directory, specs=None, to_unicode=False):
+    """
+    Writes one document per spec, keyword arguments of build_pages, into
+    `directory` and returns their paths, see write_pdf for `to_unicode`
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    paths = []
+    for number, spec in enumerate(specs or DEFAULT_SPECS):
+        path = os.path.join(directory, "synthetic%03d.pdf" % number)
+        write_pdf(build_pages(**spec), path, to_unicode)
+        paths.append(path)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generates synthetic bizfile PDFs")
+    parser.add_argument("directory")
+    parser.add_argument("--documents", type=int, default=0,
+                        help="number of documents to generate with the counts below "
+                             "instead of the default corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--to-unicode", action="store_true",
+                        help="give the font Widths and a ToUnicode CMap")
+    for option, default in [("charges", 3), ("capital", 2), ("paidup", 1),
+                            ("shareholders", 4), ("groups", 1), ("group-members", 2),
+                            ("officers", 4), ("extra-pages", 0)]:
+        parser.add_argument("--" + option, type=int, default=default)
+    args = parser.parse_args(argv)
+
+    specs = None
+    if args.documents:
+        specs = [dict(seed=args.seed + number, charges=args.charges, capital=args.capital,
+                      paidup=args.paidup, shareholders=args.shareholders,
+                      groups=args.groups, group_members=args.group_members,
+                      officers=args.officers, extra_pages=args.extra_pages)
+                 for number in range(args.documents)]
+    for path in generate_corpus(args.directory, specs, args.to_unicode):
+        print path
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Validates the text devices against PDFPageAggregator and measures them:
+every page is laid out by each device with the same layout profile, the
+text blocks of every page are compared with the ones of the aggregator
+and so are the parsed fields.
+
+    python -m benchmarks.text_device <dir|glob|manifest> [profile] [repeat]
+"""
+import sys
+import time
+
+from pdfminer.pdfpage import PDFPage
+
+from pdf_parser import PdfParser, PdfParserProvider, TEXT_DEVICES, collect_pdf_files
+from benchmarks.layout_profiles import result_fields, diff_fields
+
+def layout_pages(provider, path, profile, text_device):
+    """
+    Returns the text blocks of every page of `path` laid out by
+    `text_device` and the time spent laying them out
+    """
+    parser_obj = PdfParser({"input_pdf_file": path, "layout_profile": profile})
+    pages = []
+    elapsed = 0.0
+    with open(path, 'rb') as file_obj:
+        document_obj = provider._open_document(file_obj)
+        device_obj, interpreter_obj = provider._create_interpreter(
+            provider._get_laparams(parser_obj), text_device)
+        for page_num, page in enumerate(PDFPage.create_pages(document_obj)):
+            parser_obj.page_number = page_num
+            start = time.time()
+            interpreter_obj.process_page(page)
+            page_text = provider._get_text_blocks(parser_obj, device_obj)
+            elapsed += time.time() - start
+            pages.append(page_text)
+    return pages, elapsed
+
+def parse_fields(provider, path, profile, text_device):
+    parser_obj = PdfParser({"input_pdf_file": path, "layout_profile": profile,
+                            "text_device": text_device})
+    provider.load_pdf_file(parser_obj)
+    return result_fields(parser_obj.get_results())
+
+def main(argv):
+    if not argv:
+        print "Usage: python -m benchmarks.text_device <dir|glob|manifest> [profile] [repeat]"
+        return 2
+    paths = collect_pdf_files(argv[0])
+    profile = argv[1] if len(argv) > 1 else "accurate"
+    repeat = int(argv[2]) if len(argv) > 2 else 3
+    provider = PdfParserProvider()
+
+    texts = {}
+    times = {}
+    fields = {}
+    for text_device in sorted(TEXT_DEVICES):
+        for path in paths:
+            best = None
+            for _ in range(repeat):
+                pages, elapsed = layout_pages(provider, path, profile, text_device)
+                best = elapsed if best is None else min(best, elapsed)
+            texts[(text_device, path)] = pages
+            times[text_device] = times.get(text_device, 0.0) + best
+            fields[(text_device, path)] = parse_fields(provider, path, profile, text_device)
+
+    page_count = sum(len(texts[("aggregator", path)]) for path in paths)
+    print "\n%-11s %6s %10s %8s %15s %16s" % \
+        ("device", "pages", "ms/page", "speedup", "differing pages", "differing fields")
+    for text_device in sorted(TEXT_DEVICES):
+        differing_pages = []
+        differing_fields = []
+        compared = 0
+        for path in paths:
+            expected_pages = texts[("aggregator", path)]
+            actual_pages = texts[(text_device, path)]
+            for page_num, (expected, actual) in enumerate(zip(expected_pages, actual_pages)):
+                # the order of the blocks is not compared, rows are keyed by y
+                if sorted(expected) != sorted(actual):
+                    differing_pages.append((path, page_num, sorted(set(expected) ^ set(actual))))
+            count, keys = diff_fields(fields[("aggregator", path)], fields[(text_device, path)])
+            compared += count
+            differing_fields.extend((path,) + key for key in keys)
+        print "%-11s %6d %10.2f %7.2fx %15d %9d / %-6d" % \
+            (text_device, page_count, 1000.0 * times[text_device] / max(page_count, 1),
+             times["aggregator"] / times[text_device] if times[text_device] else 0.0,
+             len(differing_pages), len(differing_fields), compared)
+        for path, page_num, blocks in differing_pages:
+            print "    %s page %d: %r" % (path, page_num + 1, blocks)
+        for key in differing_fields:
+            print "    %s: %s[%d].%s" % key
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
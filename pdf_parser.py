@@ -1,26 +1,293 @@
 #!/usr/bin/env python
 #Standard imports
+from bisect import bisect_left
 from datetime import datetime
+import cPickle
+import cProfile
+import cStringIO
+import contextlib
+import copy
+import csv
+import glob
+import hashlib
+import heapq
+import json
+import logging
+import math
+import mmap
+import multiprocessing
+import os
 import re
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+import uuid
+import zlib
 
 #Imports related to pdfminer
 from pdfminer.pdfparser import PDFParser
 from pdfminer.pdfdocument import PDFDocument
 from pdfminer.pdfpage import PDFPage
-from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
-from pdfminer.pdftypes import PDFObjRef
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter, PDFContentParser
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from pdfminer.psparser import PSKeyword, PSLiteral, PSEOF, keyword_name
 from pdfminer.layout import LAParams, LTTextBoxHorizontal
 from pdfminer.converter import PDFPageAggregator
-from collections import defaultdict, namedtuple
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.utils import apply_matrix_pt
+from collections import OrderedDict, defaultdict, namedtuple
 
 # default configuration dictionary which will be initialized when
 # PdfParser objects are created
 
-DEFAULTS = {"input_pdf_file": "testcases/inputfile7.pdf"}
+DEFAULTS = {"input_pdf_file": "testcases/inputfile7.pdf",
+            # number of worker processes for batch runs, None means one
+            # per CPU
+            "batch_processes": None,
+            # yield batch results in input order instead of completion order
+            "batch_ordered": True,
+            "batch_chunksize": 1,
+            # number of worker processes parsing the pages of a single
+            # document, 1 parses the pages serially. Batch and service
+            # workers always parse pages serially, pool workers cannot
+            # start pools of their own
+            "page_processes": 1,
+            # text boxes whose y1 lies within this distance of an existing
+            # row are grouped into that row. Has to stay below 1 as company
+            # record values sit in their own rows 1 and 4 points away from
+            # their labels
+            "row_tolerance": 0.5,
+            # directory of the on-disk layout cache, None disables it
+            "layout_cache_dir": None,
+            # least recently used documents are evicted from the layout
+            # cache above this size
+            "layout_cache_max_bytes": 1 << 30,
+            # directory of the on-disk cache of whole document results, None
+            # disables it
+            "result_cache_dir": None,
+            "result_cache_max_bytes": 1 << 30,
+            # seconds after which cached results expire, None keeps them
+            # until they are evicted
+            "result_cache_ttl": None,
+            # read the text operators of every page before laying it out and
+            # skip the layout analysis of pages without any section anchor
+            # while no table is left open
+            "page_prescan": False,
+            # one of LAYOUT_PROFILES
+            "layout_profile": "accurate",
+            # pdfminer device turning pages into text blocks, one of
+            # TEXT_DEVICES
+            "text_device": "aggregator",
+            # collect DocumentMetrics for every document
+            "metrics": False,
+            # files batch runs export the metrics to: JSON lines, one per
+            # document, and a Prometheus textfile with the batch summary
+            "metrics_jsonl": None,
+            "metrics_prometheus": None,
+            # directory the cProfile dumps of the slowest documents are kept
+            # in, None disables profiling
+            "profile_dir": None,
+            # number of slowest documents whose profiles are kept
+            "profile_keep": 10,
+            # address and worker processes of the ingestion service, see
+            # pdf_service.py
+            "service_host": "127.0.0.1",
+            "service_port": 8080,
+            "service_processes": None,
+            # documents queued or being parsed above which uploads are
+            # refused with 429
+            "service_queue_depth": 32,
+            # seconds a request waits for its document to be parsed, the
+            # worker still parsing it then is killed and replaced
+            "service_timeout": 60,
+            "service_max_upload_bytes": 64 << 20,
+            # write buffer of the output sinks in bytes
+            "output_buffer_bytes": 1 << 20,
+            # records per block of the columnar output
+            "output_block_rows": 4096,
+            # documents written per transaction by the sqlite output
+            "sqlite_batch_documents": 100,
+            # level of the extractor trace, None, "info" or "debug", see
+            # Tracer
+            "trace_level": None,
+            # extractors traced, all of them when None
+            "trace_extractors": None,
+            # tables of the results to parse and company record fields to
+            # read, everything when both are None, see select_sections
+            "tables": None,
+            "fields": None,
+            # fonts kept by the provider across the documents it parses,
+            # see FontCache, 0 creates the fonts of every document afresh.
+            # Off by default, benchmarks/font_cache.py finds no gain on
+            # documents with base-14 fonts
+            "font_cache_size": 0}
 
 # dictionary of configured values
 conf = {}
+logger = logging.getLogger(__name__)
+# Logger of the extractor trace, see Tracer
+trace_logger = logging.getLogger(__name__ + ".trace")
 TextBlock= namedtuple("TextBlock", ["x", "y", "z", "text"])
+# One parsed document of a batch run. `result` is the dictionary returned by
+# PdfParser.get_results(), `error` is set instead when parsing failed.
+BatchResult = namedtuple("BatchResult", ["index", "path", "result", "error",
+                                         "cache_hit", "metrics"])
+# A record yielded by PdfParserProvider.iter_records. `table` is the name of
+# the PdfParser attribute holding records of its kind, or 'company_record'
+ParsedRecord = namedtuple("ParsedRecord", ["table", "record"])
+# One page parsed by a page worker, see PdfParserProvider._parse_page_chunk
+PageResult = namedtuple("PageResult", ["page_num", "text", "rows", "state_key",
+                                       "state", "company_fields", "records",
+                                       "skipped"])
+
+# Tables whose records are collected page by page
+PAGE_RESULT_TABLES = ("charges", "capital_details", "paidup_capital_details",
+                      "shareholders_details", "shareholder_type_details",
+                      "officers_details")
+# LAParams of the layout analysis profiles. `accurate` is what the parser
+# was written against, `fast` skips vertical text detection and the
+# analysis of text inside figures, which machine generated bizfiles do not
+# need, and `minimal` also stops inserting spaces between close characters.
+# python -m benchmarks.layout_profiles measures them against each other.
+LAYOUT_PROFILES = {"accurate": dict(detect_vertical=True, all_texts=True, line_margin=0.1),
+                   "fast": dict(line_margin=0.1),
+                   "minimal": dict(line_margin=0.1, word_margin=1.0)}
+# Version of the extraction rules, bump it whenever a change to the parser
+# changes its results so that cached results are not reused
+PARSER_VERSION = "2"
+# Tolerance of the row looked for under the anchor of a table
+ROW_PROBE_TOLERANCE = 0.05
+# Line of the rows of a table read by PdfParserProvider.walk_table. A row
+# of the page is the line when it has one of `cells` texts and, for a
+# label line, its first text contains `label`; the first text of the other
+# lines contains no label of their table. `fields` are the (column, field,
+# value_type) read into the record, the columns of a row being its texts
+# in x order and value_type one of text, int or date (see parse_date).
+# Optional lines may be missing.
+TableLine = namedtuple("TableLine", ["name", "cells", "label", "fields", "optional"])
+# Table read by PdfParserProvider.walk_table into `table` of the results.
+# Its first row is one of `header_heights` below the anchor of the table,
+# the next ones are found walking down the rows of the page from the last
+# line read, for at most `row_gap`, skipping the rows which are none of the
+# lines expected next. Records of `record_class`, created with `defaults`,
+# are read from `lines` in order. A record whose page ends before its
+# first `complete` lines are read is left in the PdfParser attribute
+# `pending` and completed from the first rows of the table on the next page.
+TableSpec = namedtuple("TableSpec", ["table", "record_class", "defaults", "header_heights",
+                                     "row_gap", "lines", "complete", "pending"])
+# Field of the company record read from the row of `label`. `offset` is
+# None when the value follows the label on its row, otherwise the value is
+# the first text of the row `offset` above (positive) or below the label.
+# `value_type` is one of
+#   text         the text as is
+#   date         a dd/mm/YYYY date, see parse_date
+#   description  text of `field` under Activities (I), of `field`_2 under
+#                Activities (II) which has no row 24 above its Description
+#   text_if_row  the text, the field is left alone when there is no such row
+CompanyRecordField = namedtuple("CompanyRecordField", ["label", "field", "offset", "value_type"])
+# Fields read by populate_company_record_table. When a row holds several
+# labels the field listed first is read.
+COMPANY_RECORD_FIELDS = (
+    CompanyRecordField('Registration No.', 'registration_no', None, 'text'),
+    CompanyRecordField('Company Name.', 'company_name', None, 'text'),
+    CompanyRecordField('Former Name if any', 'former_name', None, 'text'),
+    CompanyRecordField('Incorporation Date.', 'incorp_date', None, 'date'),
+    CompanyRecordField('Company Type', 'company_type', None, 'text'),
+    CompanyRecordField('Status', 'status', None, 'text'),
+    CompanyRecordField('Status Date', 'status_date', None, 'date'),
+    CompanyRecordField('Activities (I)', 'activities_1', -4, 'text'),
+    CompanyRecordField('Activities (II)', 'activities_2', -4, 'text'),
+    CompanyRecordField('Description', 'activites_description', -4, 'description'),
+    CompanyRecordField('Registered Office Address', 'registered_office_address', -4, 'text'),
+    CompanyRecordField('Date of Address', 'date_of_address', -4, 'date'),
+    CompanyRecordField('Date of Last AGM', 'date_of_last_agm', None, 'date'),
+    CompanyRecordField('Date of Last AR', 'date_of_last_ar', None, 'date'),
+    CompanyRecordField('Date of A/C Laid at Last AGM', 'date_of_ac_at_last', None, 'date'),
+    CompanyRecordField('Date of Lodgment of AR, A/C', 'date_of_lodgment_of_ar', None, 'date'),
+    CompanyRecordField('RECEIPT NO.', 'receipt_no', 1, 'text'),
+    CompanyRecordField('Audit Firms', 'audit_firm_name', -51.34, 'text_if_row'))
+# Label -> (precedence, field) of COMPANY_RECORD_FIELDS
+COMPANY_RECORD_LABEL_FIELDS = dict((company_field.label, (precedence, company_field))
+                                   for precedence, company_field in enumerate(COMPANY_RECORD_FIELDS))
+# Labels of the rows read by populate_company_record_table
+COMPANY_RECORD_LABELS = tuple(company_field.label for company_field in COMPANY_RECORD_FIELDS)
+# Labels of the company record following the tables, at the end of the
+# document, the others all precede the first table
+COMPANY_RECORD_TRAILING_LABELS = ('Audit Firms',)
+# Date printed next to the receipt number
+BIZFILE_DATE_RE = re.compile(r'^Date:.\d+/\d+/\d+')
+DATE_RE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})$')
+# Starts of the anchors of the sections which are not in SECTION_ANCHORS
+TABLE_END_PREFIXES = ('Group Share : ', 'Date:')
+# Anchor of a group share table, the group is its letter
+GROUP_SHARE_RE = re.compile(r"Group Share : ([A-Z]) \(Shares co-owned by shareholders listed under this group\)")
+# Dates parsed by parse_date are memoized until there are this many
+DATE_CACHE_SIZE = 1 << 16
+OFFICERS_ANCHOR = 'Officers/Authorised Representative(s)'
+# Page heading after which a group share table continues on the next page
+# TODO this should be dynamic instead of hardcoding
+SHAREHOLDER_TYPE_HEADINGS = ["WHILST EVERY ENDEAVOR IS MADE TO ENSURE THAT INFORMATION PROVIDED IS UPDATED AND CORRECT. THE AUTHORITY"]
+# Anchor text of a table -> section reading that table
+SECTION_ANCHORS = dict([(label, 'company_record') for label in COMPANY_RECORD_LABELS] + [
+    ('Charge No.', 'charges'),
+    ('Capital', 'capital'),
+    ('Paid-Up Capital', 'paidup_capital'),
+    ('Shareholder(s)', 'shareholders'),
+    (OFFICERS_ANCHOR, 'officers')] + [
+    (heading, 'shareholder_type') for heading in SHAREHOLDER_TYPE_HEADINGS])
+# Sections in the order their extractors run on a page
+SECTION_EXTRACTORS = (('company_record', 'populate_company_record_table'),
+                      ('charges', 'populate_charges_record_table'),
+                      ('capital', 'populate_share_capital_table'),
+                      ('paidup_capital', 'populate_paidup_capital_table'),
+                      ('officers', 'populate_officers_and_representatives'),
+                      ('shareholders', 'populate_shareholders_table'),
+                      ('shareholder_type', 'populate_shareholder_type_table'))
+# Labels the page pre-scan looks for, compared with all whitespace removed.
+# The disclaimer closing every page is left out, it only matters while a
+# group share is open, which keeps the next page from being skipped.
+PRESCAN_ANCHORS = tuple(''.join(label.split()) for label, section in SECTION_ANCHORS.items()
+                        if section != 'shareholder_type') + ('Date:', 'GroupShare:')
+# PdfParser attributes holding a table row continued on the next page
+OPEN_TABLE_ATTRS = ("pending_officers_table", "pending_shareholders_table",
+                    "pending_shareholders_type_table")
+# Section reading each table of the results
+TABLE_SECTIONS = {"company_record": "company_record",
+                  "charges": "charges",
+                  "capital_details": "capital",
+                  "paidup_capital_details": "paidup_capital",
+                  "shareholders_details": "shareholders",
+                  "shareholder_type_details": "shareholder_type",
+                  "officers_details": "officers"}
+# Sections whose anchors start a table, the page heading routed to the
+# group shares is on every page
+TABLE_ANCHOR_SECTIONS = ('charges', 'capital', 'paidup_capital', 'shareholders', 'officers')
+# Pending table of the sections having one
+SECTION_PENDING_TABLES = {"shareholders": "pending_shareholders_table",
+                          "shareholder_type": "pending_shareholders_type_table",
+                          "officers": "pending_officers_table"}
+# Label of every company record field which can be selected, the date of
+# the bizfile is on the row starting with 'Date:'
+COMPANY_RECORD_FIELD_LABELS = dict([(company_field.field, company_field.label)
+                                    for company_field in COMPANY_RECORD_FIELDS] + [
+    ('activites_description_2', 'Description'),
+    ('bizfile_date', 'Date:')])
+# Text showing operators of PDF content streams
+TEXT_OPERATORS = ('Tj', 'TJ', "'", '"')
+# Font dictionaries nested deeper are not cached by FontCache
+FONT_SPEC_MAX_DEPTH = 32
+# Stages timed by DocumentMetrics, besides the populate_* extractors
+METRIC_STAGES = ("load_pdf_file", "open", "prescan", "layout", "text_blocks", "rows",
+                 "extract", "page")
+# PdfParser attributes carried from one page to the next: the open tables
+# and the open group share. The shareholder type counts are rebuilt from
+# the records of the pages instead.
+PAGE_STATE_ATTRS = ("pending_officers_table", "pending_shareholders_table",
+                    "pending_shareholders_type_table", "shareholder_type",
+                    "ordinary_num", "currency")
 
 class PdfParserException(Exception):
     """ 
@@ -29,6 +296,1553 @@ class PdfParserException(Exception):
     def __init__(self):
         pass
 
+class RowIndex:
+
+    """
+    Sorted y1 keys of the rows of a page, answering nearest row and next
+    row queries in O(log n)
+    """
+    def __init__(self):
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __contains__(self, y):
+        i = bisect_left(self.keys, y)
+        return i < len(self.keys) and self.keys[i] == y
+
+    def add(self, y):
+        i = bisect_left(self.keys, y)
+        if i == len(self.keys) or self.keys[i] != y:
+            self.keys.insert(i, y)
+
+    def remove(self, y):
+        i = bisect_left(self.keys, y)
+        if i < len(self.keys) and self.keys[i] == y:
+            del self.keys[i]
+
+    def find(self, y, tolerance):
+        """
+        Returns the row nearest to `y` within +/- `tolerance`, or None
+        """
+        i = bisect_left(self.keys, y)
+        nearest = None
+        for key in self.keys[max(i - 1, 0):i + 1]:
+            if abs(key - y) <= tolerance and \
+               (nearest is None or abs(key - y) < abs(nearest - y)):
+                nearest = key
+        return nearest
+
+    def next_below(self, y):
+        """
+        Returns the first row below `y`, or None
+        """
+        i = bisect_left(self.keys, y)
+        return self.keys[i - 1] if i else None
+
+class PageRows(defaultdict):
+
+    """
+    Rows of a page keyed by their y1, the keys are also kept in a RowIndex
+    """
+    def __init__(self, rows=()):
+        defaultdict.__init__(self, list)
+        self.row_index = RowIndex()
+        self.update(rows)
+
+    def __missing__(self, key):
+        value = self[key] = []
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self.row_index.add(key)
+        defaultdict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        defaultdict.__delitem__(self, key)
+        self.row_index.remove(key)
+
+    def update(self, rows):
+        for key, value in dict(rows).iteritems():
+            self[key] = value
+
+    def sort_by_x(self, key):
+        """
+        Sorts the row at `key` by x in place, ties keeping their order,
+        and returns it
+        """
+        row = self[key]
+        row.sort(key=lambda t: t.x)
+        return row
+
+    def copy(self):
+        return PageRows(self)
+
+    def __reduce__(self):
+        return (PageRows, (dict(self),))
+
+class CountingRowIndex(RowIndex):
+
+    """
+    RowIndex counting its nearest row and next row queries in `probes`
+    """
+    def __init__(self):
+        RowIndex.__init__(self)
+        self.probes = 0
+
+    def find(self, y, tolerance):
+        self.probes += 1
+        return RowIndex.find(self, y, tolerance)
+
+    def next_below(self, y):
+        self.probes += 1
+        return RowIndex.next_below(self, y)
+
+class CountingPageRows(PageRows):
+
+    """
+    PageRows counting the rows looked up in `visits`, used instead of
+    PageRows when metrics are collected
+    """
+    def __init__(self, rows=()):
+        self.visits = 0
+        defaultdict.__init__(self, list)
+        self.row_index = CountingRowIndex()
+        self.update(rows)
+
+    def __getitem__(self, key):
+        self.visits += 1
+        return PageRows.__getitem__(self, key)
+
+    def __contains__(self, key):
+        self.visits += 1
+        return PageRows.__contains__(self, key)
+
+class Record(object):
+
+    """
+    Base class of the records parsed from the tables. The fields of a record
+    are its __slots__ and default to '' unless listed in `defaults`. Records
+    also support item access so they can be used like the dicts they
+    replace, unknown fields raise a KeyError.
+    """
+    __slots__ = ()
+    defaults = {}
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.pop(name, self.defaults.get(name, '')))
+        if fields:
+            raise TypeError("%s has no fields %s" % (type(self).__name__, ", ".join(sorted(fields))))
+
+    def __getitem__(self, name):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def get(self, name, default=None):
+        if name not in self.__slots__:
+            return default
+        return getattr(self, name)
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.__slots__]
+
+    def key(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.key() == other.key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __getstate__(self):
+        return self.key()
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, ", ".join(
+            "%s=%r" % (name, getattr(self, name)) for name in self.__slots__))
+
+class ChargeRecord(Record):
+    __slots__ = ('id', 'charge_no', 'date_registered', 'currency',
+                 'amount_secured', 'charge_org')
+
+class CapitalRecord(Record):
+    """
+    Row of the capital or of the paid-up capital table, see capital_type
+    """
+    __slots__ = ('id', 'capital_type', 'amount', 'shares', 'currency',
+                 'share_type')
+    defaults = {'shares': None}
+
+class ShareholderRecord(Record):
+    __slots__ = ('name', 'address', 'shareholder_id', 'nationality',
+                 'source_of_address', 'address_changed', 'currency',
+                 'pref_num', 'pref_currency', 'ordinary_num', 'company_record')
+    defaults = {'address_changed': None, 'pref_num': None,
+                'pref_currency': None, 'ordinary_num': None}
+
+class ShareholderTypeRecord(Record):
+    """
+    Shareholder listed under a group share
+    """
+    __slots__ = ('name', 'address', 'shareholder_id', 'shareholder_type',
+                 'nationality', 'source_of_address', 'address_changed',
+                 'currency', 'ordinary_num', 'company_record')
+    defaults = {'address_changed': None}
+
+class OfficerRecord(Record):
+    __slots__ = ('name', 'officer_id', 'nationality', 'source_of_address',
+                 'date_of_appointment', 'address', 'position')
+
+class RecordList(list):
+
+    """
+    List of records which ignores records equal to one it already holds.
+    Keys of the records seen so far are kept in a set, so appending is
+    O(1) and the records stay in the order they were first seen.
+    PdfParserProvider.iter_records trims the keys to the records of the
+    previous page.
+    """
+    def __init__(self, records=()):
+        list.__init__(self)
+        self.record_keys = set()
+        self.extend(records)
+
+    def append(self, record):
+        record_key = _record_key(record)
+        if record_key not in self.record_keys:
+            self.record_keys.add(record_key)
+            list.append(self, record)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __reduce__(self):
+        return (RecordList, (list(self),))
+
+CHARGES_TABLE = TableSpec("charges", ChargeRecord, {}, (28.37, 28.34), 48, (
+    TableLine("charge", (4,), None, ((0, 'charge_no', 'text'), (1, 'date_registered', 'date'),
+                                     (2, 'amount_secured', 'text'), (3, 'charge_org', 'text')),
+              False),), 1, None)
+CAPITAL_TABLE = TableSpec("capital_details", CapitalRecord, {'capital_type': 'capital'},
+                          (75.37, 75.34), 26, (
+    TableLine("capital", (3, 4), None, ((0, 'amount', 'text'), (0, 'shares', 'int'),
+                                        (1, 'currency', 'text'), (2, 'share_type', 'text')),
+              False),), 1, None)
+PAIDUP_CAPITAL_TABLE = TableSpec("paidup_capital_details", CapitalRecord,
+                                 {'capital_type': 'paid_up_capital'}, (50.37, 50.34), 26, (
+    TableLine("capital", (3,), None, ((0, 'amount', 'text'), (1, 'currency', 'text'),
+                                      (2, 'share_type', 'text')), False),), 1, None)
+OFFICERS_TABLE = TableSpec("officers_details", OfficerRecord, {}, (98, 74.37, 74.34), 62, (
+    TableLine("officer", (5,), None, ((0, 'name', 'text'), (1, 'officer_id', 'text'),
+                                      (2, 'nationality', 'text'), (3, 'source_of_address', 'text'),
+                                      (4, 'date_of_appointment', 'date')), False),
+    TableLine("address", (2,), None, ((0, 'address', 'text'), (1, 'position', 'text')), False)),
+    2, "pending_officers_table")
+# A shareholder is pending until its ordinary shares are read
+SHAREHOLDERS_TABLE = TableSpec("shareholders_details", ShareholderRecord, {},
+                               (97.34, 121.34, 74.34), 99, (
+    TableLine("shareholder", (5, 6), None, ((1, 'name', 'text'), (2, 'shareholder_id', 'text'),
+                                            (3, 'nationality', 'text'),
+                                            (4, 'source_of_address', 'text')), False),
+    TableLine("address", (1,), None, ((0, 'address', 'text'),), True),
+    TableLine("ordinary_label", (2,), 'Ordinary(Number)', (), True),
+    TableLine("ordinary", (2,), None, ((0, 'ordinary_num', 'text'), (1, 'currency', 'text')), True),
+    TableLine("preference_label", (2,), 'Preference(Number)', (), True),
+    TableLine("preference", (2,), None, ((0, 'pref_num', 'text'), (1, 'pref_currency', 'text')),
+              True)), 4, "pending_shareholders_table")
+# Ordinary shares of a group share, under its 'Group Share : ' anchor,
+# followed by the shareholders of the group
+GROUP_SHARE_TABLE = TableSpec("shareholder_type_details", ShareholderTypeRecord, {}, (23,), 99, (
+    TableLine("ordinary_label", (2,), 'Ordinary(Number)', (), True),
+    TableLine("ordinary", (2,), None, ((0, 'ordinary_num', 'text'), (1, 'currency', 'text')),
+              False)), 2, None)
+# Group share whose anchor ended the previous page, under the page heading
+GROUP_SHARE_CONTINUED_TABLE = GROUP_SHARE_TABLE._replace(header_heights=(95.73,))
+# Shareholders of a group share, following its ordinary shares. The header
+# heights are the ones of the page heading the table goes on under on the
+# next page, where the shareholder the previous page ended in is completed
+# by populate_shareholder_type_table.
+SHAREHOLDER_TYPE_TABLE = TableSpec("shareholder_type_details", ShareholderTypeRecord, {},
+                                   (48.40, 24.34, 99.73), 58, (
+    TableLine("shareholder", (5, 6), None, ((1, 'name', 'text'), (2, 'shareholder_id', 'text'),
+                                            (3, 'nationality', 'text'),
+                                            (4, 'source_of_address', 'text')), False),
+    TableLine("address", (1,), None, ((0, 'address', 'text'),), False)), 2, None)
+
+def select_sections(tables=None, fields=None):
+    """
+    Returns the sections to run to parse `tables`, names of the tables of
+    the results, and the company record `fields`, which imply the
+    company_record table. Returns None when both are None: everything is
+    parsed.
+    """
+    if tables is None and fields is None:
+        return None
+    unknown = set(tables or ()) - set(TABLE_SECTIONS)
+    if unknown:
+        raise ValueError("Unknown tables %s, expected some of %s" % \
+                         (", ".join(sorted(unknown)), ", ".join(sorted(TABLE_SECTIONS))))
+    unknown = set(fields or ()) - set(COMPANY_RECORD_FIELD_LABELS)
+    if unknown:
+        raise ValueError("Unknown company record fields %s" % ", ".join(sorted(unknown)))
+    sections = set(TABLE_SECTIONS[table] for table in tables or ())
+    if fields:
+        sections.add("company_record")
+    return frozenset(sections)
+
+_date_cache = {}
+# Lines expected after each line of the tables, see
+# PdfParserProvider._expected_table_lines
+_table_lines_cache = {}
+
+def parse_date(text):
+    """
+    Parses a dd/mm/YYYY date, None when `text` is empty. Dates are
+    memoized, bizfiles repeat the same few dates many times.
+    """
+    if not text:
+        return None
+    value = _date_cache.get(text)
+    if value is None:
+        match = DATE_RE.match(text)
+        if match:
+            day, month, year = match.groups()
+            value = datetime(int(year), int(month), int(day))
+        else:
+            value = datetime.strptime(text, '%d/%m/%Y')
+        if len(_date_cache) >= DATE_CACHE_SIZE:
+            _date_cache.clear()
+        _date_cache[text] = value
+    return value
+
+def _output_value(value):
+    """
+    Value of a record field as written by the CSV and columnar sinks
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def json_default(value):
+    """
+    `default` of json.dumps for parser results: records are written as
+    dictionaries and datetimes as ISO 8601 strings
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError("%r is not JSON serializable" % (value,))
+
+def file_sha256(path):
+    """
+    Returns the SHA-256 hex digest of the contents of `path`
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file_obj:
+        for chunk in iter(lambda: file_obj.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Types of the in-memory documents accepted as input, a str is also taken
+# as the document rather than its path when it starts with PDF_HEADER
+PDF_BUFFER_TYPES = (bytearray, buffer, memoryview, mmap.mmap)
+PDF_HEADER = b'%PDF'
+
+def is_pdf_buffer(source):
+    return isinstance(source, PDF_BUFFER_TYPES) or \
+        (isinstance(source, str) and source.startswith(PDF_HEADER))
+
+def is_pdf_path(source):
+    return isinstance(source, basestring) and not is_pdf_buffer(source)
+
+def pdf_input_name(source):
+    """
+    Name of an input document for logs and results: its path, the name of
+    its file object or the type of its buffer
+    """
+    if is_pdf_path(source):
+        return source
+    name = getattr(source, "name", None)
+    return name if isinstance(name, basestring) else "<%s>" % type(source).__name__
+
+@contextlib.contextmanager
+def open_pdf_input(source):
+    """
+    Opens an input document: a path, an in-memory document (see
+    PDF_BUFFER_TYPES), read through a cStringIO view of it without being
+    copied, or a seekable file object, which is used as is and left open.
+    Files opened from a path are closed on exit.
+    """
+    if is_pdf_path(source):
+        with open(source, 'rb') as file_obj:
+            yield file_obj
+    elif is_pdf_buffer(source):
+        yield cStringIO.StringIO(source)
+    elif hasattr(source, "read") and hasattr(source, "seek"):
+        yield source
+    else:
+        raise TypeError("Cannot read a PDF from %r" % (source,))
+
+def pdf_input_sha256(source):
+    """
+    Returns the SHA-256 hex digest of an input document, see open_pdf_input
+    """
+    if is_pdf_path(source):
+        return file_sha256(source)
+    if is_pdf_buffer(source):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    position = source.tell()
+    source.seek(0)
+    try:
+        for chunk in iter(lambda: source.read(1 << 20), b''):
+            digest.update(chunk)
+    finally:
+        source.seek(position)
+    return digest.hexdigest()
+
+class DiskCache:
+
+    """
+    Directory of cache files, one per key. Hits refresh the mtime of their
+    file and the least recently used files are evicted once the directory
+    grows above `max_bytes`.
+    """
+    SUFFIX = ".cache"
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # size of the cache directory, counted on the first write
+        self.size = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def _read(self, key):
+        """
+        Returns the contents of the file of `key`, or None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                data = cache_file.read()
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+        return data
+
+    def _write(self, key, data):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as cache_file:
+            cache_file.write(data)
+        os.rename(temp_path, self._path(key))
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self._entries())
+        else:
+            self.size += len(data)
+        if self.size > self.max_bytes:
+            self._evict()
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _evict(self):
+        # other processes may share the directory, so sizes are recounted
+        entries = sorted(self._entries())
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            self.size -= size
+
+class LayoutCache(DiskCache):
+
+    """
+    On-disk cache of the text blocks pdfminer layout analysis produced for
+    every page of a document. Entries are keyed by the SHA-256 of the PDF
+    and the LAParams used, one file per document holding the text blocks
+    of each page by page number. Files are zlib compressed structs.
+    """
+    SUFFIX = ".layout"
+    MAGIC = b'PPLC1'
+    HEADER = struct.Struct('<5sI')
+    PAGE = struct.Struct('<I')
+    BLOCK = struct.Struct('<dddI')
+
+    def key(self, file_sha, laparams, *settings):
+        # settings holds everything else changing the text blocks, pages
+        # skipped by the pre-scan are stored without any
+        laparams_key = repr((sorted(vars(laparams).items()), settings))
+        return "%s-%s" % (file_sha, hashlib.sha1(laparams_key).hexdigest()[:12])
+
+    def get(self, key):
+        """
+        Returns the list of text block lists of every page, or None
+        """
+        data = self._read(key)
+        if data is None:
+            return None
+        try:
+            return self._unpack(zlib.decompress(data))
+        except (zlib.error, struct.error, UnicodeDecodeError, ValueError):
+            return None
+
+    def put(self, key, pages):
+        self._write(key, zlib.compress(self._pack(pages), 1))
+
+    def _pack(self, pages):
+        chunks = [self.HEADER.pack(self.MAGIC, len(pages))]
+        for page_text in pages:
+            chunks.append(self.PAGE.pack(len(page_text)))
+            for text_block in page_text:
+                text = text_block.text.encode('utf-8')
+                chunks.append(self.BLOCK.pack(text_block.x, text_block.y,
+                                              text_block.z, len(text)))
+                chunks.append(text)
+        return b''.join(chunks)
+
+    def _unpack(self, data):
+        magic, page_count = self.HEADER.unpack_from(data, 0)
+        if magic != self.MAGIC:
+            raise ValueError("not a layout cache file")
+        offset = self.HEADER.size
+        pages = []
+        for _ in range(page_count):
+            block_count, = self.PAGE.unpack_from(data, offset)
+            offset += self.PAGE.size
+            page_text = []
+            for _ in range(block_count):
+                x, y, z, text_len = self.BLOCK.unpack_from(data, offset)
+                offset += self.BLOCK.size
+                text = data[offset:offset + text_len].decode('utf-8')
+                offset += text_len
+                page_text.append(TextBlock(x, y, z, text))
+            pages.append(page_text)
+        return pages
+
+class ResultCache(DiskCache):
+
+    """
+    On-disk cache of the final results of whole documents, as returned by
+    PdfParser.get_results(). Entries are keyed by the SHA-256 of the PDF and
+    everything which changes the results: PARSER_VERSION, the LAParams and
+    the row tolerance. Entries older than `ttl` seconds are dropped, `hits`,
+    `misses` and `expired` count the lookups.
+    """
+    SUFFIX = ".result"
+
+    def __init__(self, directory, max_bytes, ttl=None):
+        DiskCache.__init__(self, directory, max_bytes)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def key(self, file_sha, laparams, *settings):
+        settings = repr((PARSER_VERSION, sorted(vars(laparams).items()), settings))
+        return "%s-%s" % (file_sha, hashlib.sha1(settings).hexdigest()[:12])
+
+    def get(self, key):
+        """
+        Returns the cached results of the document, or None
+        """
+        data = self._read(key)
+        results = None
+        if data is not None:
+            try:
+                created, results = cPickle.loads(data)
+            except Exception:
+                results = None
+            else:
+                if self.ttl is not None and time.time() - created > self.ttl:
+                    self._remove(key)
+                    self.expired += 1
+                    results = None
+        if results is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return results
+
+    def put(self, key, results):
+        self._write(key, cPickle.dumps((time.time(), results), cPickle.HIGHEST_PROTOCOL))
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'expired': self.expired}
+
+class DocumentMetrics:
+
+    """
+    Timers and counters of one parsed document. `timers` holds the seconds
+    spent in every stage (see METRIC_STAGES) and extractor, `counters` the
+    pages, text blocks and rows, `extractors` the calls, rows visited,
+    row index queries and records emitted of every populate_* extractor and
+    `pages` the time, text blocks and rows of every page.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.timers = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.extractors = defaultdict(lambda: defaultdict(int))
+        self.pages = []
+
+    def add_time(self, stage, seconds):
+        self.timers[stage] += seconds
+
+    def add_page(self, page_num, seconds, text_blocks, rows, skipped=False):
+        self.add_time("page", seconds)
+        self.counters["pages"] += 1
+        self.counters["text_blocks"] += text_blocks
+        self.counters["rows"] += rows
+        if skipped:
+            self.counters["skipped_pages"] += 1
+        self.pages.append({"page": page_num + 1, "seconds": seconds,
+                           "text_blocks": text_blocks, "rows": rows, "skipped": skipped})
+
+    def merge(self, other):
+        for stage, seconds in other.timers.iteritems():
+            self.timers[stage] += seconds
+        for name, value in other.counters.iteritems():
+            self.counters[name] += value
+        for extractor, counters in other.extractors.iteritems():
+            for name, value in counters.iteritems():
+                self.extractors[extractor][name] += value
+        self.pages.extend(other.pages)
+        self.pages.sort(key=lambda page: page["page"])
+
+    def to_dict(self):
+        return {"path": self.path,
+                "timers": dict(self.timers),
+                "counters": dict(self.counters),
+                "extractors": dict((extractor, dict(counters))
+                                   for extractor, counters in self.extractors.iteritems()),
+                "pages": self.pages}
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+        self.timers.update(state["timers"])
+        self.counters.update(state["counters"])
+        for extractor, counters in state["extractors"].iteritems():
+            self.extractors[extractor].update(counters)
+        self.pages = state["pages"]
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest rank percentile of a sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = int(math.ceil(fraction * len(sorted_values))) - 1
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+class MetricsSummary:
+
+    """
+    Metrics of the documents of a batch run, as DocumentMetrics.to_dict()
+    dictionaries. Summarizes the latency of every stage and extractor per
+    document and of every page as p50/p95/p99, and totals the counters.
+    """
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self):
+        self.documents = []
+
+    def add(self, document_metrics):
+        self.documents.append(document_metrics)
+
+    def latencies(self):
+        """
+        Returns {stage: {"count", "sum", "p50", "p95", "p99"}} in seconds,
+        the "page" stage has one value per page, the others one per document
+        """
+        values = defaultdict(list)
+        for document in self.documents:
+            for stage, seconds in document["timers"].iteritems():
+                if stage != "page":
+                    values[stage].append(seconds)
+            for page in document["pages"]:
+                values["page"].append(page["seconds"])
+        latencies = {}
+        for stage, stage_values in values.iteritems():
+            stage_values.sort()
+            latencies[stage] = {"count": len(stage_values), "sum": sum(stage_values)}
+            for quantile in self.QUANTILES:
+                latencies[stage]["p%d" % (quantile * 100)] = percentile(stage_values, quantile)
+        return latencies
+
+    def totals(self):
+        """
+        Returns the counters and the extractor counters summed over all
+        documents
+        """
+        counters = defaultdict(int)
+        extractors = defaultdict(lambda: defaultdict(int))
+        for document in self.documents:
+            for name, value in document["counters"].iteritems():
+                counters[name] += value
+            for extractor, extractor_counters in document["extractors"].iteritems():
+                for name, value in extractor_counters.iteritems():
+                    extractors[extractor][name] += value
+        return counters, extractors
+
+    def write_prometheus(self, path):
+        """
+        Writes the summary in the Prometheus text format, replacing `path`
+        atomically as the node exporter textfile collector expects
+        """
+        lines = ["# HELP pdf_parser_documents_total Documents parsed.",
+                 "# TYPE pdf_parser_documents_total counter",
+                 "pdf_parser_documents_total %d" % len(self.documents),
+                 "# HELP pdf_parser_stage_seconds Seconds spent in a stage per document, "
+                 "per page for the page stage.",
+                 "# TYPE pdf_parser_stage_seconds summary"]
+        for stage, latency in sorted(self.latencies().iteritems()):
+            for quantile in self.QUANTILES:
+                lines.append('pdf_parser_stage_seconds{stage="%s",quantile="%s"} %r' % \
+                             (stage, quantile, latency["p%d" % (quantile * 100)]))
+            lines.append('pdf_parser_stage_seconds_sum{stage="%s"} %r' % (stage, latency["sum"]))
+            lines.append('pdf_parser_stage_seconds_count{stage="%s"} %d' % \
+                         (stage, latency["count"]))
+        counters, extractors = self.totals()
+        for name, value in sorted(counters.iteritems()):
+            lines.append("# TYPE pdf_parser_%s_total counter" % name)
+            lines.append("pdf_parser_%s_total %d" % (name, value))
+        for name in ("calls", "rows_visited", "index_probes", "records"):
+            lines.append("# TYPE pdf_parser_extractor_%s_total counter" % name)
+            for extractor, extractor_counters in sorted(extractors.iteritems()):
+                lines.append('pdf_parser_extractor_%s_total{extractor="%s"} %d' % \
+                             (name, extractor, extractor_counters.get(name, 0)))
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, 'w') as prom_file:
+            prom_file.write("\n".join(lines) + "\n")
+        os.rename(temp_path, path)
+
+class ProfileCapture:
+
+    """
+    Profiles documents with cProfile and keeps the dumps of the `keep`
+    slowest documents it profiled in `directory`. Every dump (.pstats) has
+    a JSON file next to it holding the path, SHA-256, page count and time
+    of the document. The directory is trimmed after every dump, dumps
+    written concurrently by other processes are trimmed by the next one or
+    by prune_profiles() once they are done.
+    """
+    SUFFIX = ".pstats"
+
+    def __init__(self, directory, keep):
+        self.directory = directory
+        self.keep = keep
+        # heap of the (seconds, name) of the dumps in the directory
+        self.slowest = []
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def run(self, parser_obj, function, *args):
+        profiler = cProfile.Profile()
+        error = None
+        start = time.time()
+        try:
+            return profiler.runcall(function, *args)
+        except Exception as e:
+            error = "%s: %s" % (type(e).__name__, e)
+            raise
+        finally:
+            # a failure to keep the profile must not hide the error of the
+            # parse, nor fail a parse which went well
+            try:
+                self._keep(profiler, parser_obj, time.time() - start, error)
+            except Exception:
+                logger.exception("Could not keep the profile of %s", parser_obj.input_name)
+
+    def _keep(self, profiler, parser_obj, seconds, error):
+        if self.keep <= 0:
+            return
+        if len(self.slowest) >= self.keep and seconds <= self.slowest[0][0]:
+            return
+        file_sha = parser_obj.input_sha256 or pdf_input_sha256(parser_obj.input_pdf_file)
+        name = "%s-%s" % (file_sha[:16], uuid.uuid4().hex[:12])
+        profiler.dump_stats(os.path.join(self.directory, name + self.SUFFIX))
+        with open(os.path.join(self.directory, name + ".json"), 'w') as info_file:
+            json.dump({"path": parser_obj.input_name, "sha256": file_sha,
+                       "pages": len(parser_obj.parsed_output_text), "seconds": seconds,
+                       "error": error, "profile": name + self.SUFFIX}, info_file)
+        self.slowest = [(profile["seconds"], profile["profile"][:-len(self.SUFFIX)])
+                        for profile in prune_profiles(self.directory, self.keep)]
+        heapq.heapify(self.slowest)
+
+def _remove_profile(directory, name):
+    for suffix in (ProfileCapture.SUFFIX, ".json"):
+        try:
+            os.remove(os.path.join(directory, name + suffix))
+        except OSError:
+            pass
+
+def prune_profiles(directory, keep):
+    """
+    Keeps the profiles of the `keep` slowest documents in `directory`,
+    returns their information dictionaries, slowest first
+    """
+    profiles = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(directory, name)) as info_file:
+                    profiles.append(json.load(info_file))
+            except (IOError, ValueError):
+                continue
+    profiles.sort(key=lambda profile: profile["seconds"], reverse=True)
+    for profile in profiles[keep:]:
+        _remove_profile(directory, profile["profile"][:-len(ProfileCapture.SUFFIX)])
+    return profiles[:keep]
+
+# Levels of the extractor trace by name
+TRACE_LEVELS = {"info": logging.INFO, "debug": logging.DEBUG}
+
+class Tracer:
+
+    """
+    Structured trace of the decisions of the extractors of one document.
+    Every event is a dict logged as JSON on the pdf_parser.trace logger, it
+    is also the `trace` attribute of the log record. Events are
+
+        info   anchor     rows of a page routed to an extractor
+        info   pending    pending table opened or closed by an extractor
+        debug  table_row  row a table walker moved to: the first row of
+                          the table under its anchor, or the next line of
+                          the table, None when the table or the page ended
+
+    Only the extractors in `extractors` are traced, all of them when None.
+    A parser has no Tracer unless trace_level is set. The table walkers are
+    given the Tracer of the parser, so nothing is done per row when tracing
+    is disabled besides checking for it.
+    """
+    def __init__(self, path, level="info", extractors=None):
+        if level not in TRACE_LEVELS:
+            raise ValueError("Unknown trace level %r, expected one of %s" % \
+                             (level, ", ".join(sorted(TRACE_LEVELS))))
+        self.path = path
+        self.level = TRACE_LEVELS[level]
+        self.extractors = frozenset(extractors) if extractors else None
+        self.page_num = None
+        self.extractor = None
+
+    def traces(self, extractor):
+        return self.extractors is None or extractor in self.extractors
+
+    def emit(self, level, event, **fields):
+        if level < self.level or not trace_logger.isEnabledFor(level):
+            return
+        fields.update(event=event, document=self.path, extractor=self.extractor,
+                      page=None if self.page_num is None else self.page_num + 1)
+        trace_logger.log(level, "%s", json.dumps(fields, default=json_default, sort_keys=True),
+                         extra={"trace": fields})
+
+    def anchors(self, page_num, page_values, anchors):
+        self.page_num = page_num
+        for section, extractor in SECTION_EXTRACTORS:
+            if section in anchors and self.traces(extractor):
+                self.extractor = extractor
+                # dict.get does not count as a visit of CountingPageRows
+                self.emit(logging.INFO, "anchor", section=section,
+                          rows=[{"y": key, "text": [t.text for t in dict.get(page_values, key, ())]}
+                                for key in anchors[section]])
+        self.extractor = None
+
+    def run_extractor(self, provider, parser_obj, extractor, page_values, anchor_keys):
+        """
+        Runs an extractor tracing the pending tables it opens and closes
+        and, at debug level, the rows its table walkers move to
+        """
+        self.extractor = extractor
+        open_tables = [(attr, getattr(parser_obj, attr)) for attr in OPEN_TABLE_ATTRS]
+        try:
+            if parser_obj.metrics:
+                provider._measure_extractor(parser_obj, extractor, page_values, anchor_keys)
+            else:
+                getattr(provider, extractor)(parser_obj, page_values, anchor_keys)
+        finally:
+            for attr, before in open_tables:
+                after = getattr(parser_obj, attr)
+                if after is before:
+                    continue
+                if before is not None:
+                    self.emit(logging.INFO, "pending", table=attr, action="closed", record=before)
+                if after is not None:
+                    self.emit(logging.INFO, "pending", table=attr, action="opened", record=after)
+            self.extractor = None
+
+    def table_row(self, spec, row, **fields):
+        """
+        Row of table `spec` a table walker moved to, traced while a traced
+        extractor runs
+        """
+        if self.extractor is not None and self.level <= logging.DEBUG:
+            self.emit(logging.DEBUG, "table_row", table=spec.table, row=row, **fields)
+
+class RecordSink:
+
+    """
+    Base class of the writers of parsed records. write() takes one record
+    of a table (company_record or one of PAGE_RESULT_TABLES) as soon as it
+    is produced, together with the path of its document. Output is
+    buffered in blocks of `buffer_bytes` and flushed by close(). Sinks are
+    context managers.
+    """
+    def __init__(self, buffer_bytes=DEFAULTS["output_buffer_bytes"]):
+        self.buffer_bytes = buffer_bytes
+        self.records = 0
+
+    def write(self, table, record, document=None):
+        raise NotImplementedError
+
+    def write_results(self, results, document=None):
+        """
+        Writes the results of a whole document, as returned by
+        PdfParser.get_results()
+        """
+        for table in PAGE_RESULT_TABLES:
+            for record in results[table]:
+                self.write(table, record, document)
+        self.write('company_record', results['company_record'], document)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open(self, path):
+        return open(path, 'wb', self.buffer_bytes)
+
+def _record_fields(record):
+    if isinstance(record, Record):
+        return record.keys()
+    return sorted(record)
+
+class JsonLinesSink(RecordSink):
+
+    """
+    Writes every record as a JSON line {"document", "table", "record"} to
+    `path`, or to stdout when `path` is '-'
+    """
+    def __init__(self, path, buffer_bytes=DEFAULTS["output_buffer_bytes"]):
+        RecordSink.__init__(self, buffer_bytes)
+        self.output = sys.stdout if path == '-' else self._open(path)
+        self.encoder = json.JSONEncoder(default=json_default, separators=(',', ':'))
+
+    def write(self, table, record, document=None):
+        self.output.write(self.encoder.encode(
+            {"document": document, "table": table, "record": record}))
+        self.output.write("\n")
+        self.records += 1
+
+    def close(self):
+        if self.output is sys.stdout:
+            self.output.flush()
+        else:
+            self.output.close()
+
+class CsvSink(RecordSink):
+
+    """
+    Writes one CSV file per table into `directory`, named after the table.
+    The first column is the document, the others are the fields of the
+    first record written to the table.
+    """
+    def __init__(self, directory, buffer_bytes=DEFAULTS["output_buffer_bytes"]):
+        RecordSink.__init__(self, buffer_bytes)
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # (file, csv writer, fields) by table
+        self.writers = {}
+
+    def write(self, table, record, document=None):
+        if table not in self.writers:
+            fields = _record_fields(record)
+            csv_file = self._open(os.path.join(self.directory, table + ".csv"))
+            writer = csv.writer(csv_file)
+            writer.writerow(["document"] + fields)
+            self.writers[table] = (csv_file, writer, fields)
+        _, writer, fields = self.writers[table]
+        row = [document]
+        for field in fields:
+            value = _output_value(record.get(field))
+            if isinstance(value, unicode):
+                value = value.encode('utf-8')
+            row.append(value)
+        writer.writerow(row)
+        self.records += 1
+
+    def close(self):
+        for csv_file, _, _ in self.writers.itervalues():
+            csv_file.close()
+        self.writers = {}
+
+class ColumnarSink(RecordSink):
+
+    """
+    Writes the records of every table column by column into
+    `<directory>/<table>.columns.jsonl`. Records are collected into blocks
+    of `block_rows`, every block is written as one JSON line
+    {"rows": count, "columns": {field: [values]}}, the document of every
+    row being its "document" column.
+    """
+    def __init__(self, directory, buffer_bytes=DEFAULTS["output_buffer_bytes"],
+                 block_rows=DEFAULTS["output_block_rows"]):
+        RecordSink.__init__(self, buffer_bytes)
+        self.directory = directory
+        self.block_rows = block_rows
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.files = {}
+        # columns of the block being collected by table
+        self.blocks = {}
+
+    def write(self, table, record, document=None):
+        block = self.blocks.get(table)
+        if block is None:
+            block = self.blocks[table] = {"document": []}
+        rows = len(block["document"])
+        block["document"].append(document)
+        for field in _record_fields(record):
+            column = block.get(field)
+            if column is None:
+                # fields missing from the earlier records of the block
+                column = block[field] = [None] * rows
+            column.append(_output_value(record.get(field)))
+        for column in block.itervalues():
+            if len(column) == rows:
+                column.append(None)
+        self.records += 1
+        if rows + 1 >= self.block_rows:
+            self._flush(table)
+
+    def _flush(self, table):
+        block = self.blocks.pop(table, None)
+        if not block or not block["document"]:
+            return
+        if table not in self.files:
+            self.files[table] = self._open(os.path.join(self.directory,
+                                                        table + ".columns.jsonl"))
+        self.files[table].write(json.dumps({"rows": len(block["document"]), "columns": block},
+                                           default=json_default, separators=(',', ':')))
+        self.files[table].write("\n")
+
+    def close(self):
+        for table in self.blocks.keys():
+            self._flush(table)
+        for columns_file in self.files.itervalues():
+            columns_file.close()
+        self.files = {}
+
+# Columns of the company table of SqliteSink, registration_no is its key
+SQLITE_COMPANY_COLUMNS = ('registration_no', 'document', 'id', 'description',
+                          'bizfile_date', 'receipt_no', 'company_name', 'former_name',
+                          'incorp_date', 'company_type', 'status', 'status_date',
+                          'activities_1', 'activites_description', 'activities_2',
+                          'activites_description_2', 'registered_office_address',
+                          'date_of_address', 'date_of_last_agm', 'date_of_last_ar',
+                          'date_of_ac_at_last', 'date_of_lodgment_of_ar',
+                          'audit_firm_name', 'organization')
+# Record class of every table of SqliteSink but the company table. Rows
+# also hold the registration_no of their company and their row_no within
+# the table of the document.
+SQLITE_CHILD_TABLES = (("charges", ChargeRecord),
+                       ("capital_details", CapitalRecord),
+                       ("paidup_capital_details", CapitalRecord),
+                       ("shareholders_details", ShareholderRecord),
+                       ("shareholder_type_details", ShareholderTypeRecord),
+                       ("officers_details", OfficerRecord))
+
+class SqliteSink(RecordSink):
+
+    """
+    Loads the records into the SQLite database at `path`, one row per
+    company in company_record and one row per record in the other tables,
+    see SQLITE_CHILD_TABLES. Companies are keyed on their registration_no:
+    loading a company again replaces its row and all of its child rows.
+
+    The records of a document are held until its company record, which
+    comes last, is written. Documents are then written `batch_documents`
+    at a time, in one transaction with one executemany() per table, so a
+    company is never seen with only part of its rows.
+    """
+    def __init__(self, path, buffer_bytes=DEFAULTS["output_buffer_bytes"],
+                 batch_documents=DEFAULTS["sqlite_batch_documents"]):
+        RecordSink.__init__(self, buffer_bytes)
+        self.batch_documents = batch_documents
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.child_columns = dict((table, ('registration_no', 'row_no') + record_class.__slots__)
+                                  for table, record_class in SQLITE_CHILD_TABLES)
+        self._create_tables()
+        # rows of the documents whose company record was not written yet,
+        # by document and table
+        self.pending = defaultdict(lambda: defaultdict(list))
+        # (company row, child rows by table) of the batch by registration_no
+        self.batch = OrderedDict()
+        self.companies = 0
+
+    def _create_tables(self):
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS company_record (%s, PRIMARY KEY (registration_no))" % \
+                ", ".join(SQLITE_COMPANY_COLUMNS))
+            for table, _ in SQLITE_CHILD_TABLES:
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS %s (%s)" % (table, ", ".join(self.child_columns[table])))
+                self.connection.execute(
+                    "CREATE INDEX IF NOT EXISTS %s_registration_no ON %s (registration_no, row_no)" % \
+                    (table, table))
+
+    def write(self, table, record, document=None):
+        self.records += 1
+        if table != 'company_record':
+            self.pending[document][table].append(record)
+            return
+        tables = self.pending.pop(document, {})
+        registration_no = record.get('registration_no')
+        if not registration_no:
+            logger.warning("%s has no registration number, not loaded", document)
+            return
+        company_row = tuple(_output_value(record.get(column)) for column in SQLITE_COMPANY_COLUMNS)
+        company_row = (registration_no, document) + company_row[2:]
+        child_rows = {}
+        for table, records in tables.iteritems():
+            # registration_no and row_no are not record fields
+            columns = self.child_columns[table][2:]
+            child_rows[table] = [(registration_no, row_no) + \
+                                 tuple(_output_value(child.get(column)) for column in columns)
+                                 for row_no, child in enumerate(records)]
+        # a company parsed twice in one batch is loaded once
+        self.batch.pop(registration_no, None)
+        self.batch[registration_no] = (company_row, child_rows)
+        if len(self.batch) >= self.batch_documents:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the documents of the batch in one transaction
+        """
+        if not self.batch:
+            return
+        registration_nos = [(registration_no,) for registration_no in self.batch]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO company_record (%s) VALUES (%s)" % \
+                (", ".join(SQLITE_COMPANY_COLUMNS), ", ".join("?" * len(SQLITE_COMPANY_COLUMNS))),
+                [company_row for company_row, _ in self.batch.itervalues()])
+            for table, _ in SQLITE_CHILD_TABLES:
+                columns = self.child_columns[table]
+                self.connection.executemany(
+                    "DELETE FROM %s WHERE registration_no = ?" % table, registration_nos)
+                self.connection.executemany(
+                    "INSERT INTO %s (%s) VALUES (%s)" % \
+                    (table, ", ".join(columns), ", ".join("?" * len(columns))),
+                    [row for _, child_rows in self.batch.itervalues()
+                         for row in child_rows.get(table, ())])
+        self.companies += len(self.batch)
+        self.batch = OrderedDict()
+
+    def close(self):
+        if self.connection is None:
+            return
+        if self.pending:
+            logger.warning("%d documents without a company record were not loaded",
+                           len(self.pending))
+        self.flush()
+        self.connection.close()
+        self.connection = None
+
+# Output formats by name, see open_sink
+OUTPUT_SINKS = {"jsonl": JsonLinesSink,
+                "csv": CsvSink,
+                "columnar": ColumnarSink,
+                "sqlite": SqliteSink}
+
+def open_sink(spec, output_conf=None):
+    """
+    Opens the sink described by `spec`, "<format>:<path>" with format one
+    of OUTPUT_SINKS. The path is a file for jsonl and sqlite and a
+    directory for the other formats.
+    """
+    output_conf = output_conf or {}
+    output_format, _, path = spec.partition(":")
+    if output_format not in OUTPUT_SINKS or not path:
+        raise ValueError("Output %r is not <format>:<path> with format one of %s" % \
+                         (spec, ", ".join(sorted(OUTPUT_SINKS))))
+    buffer_bytes = output_conf.get("output_buffer_bytes", DEFAULTS["output_buffer_bytes"])
+    if output_format == "columnar":
+        return ColumnarSink(path, buffer_bytes, output_conf.get(
+            "output_block_rows", DEFAULTS["output_block_rows"]))
+    if output_format == "sqlite":
+        return SqliteSink(path, buffer_bytes, output_conf.get(
+            "sqlite_batch_documents", DEFAULTS["sqlite_batch_documents"]))
+    return OUTPUT_SINKS[output_format](path, buffer_bytes)
+
+def export_pdf_file(input_pdf_file, sink, conf=None, provider=None):
+    """
+    Streams the records of `input_pdf_file` into `sink` as they are parsed
+    """
+    provider = provider or PdfParserProvider()
+    document = pdf_input_name(input_pdf_file)
+    for parsed_record in provider.iter_records(input_pdf_file, conf):
+        sink.write(parsed_record.table, parsed_record.record, document)
+
+def _timed(metrics, stage, function, *args):
+    """
+    Calls `function`, adding the time it took to the `stage` timer of
+    `metrics` unless metrics are disabled
+    """
+    if not metrics:
+        return function(*args)
+    start = time.time()
+    try:
+        return function(*args)
+    finally:
+        metrics.add_time(stage, time.time() - start)
+
+def _update_font_digest(digest, obj, depth=0):
+    """
+    Adds the content of `obj`, part of a font dictionary, to `digest`:
+    references are resolved and streams are read. Raises ValueError for
+    dictionaries nested deeper than FONT_SPEC_MAX_DEPTH, which is what a
+    dictionary referring to itself ends up as.
+    """
+    if depth > FONT_SPEC_MAX_DEPTH:
+        raise ValueError("Font dictionary nested too deep")
+    obj = resolve1(obj)
+    if isinstance(obj, dict):
+        digest.update("<%d" % len(obj))
+        for key in sorted(obj):
+            digest.update("/%s" % key)
+            _update_font_digest(digest, obj[key], depth + 1)
+        digest.update(">")
+    elif isinstance(obj, (list, tuple)):
+        digest.update("[%d" % len(obj))
+        for value in obj:
+            _update_font_digest(digest, value, depth + 1)
+        digest.update("]")
+    elif isinstance(obj, PDFStream):
+        _update_font_digest(digest, obj.attrs, depth + 1)
+        # raw data is only the same content when it is not encrypted
+        if obj.rawdata is not None and not obj.decipher:
+            data = obj.rawdata
+            digest.update("r%d:" % len(data))
+        else:
+            data = obj.get_data()
+            digest.update("d%d:" % len(data))
+        digest.update(data)
+    elif isinstance(obj, PSLiteral):
+        digest.update("/%s " % obj.name)
+    else:
+        digest.update("%s%r " % (type(obj).__name__, obj))
+
+class FontCache(PDFResourceManager):
+
+    """
+    PDFResourceManager keeping the fonts it created across documents, to be
+    used for all the documents parsed in a process. pdfminer caches fonts by
+    object id, which is only unique within a document, so fonts are cached
+    here by a digest of their font dictionary, references resolved and
+    embedded font files included: a font is only reused for a dictionary
+    with the same content, whatever document it comes from. The `size`
+    most recently used fonts are kept. Within a document fonts are also
+    remembered by object id, so every font of every page is only digested
+    once; begin_document() starts a new document.
+    """
+    def __init__(self, size):
+        PDFResourceManager.__init__(self, caching=True)
+        self.size = size
+        self.fonts = OrderedDict()
+        self.document_fonts = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def begin_document(self):
+        self.document_fonts = {}
+
+    def get_font(self, objid, spec):
+        if objid and objid in self.document_fonts:
+            return self.document_fonts[objid]
+        try:
+            digest = hashlib.sha1()
+            _update_font_digest(digest, spec)
+            key = digest.digest()
+        except Exception:
+            # not cached across documents, pdfminer reports the error
+            # when the font is created
+            key = None
+        font = self.fonts.pop(key, None) if key else None
+        if font is None:
+            self.misses += 1
+            # without an object id pdfminer creates the font without
+            # caching it
+            font = PDFResourceManager.get_font(self, None, spec)
+            if key:
+                while len(self.fonts) >= self.size > 0:
+                    self.fonts.popitem(last=False)
+                    self.evictions += 1
+        else:
+            self.hits += 1
+        if key and self.size > 0:
+            self.fonts[key] = font
+        if objid:
+            self.document_fonts[objid] = font
+        return font
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'fonts': len(self.fonts)}
+
+class TextRunDevice(PDFTextDevice):
+
+    """
+    pdfminer device taking the characters of a page straight from
+    PDFPageInterpreter and grouping them into lines and boxes by the rules
+    of pdfminer's layout analysis, without building layout objects or
+    ordering the boxes hierarchically. get_text_blocks() returns the
+    horizontal text boxes of the last page as TextBlocks in reading order,
+    which is all PDFPageAggregator is used for. Characters inside figures
+    and of vertical fonts are dropped, _get_text_blocks never saw them.
+    """
+    def __init__(self, rsrcmgr, laparams=None):
+        PDFTextDevice.__init__(self, rsrcmgr)
+        self.laparams = laparams or LAParams()
+        self.figure_depth = 0
+        # (x0, y0, x1, y1, text) of the characters of the page
+        self.chars = []
+
+    def begin_page(self, page, ctm):
+        self.figure_depth = 0
+        self.chars = []
+
+    def begin_figure(self, name, bbox, matrix):
+        self.figure_depth += 1
+
+    def end_figure(self, name):
+        self.figure_depth -= 1
+
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid):
+        adv = font.char_width(cid) * fontsize * scaling
+        if self.figure_depth or font.is_vertical():
+            return adv
+        try:
+            text = font.to_unichr(cid)
+        except PDFUnicodeNotDefined:
+            text = '(cid:%d)' % cid
+        # same bounding box as LTChar
+        ty = font.get_descent() * fontsize + rise
+        (x0, y0) = apply_matrix_pt(matrix, (0, ty))
+        (x1, y1) = apply_matrix_pt(matrix, (adv, ty + font.get_height() * fontsize))
+        if x1 < x0:
+            (x0, x1) = (x1, x0)
+        if y1 < y0:
+            (y0, y1) = (y1, y0)
+        self.chars.append((x0, y0, x1, y1, text))
+        return adv
+
+    def get_text_blocks(self, y_offset):
+        boxes = self._group_lines(self._split_lines())
+        text_blocks = []
+        for x0, y0, x1, y1, text in boxes:
+            text = text.strip()
+            if text:
+                text_blocks.append(TextBlock(x0, round(y_offset + y1, 2),
+                                             round(y1 - y0, 2), text))
+        text_blocks.sort(key=lambda text_block: (-text_block.y, text_block.x))
+        return text_blocks
+
+    def _split_lines(self):
+        """
+        Splits the characters into lines the way
+        LTLayoutContainer.group_objects does. Returns the non empty
+        horizontal lines as [x0, y0, x1, y1, text fragments, x1 of the last
+        character].
+        """
+        laparams = self.laparams
+        lines = []
+        line = None
+        vertical = False
+        char0 = None
+        for char1 in self.chars:
+            if char0 is not None:
+                halign, valign = self._align(char0, char1)
+                if line is not None and (halign and not vertical or valign and vertical):
+                    self._add_char(line, char1)
+                elif line is not None:
+                    if not vertical:
+                        lines.append(line)
+                    line = None
+                elif valign and not halign:
+                    # vertical lines never end up in horizontal boxes
+                    line = self._new_line(char0)
+                    vertical = True
+                else:
+                    line = self._new_line(char0)
+                    vertical = False
+                    if halign and not valign:
+                        self._add_char(line, char1)
+                    else:
+                        lines.append(line)
+                        line = None
+            char0 = char1
+        if line is None and char0 is not None:
+            line = self._new_line(char0)
+            vertical = False
+        if line is not None and not vertical:
+            lines.append(line)
+        return [line for line in lines if line[2] > line[0] and line[3] > line[1]]
+
+    def _align(self, char0, char1):
+        laparams = self.laparams
+        (ax0, ay0, ax1, ay1, _) = char0
+        (bx0, by0, bx1, by1, _) = char1
+        halign = valign = False
+        if by0 <= ay1 and ay0 <= by1:
+            voverlap = min(abs(ay0 - by1), abs(ay1 - by0))
+            hdistance = 0 if (bx0 <= ax1 and ax0 <= bx1) else \
+                min(abs(ax0 - bx1), abs(ax1 - bx0))
+            halign = (min(ay1 - ay0, by1 - by0) * laparams.line_overlap < voverlap and
+                      hdistance < max(ax1 - ax0, bx1 - bx0) * laparams.char_margin)
+        if laparams.detect_vertical and bx0 <= ax1 and ax0 <= bx1:
+            hoverlap = min(abs(ax0 - bx1), abs(ax1 - bx0))
+            vdistance = 0 if (by0 <= ay1 and ay0 <= by1) else \
+                min(abs(ay0 - by1), abs(ay1 - by0))
+            valign = (min(ax1 - ax0, bx1 - bx0) * laparams.line_overlap < hoverlap and
+                      vdistance < max(ay1 - ay0, by1 - by0) * laparams.char_margin)
+        return halign, valign
+
+    def _new_line(self, char):
+        return [char[0], char[1], char[2], char[3], [char[4]], char[2]]
+
+    def _add_char(self, line, char):
+        (x0, y0, x1, y1, text) = char
+        word_margin = self.laparams.word_margin
+        # LTTextLineHorizontal compares with the last character only
+        if word_margin and line[5] < x0 - word_margin * max(x1 - x0, y1 - y0):
+            line[4].append(u' ')
+        line[4].append(text)
+        line[0] = min(line[0], x0)
+        line[1] = min(line[1], y0)
+        line[2] = max(line[2], x1)
+        line[3] = max(line[3], y1)
+        line[5] = x1
+
+    def _group_lines(self, lines):
+        """
+        Groups lines into boxes like LTLayoutContainer.group_textlines,
+        lines closer than line_margin times their height and aligned on
+        either side end up in the same box. Returns (x0, y0, x1, y1, text)
+        of every box.
+        """
+        if not lines:
+            return []
+        line_margin = self.laparams.line_margin
+        parent = range(len(lines))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def is_neighbor(line, other):
+            d = line_margin * (line[3] - line[1])
+            return (not (other[2] <= line[0] or line[2] <= other[0] or
+                         other[3] <= line[1] - d or line[3] + d <= other[1]) and
+                    abs((other[3] - other[1]) - (line[3] - line[1])) < d and
+                    (abs(other[0] - line[0]) < d or abs(other[2] - line[2]) < d))
+
+        max_d = line_margin * max(line[3] - line[1] for line in lines)
+        order = sorted(range(len(lines)), key=lambda i: lines[i][1])
+        for position, i in enumerate(order):
+            line = lines[i]
+            limit = line[3] + max_d
+            for j in order[position + 1:]:
+                other = lines[j]
+                if other[1] >= limit:
+                    break
+                if is_neighbor(line, other) or is_neighbor(other, line):
+                    parent[find(j)] = find(i)
+
+        members = defaultdict(list)
+        for i in range(len(lines)):
+            members[find(i)].append(i)
+        boxes = []
+        for indexes in members.itervalues():
+            indexes.sort(key=lambda i: (-lines[i][3], i))
+            box_lines = [lines[i] for i in indexes]
+            boxes.append((min(line[0] for line in box_lines),
+                          min(line[1] for line in box_lines),
+                          max(line[2] for line in box_lines),
+                          max(line[3] for line in box_lines),
+                          u''.join(u''.join(line[4]) + u'\n' for line in box_lines)))
+        return boxes
+
+# pdfminer devices the text blocks of a page can be taken from
+TEXT_DEVICES = {"aggregator": PDFPageAggregator,
+                "runs": TextRunDevice}
+
 class PdfParser:
 
     """
@@ -44,15 +1858,72 @@ class PdfParser:
         # Where all the output text from the pdf parser is stored. 
         #Initialize output text as key value pairs
 
+        self.conf = conf
         self.parsed_output_text = {}
-        self.horizontal_dict = defaultdict(lambda : defaultdict(list))
-        # Innitializing the input PDF file
+        # Innitializing the input PDF file, a path, an in-memory document or
+        # a file object, see open_pdf_input
         self.input_pdf_file = conf.get("input_pdf_file",  \
                               DEFAULTS["input_pdf_file"])
+        self.input_name = pdf_input_name(self.input_pdf_file)
+        # DocumentMetrics of the document, None unless metrics are enabled
+        self.metrics = DocumentMetrics(self.input_name) \
+            if conf.get("metrics", DEFAULTS["metrics"]) else None
+        self.horizontal_dict = defaultdict(CountingPageRows if self.metrics else PageRows)
+        # Tracer of the extractors, None unless tracing is enabled
+        trace_level = conf.get("trace_level", DEFAULTS["trace_level"])
+        self.tracer = Tracer(self.input_name, trace_level,
+                             conf.get("trace_extractors", DEFAULTS["trace_extractors"])) \
+            if trace_level else None
 
         self.horizontal_table = defaultdict(list)
         #TODO: Bad design, need to redesign it again
         self.page_number = 0
+        self.page_processes = conf.get("page_processes", \
+                              DEFAULTS["page_processes"])
+        self.row_tolerance = conf.get("row_tolerance", \
+                              DEFAULTS["row_tolerance"])
+        self.layout_cache_dir = conf.get("layout_cache_dir", \
+                              DEFAULTS["layout_cache_dir"])
+        self.layout_cache_max_bytes = conf.get("layout_cache_max_bytes", \
+                              DEFAULTS["layout_cache_max_bytes"])
+        self.result_cache_dir = conf.get("result_cache_dir", \
+                              DEFAULTS["result_cache_dir"])
+        self.result_cache_max_bytes = conf.get("result_cache_max_bytes", \
+                              DEFAULTS["result_cache_max_bytes"])
+        self.result_cache_ttl = conf.get("result_cache_ttl", \
+                              DEFAULTS["result_cache_ttl"])
+        self.page_prescan = conf.get("page_prescan", \
+                              DEFAULTS["page_prescan"])
+        self.layout_profile = conf.get("layout_profile", \
+                              DEFAULTS["layout_profile"])
+        self.text_device = conf.get("text_device", \
+                              DEFAULTS["text_device"])
+        self.font_cache_size = conf.get("font_cache_size", \
+                              DEFAULTS["font_cache_size"])
+        # Sections run on every page, all of them when None, and company
+        # record fields read, all of them when None
+        self.fields = conf.get("fields", DEFAULTS["fields"])
+        self.sections = select_sections(conf.get("tables", DEFAULTS["tables"]), self.fields)
+        if self.fields is not None:
+            self.fields = frozenset(self.fields)
+        # Sections found on the pages parsed so far and sections closed, see
+        # PdfParserProvider._sections_closed
+        self.found_sections = set()
+        self.closed_sections = set()
+        # Company record labels yet to be seen, by number of rows
+        self.company_labels = defaultdict(int)
+        for field in self.fields if self.fields is not None else COMPANY_RECORD_FIELD_LABELS:
+            self.company_labels[COMPANY_RECORD_FIELD_LABELS[field]] += 1
+        self.profile_dir = conf.get("profile_dir", \
+                              DEFAULTS["profile_dir"])
+        self.profile_keep = conf.get("profile_keep", \
+                              DEFAULTS["profile_keep"])
+        if self.profile_dir and self.profile_keep < 1:
+            raise ValueError("profile_keep must be at least 1, got %r" % self.profile_keep)
+        # SHA-256 of the input file, computed when a cache needs it
+        self.input_sha256 = None
+        # whether the results came from the result cache
+        self.result_cache_hit = False
 
         #initializing all the fields as blank for now
         self.company_record = {
@@ -80,11 +1951,15 @@ class PdfParser:
                 'audit_firm_name':'',
                 'organization':'',
             }
-        self.charges = []
-        self.capital_details = []
-        self.paidup_capital_details = []
-        self.shareholders_details = []
+        # duplicate charges, capital and shareholders are dropped when they
+        # are appended
+        self.charges = RecordList()
+        self.capital_details = RecordList()
+        self.paidup_capital_details = RecordList()
+        self.shareholders_details = RecordList()
         self.shareholder_type_details = []
+        # number of shareholders parsed so far for each group share
+        self.shareholder_type_counts = defaultdict(int)
         self.officers_details = []
         self.pending_officers_table = None
         self.pending_shareholders_table = None
@@ -93,15 +1968,338 @@ class PdfParser:
         self.ordinary_num = None
         self.currency = None
 
+    def get_results(self):
+        """
+        Returns the company record and all the tables parsed so far
+        """
+        return {'company_record': self.company_record,
+                'charges': self.charges,
+                'capital_details': self.capital_details,
+                'paidup_capital_details': self.paidup_capital_details,
+                'shareholders_details': self.shareholders_details,
+                'shareholder_type_details': self.shareholder_type_details,
+                'officers_details': self.officers_details}
+
+class _FieldLog(dict):
+
+    """
+    Company record which remembers the fields written to it since `written`
+    was last reset
+    """
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.written = {}
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.written[key] = value
+
+def _record_key(record):
+    """
+    Identity of a record: all its fields in a fixed order
+    """
+    if isinstance(record, Record):
+        return record.key()
+    return tuple(sorted(record.items()))
+
+def _get_page_state(parser_obj):
+    return tuple(getattr(parser_obj, attr) for attr in PAGE_STATE_ATTRS)
+
+def _selected_field(parser_obj, field):
+    return parser_obj.fields is None or field in parser_obj.fields
+
+def _table_sizes(parser_obj):
+    if parser_obj.sections is None:
+        return None
+    return dict((table, len(getattr(parser_obj, table))) for table in PAGE_RESULT_TABLES)
+
+def _has_open_table(parser_obj):
+    """
+    Whether the next page may go on with a table of this one: a row is
+    pending or a group share is open, see _continue_group_share
+    """
+    if parser_obj.shareholder_type is not None:
+        return True
+    for attr in OPEN_TABLE_ATTRS:
+        if getattr(parser_obj, attr) is not None:
+            return True
+    return False
+
+def _page_state_key(parser_obj):
+    """
+    Comparable snapshot of everything a page's extraction reads from the
+    previous pages: the open tables, the open group share and the number of
+    shareholders of the open groups read so far
+    """
+    state_key = [_record_key(value) if isinstance(value, (dict, Record)) else value
+                 for value in _get_page_state(parser_obj)]
+    groups = set([parser_obj.shareholder_type])
+    if parser_obj.pending_shareholders_type_table is not None:
+        groups.add(parser_obj.pending_shareholders_type_table.shareholder_type)
+    state_key.append(sorted((group, parser_obj.shareholder_type_counts.get(group, 0))
+                            for group in groups if group))
+    return state_key
+
 class PdfParserProvider:
 
     """
     This class is used to provide the implementation for the PdfParser class
     """
-    def load_pdf_file(self,parser_obj):
+    def __init__(self):
+        # LayoutCache, ResultCache and ProfileCapture objects by class and
+        # directory
+        self.caches = {}
+        # FontCache shared by the documents parsed, created on first use
+        self.font_cache = None
+
+    def load_pdf_file(self,parser_obj, layout_profile=None):
+
+        if parser_obj.profile_dir:
+            profile_capture = self._get_cache(ProfileCapture, parser_obj.profile_dir,
+                                              parser_obj.profile_keep)
+            profile_capture.run(parser_obj, _timed, parser_obj.metrics, "load_pdf_file",
+                                self._load_document, parser_obj, layout_profile)
+        else:
+            _timed(parser_obj.metrics, "load_pdf_file", self._load_document,
+                   parser_obj, layout_profile)
+
+    def _load_document(self, parser_obj, layout_profile):
+        if layout_profile:
+            parser_obj.layout_profile = layout_profile
+        result_cache, result_key = self._get_result_cache(parser_obj)
+        if result_cache:
+            results = result_cache.get(result_key)
+            if results is not None:
+                # Cache hit, the document is not opened at all
+                parser_obj.company_record.update(results['company_record'])
+                for table in PAGE_RESULT_TABLES:
+                    getattr(parser_obj, table).extend(results[table])
+                parser_obj.result_cache_hit = True
+                if parser_obj.metrics:
+                    parser_obj.metrics.counters["result_cache_hits"] += 1
+                return
+
+        # page workers open the document themselves, so only documents
+        # read from a path are parsed in parallel, and a selection of
+        # sections stops at the first page closing them, see
+        # _sections_closed, which needs the pages in order
+        if parser_obj.page_processes > 1 and is_pdf_path(parser_obj.input_pdf_file) and \
+                parser_obj.sections is None:
+            self._load_pdf_file_parallel(parser_obj)
+        else:
+            for page_num in self._process_pages(parser_obj):
+                pass
+
+        if result_cache:
+            result_cache.put(result_key, parser_obj.get_results())
 
+    def iter_records(self, input_pdf_file, conf=None, layout_profile=None,
+                     tables=None, fields=None):
+        """
+        Parses `input_pdf_file`, a path, an in-memory document or a file
+        object (see open_pdf_input), page by page, yielding every record as a
+        ParsedRecord as soon as it is final. Rows and text of a page are
+        dropped once the page is parsed and yielded records are not kept,
+        so memory does not grow with the number of pages. Duplicate records
+        are only dropped against the records of the same and the previous
+        page, the keys of older records are forgotten, whereas
+        load_pdf_file drops them across the whole document. The company
+        record is yielded last. Pages are always parsed serially.
+        `tables` and `fields` select what is parsed, see select_sections.
+        """
+        parser_conf = dict(conf or {})
+        parser_conf["input_pdf_file"] = input_pdf_file
+        if layout_profile:
+            parser_conf["layout_profile"] = layout_profile
+        if tables is not None:
+            parser_conf["tables"] = tables
+        if fields is not None:
+            parser_conf["fields"] = fields
+        parser_obj = PdfParser(parser_conf)
+        for page_num in self._process_pages(parser_obj):
+            del parser_obj.parsed_output_text[page_num + 1]
+            del parser_obj.horizontal_dict[page_num]
+            for table in PAGE_RESULT_TABLES:
+                records = getattr(parser_obj, table)
+                for record in records:
+                    yield ParsedRecord(table, record)
+                if isinstance(records, RecordList):
+                    # the next page is deduplicated against this one only
+                    records.record_keys = set(_record_key(record) for record in records)
+                del records[:]
+        yield ParsedRecord('company_record', parser_obj.company_record)
+
+    def _process_pages(self, parser_obj):
+        """
+        Parses the pages of the document one by one, yielding the number of
+        each page once it has been parsed
+        """
+        laparams = self._get_laparams(parser_obj)
+        layout_cache, layout_key = self._get_layout_cache(parser_obj, laparams)
+        cached_pages = layout_cache.get(layout_key) if layout_cache else None
+        if cached_pages is not None:
+            # Cache hit, pdfminer is not needed at all
+            for page_num in self._process_cached_pages(parser_obj, cached_pages):
+                yield page_num
+            return
+
+        metrics = parser_obj.metrics
+        # text blocks of every page, only kept for the layout cache
+        page_texts = [] if layout_cache else None
         # Open the PDF file
-        file_obj = open(parser_obj.input_pdf_file,'rb')
+        with open_pdf_input(parser_obj.input_pdf_file) as file_obj:
+            document_obj = _timed(metrics, "open", self._open_document, file_obj)
+            pdf_aggregator_obj, interpreter_obj = self._create_interpreter(
+                laparams, parser_obj.text_device, self._get_resource_manager(parser_obj))
+
+            # Create page aggregator object
+            # Process each page contained in the document.
+            for page_num, page in enumerate(PDFPage.create_pages(document_obj)):
+                page_start = time.time()
+                table_sizes = _table_sizes(parser_obj)
+                if page.annots:
+                    self._build_annotations(page)
+                skipped = parser_obj.page_prescan and \
+                    _timed(metrics, "prescan", self._can_skip_page, parser_obj, page, page_num,
+                           interpreter_obj.rsrcmgr)
+                if skipped:
+                    page_text, anchors = [], {}
+                else:
+                    _timed(metrics, "layout", interpreter_obj.process_page, page)
+                    page_text, anchors = self._get_text(parser_obj, pdf_aggregator_obj, page_num)
+                if metrics:
+                    metrics.add_page(page_num, time.time() - page_start, len(page_text),
+                                     len(parser_obj.horizontal_dict[page_num]), skipped)
+                parser_obj.page_number = page_num
+                #TODO: Need to copy the data into parsed_output_text variable
+                parser_obj.parsed_output_text[page_num + 1] = page_text
+                if layout_cache:
+                    page_texts.append(page_text)
+                closed = self._sections_closed(parser_obj, page_num, table_sizes, anchors)
+                yield page_num
+                if closed:
+                    # the layout of the rest of the document is not cached
+                    return
+        if layout_cache:
+            layout_cache.put(layout_key, page_texts)
+
+    def _process_cached_pages(self, parser_obj, cached_pages):
+        metrics = parser_obj.metrics
+        for page_num, page_text in enumerate(cached_pages):
+            page_start = time.time()
+            table_sizes = _table_sizes(parser_obj)
+            _timed(metrics, "rows", self._add_text_blocks, parser_obj, page_text, page_num)
+            anchors = _timed(metrics, "extract", self._populate_tables, parser_obj, page_num)
+            if metrics:
+                metrics.add_page(page_num, time.time() - page_start, len(page_text),
+                                 len(parser_obj.horizontal_dict[page_num]))
+            parser_obj.page_number = page_num
+            parser_obj.parsed_output_text[page_num + 1] = page_text
+            closed = self._sections_closed(parser_obj, page_num, table_sizes, anchors)
+            yield page_num
+            if closed:
+                return
+
+    def _sections_closed(self, parser_obj, page_num, table_sizes, anchors):
+        """
+        Records the sections found on page `page_num` and returns whether
+        every selected section has been found and closed, always False
+        when all sections are parsed. Sections of a bizfile follow each
+        other: a table section is found on the pages holding its anchor,
+        adding to its table or leaving its pending table open and is closed
+        by the first page after them which does neither. The company record
+        is closed once the labels of all its selected fields were seen, the
+        labels it is still missing when the first table is reached are not
+        in the document, but for COMPANY_RECORD_TRAILING_LABELS: selecting
+        audit_firm_name, which all the company record fields include, reads
+        the document to its end. `table_sizes` are the sizes of the tables
+        before the page and `anchors` the section anchors of the page, see
+        _populate_tables.
+        """
+        if parser_obj.sections is None:
+            return False
+        page_values = parser_obj.horizontal_dict[page_num]
+        for key in anchors.get('company_record', ()):
+            for t in dict.get(page_values, key, ()):
+                label = 'Date:' if t.text.startswith('Date:') else t.text
+                if label in parser_obj.company_labels:
+                    parser_obj.company_labels[label] -= 1
+                    if parser_obj.company_labels[label] <= 0:
+                        del parser_obj.company_labels[label]
+        if parser_obj.company_labels and any(section in anchors for section in TABLE_ANCHOR_SECTIONS):
+            for label in parser_obj.company_labels.keys():
+                if label not in COMPANY_RECORD_TRAILING_LABELS:
+                    del parser_obj.company_labels[label]
+        for table, section in TABLE_SECTIONS.iteritems():
+            if section not in parser_obj.sections or section in parser_obj.closed_sections:
+                continue
+            if section == 'company_record':
+                if not parser_obj.company_labels:
+                    parser_obj.closed_sections.add(section)
+                continue
+            if section == 'shareholder_type':
+                # the page heading routes every page to the group shares,
+                # which are found by the group they leave open instead
+                found = parser_obj.shareholder_type is not None
+            else:
+                found = section in anchors
+            pending_table = SECTION_PENDING_TABLES.get(section)
+            found = found or len(getattr(parser_obj, table)) > table_sizes[table] or \
+                (pending_table is not None and getattr(parser_obj, pending_table) is not None)
+            if found:
+                parser_obj.found_sections.add(section)
+            elif section in parser_obj.found_sections:
+                parser_obj.closed_sections.add(section)
+        if parser_obj.closed_sections >= parser_obj.sections:
+            logger.info("Stopping %s after page %d, the selected sections are parsed",
+                        parser_obj.input_name, page_num + 1)
+            return True
+        return False
+
+    def _get_cache(self, cache_class, directory, *args):
+        # also used for the ProfileCapture of a directory
+        cache = self.caches.get((cache_class, directory))
+        if cache is None:
+            cache = self.caches[(cache_class, directory)] = cache_class(directory, *args)
+        return cache
+
+    def _get_input_sha256(self, parser_obj):
+        if parser_obj.input_sha256 is None:
+            parser_obj.input_sha256 = pdf_input_sha256(parser_obj.input_pdf_file)
+        return parser_obj.input_sha256
+
+    def _get_layout_cache(self, parser_obj, laparams):
+        """
+        Returns the LayoutCache to use for `parser_obj` and the key of its
+        document, or (None, None) when caching is disabled
+        """
+        if not parser_obj.layout_cache_dir:
+            return None, None
+        layout_cache = self._get_cache(LayoutCache, parser_obj.layout_cache_dir,
+                                       parser_obj.layout_cache_max_bytes)
+        return layout_cache, layout_cache.key(self._get_input_sha256(parser_obj), laparams,
+                                              parser_obj.page_prescan,
+                                              parser_obj.text_device)
+
+    def _get_result_cache(self, parser_obj):
+        """
+        Returns the ResultCache to use for `parser_obj` and the key of its
+        document, or (None, None) when caching is disabled
+        """
+        if not parser_obj.result_cache_dir:
+            return None, None
+        result_cache = self._get_cache(ResultCache, parser_obj.result_cache_dir,
+                                       parser_obj.result_cache_max_bytes,
+                                       parser_obj.result_cache_ttl)
+        return result_cache, result_cache.key(self._get_input_sha256(parser_obj),
+                                              self._get_laparams(parser_obj),
+                                              parser_obj.row_tolerance,
+                                              parser_obj.page_prescan,
+                                              parser_obj.text_device,
+                                              parser_obj.sections and sorted(parser_obj.sections),
+                                              parser_obj.fields and sorted(parser_obj.fields))
+
+    def _open_document(self, file_obj):
 
         # Create the parser object associated with the file object
         pdf_parser_obj = PDFParser(file_obj)
@@ -114,38 +2312,291 @@ class PdfParserProvider:
         pdf_parser_obj.set_document(document_obj)
 
         # document_obj.set_parser(parser_obj)
+        return document_obj
 
-        # Create a resource manager object that stores
-        # shared resources
-        resource_manager_obj = PDFResourceManager()
+    def _get_laparams(self, parser_obj):
 
         #Set parameters for analysis
-        laparams = LAParams(detect_vertical=True, all_texts=True, line_margin=0.1)
+        if parser_obj.layout_profile not in LAYOUT_PROFILES:
+            raise ValueError("Unknown layout profile %r, expected one of %s" % \
+                             (parser_obj.layout_profile, ", ".join(sorted(LAYOUT_PROFILES))))
+        laparams = LAParams(**LAYOUT_PROFILES[parser_obj.layout_profile])
+        return laparams
+
+    def _get_resource_manager(self, parser_obj):
+        """
+        Returns the resource manager of a document about to be opened: the
+        FontCache of the provider, or a new PDFResourceManager when
+        font_cache_size is 0
+        """
+        if not parser_obj.font_cache_size:
+            return PDFResourceManager()
+        if self.font_cache is None:
+            self.font_cache = FontCache(parser_obj.font_cache_size)
+        self.font_cache.size = parser_obj.font_cache_size
+        self.font_cache.begin_document()
+        return self.font_cache
+
+    def _create_interpreter(self, laparams, text_device="aggregator", resource_manager_obj=None):
+
+        if text_device not in TEXT_DEVICES:
+            raise ValueError("Unknown text device %r, expected one of %s" % \
+                             (text_device, ", ".join(sorted(TEXT_DEVICES))))
+        # Create a resource manager object that stores
+        # shared resources, unless the one of the provider is given
+        if resource_manager_obj is None:
+            resource_manager_obj = PDFResourceManager()
 
-        #laparams = LAParams(detect_vertical=True,line_margin=0.3)
         #Create PDF aggregator object
-        pdf_aggregator_obj = PDFPageAggregator(resource_manager_obj, \
+        pdf_aggregator_obj = TEXT_DEVICES[text_device](resource_manager_obj, \
                                                   laparams=laparams)
 
         # Create a PDF interpreter object.
         interpreter_obj = PDFPageInterpreter(resource_manager_obj, \
                                                pdf_aggregator_obj)
+        return pdf_aggregator_obj, interpreter_obj
 
-        # Create page aggregator object
-        # Process each page contained in the document.
-        for page_num, page in enumerate(PDFPage.create_pages(document_obj)):
-            interpreter_obj.process_page(page)
-            if page.annots:
-                self._build_annotations(page)
-            page_text = self._get_text(parser_obj, pdf_aggregator_obj, page_num)
-            parser_obj.page_number = page_num
-            #TODO: Need to copy the data into parsed_output_text variable
-            parser_obj.parsed_output_text[page_num + 1] = page_text
+    def _load_pdf_file_parallel(self, parser_obj):
+        """
+        Runs layout analysis and the table extractors for contiguous chunks
+        of pages on a pool of workers and stitches the chunks back together.
+        The result is the same as the serial load_pdf_file.
+        """
+        layout_cache, layout_key = self._get_layout_cache(
+            parser_obj, self._get_laparams(parser_obj))
+        cached_pages = layout_cache.get(layout_key) if layout_cache else None
+        if cached_pages is not None:
+            for page_num in self._process_cached_pages(parser_obj, cached_pages):
+                pass
+            return
+
+        with open_pdf_input(parser_obj.input_pdf_file) as file_obj:
+            page_count = sum(1 for _ in PDFPage.create_pages(self._open_document(file_obj)))
+        if not page_count:
+            return
+        processes = min(parser_obj.page_processes, page_count)
+        chunk_size = -(-page_count // processes)
+        # the layout profile may have been given to load_pdf_file
+        chunk_conf = dict(parser_obj.conf, layout_profile=parser_obj.layout_profile)
+        tasks = [(chunk_conf, start, min(start + chunk_size, page_count))
+                 for start in range(0, page_count, chunk_size)]
+
+        pool = multiprocessing.Pool(processes)
+        try:
+            chunks = pool.map(_parse_page_chunk, tasks)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+        for chunk, chunk_metrics in chunks:
+            for page_result in chunk:
+                self._stitch_page(parser_obj, page_result)
+            if parser_obj.metrics:
+                parser_obj.metrics.merge(chunk_metrics)
+        if layout_cache:
+            layout_cache.put(layout_key, [parser_obj.parsed_output_text[page_num + 1]
+                                          for page_num in range(page_count)])
+
+    def _parse_page_chunk(self, parser_conf, start, stop):
+        """
+        Parses pages [start, stop) starting from a fresh PdfParser state.
+        Every page is returned as a PageResult holding its text blocks, the
+        state it was parsed from, the records it finished and the open
+        (pending) rows it left behind. Returns the PageResults and the
+        DocumentMetrics of the chunk, None unless metrics are enabled.
+        """
+        parser_obj = PdfParser(parser_conf)
+        metrics = parser_obj.metrics
+        parser_obj.company_record = _FieldLog(parser_obj.company_record)
+        page_results = []
+        with open_pdf_input(parser_obj.input_pdf_file) as file_obj:
+            document_obj = self._open_document(file_obj)
+            pdf_aggregator_obj, interpreter_obj = self._create_interpreter(
+                self._get_laparams(parser_obj), parser_obj.text_device,
+                self._get_resource_manager(parser_obj))
+            for page_num, page in enumerate(PDFPage.create_pages(document_obj)):
+                if page_num < start:
+                    continue
+                if page_num >= stop:
+                    break
+                # page_number still points at the previous page while a page
+                # is being parsed, see load_pdf_file
+                parser_obj.page_number = max(page_num - 1, 0)
+                state_key = _page_state_key(parser_obj)
+                table_sizes = dict((table, len(getattr(parser_obj, table)))
+                                   for table in PAGE_RESULT_TABLES)
+                parser_obj.company_record.written = {}
+
+                page_start = time.time()
+                if page.annots:
+                    self._build_annotations(page)
+                skipped = parser_obj.page_prescan and \
+                    _timed(metrics, "prescan", self._can_skip_page, parser_obj, page, page_num,
+                           interpreter_obj.rsrcmgr)
+                if skipped:
+                    page_text = []
+                else:
+                    _timed(metrics, "layout", interpreter_obj.process_page, page)
+                    page_text = _timed(metrics, "text_blocks", self._get_text_blocks,
+                                       parser_obj, pdf_aggregator_obj)
+                    _timed(metrics, "rows", self._add_text_blocks, parser_obj, page_text, page_num)
+                    try:
+                        _timed(metrics, "extract", self._populate_tables, parser_obj, page_num)
+                    except Exception:
+                        # The page only parses from the state left by the
+                        # previous chunk, it will be re-extracted while
+                        # stitching
+                        state_key = None
+
+                records = dict((table, getattr(parser_obj, table)[table_sizes[table]:])
+                               for table in PAGE_RESULT_TABLES)
+                page_results.append(PageResult(
+                    page_num, page_text, dict(parser_obj.horizontal_dict[page_num]),
+                    state_key, copy.deepcopy(_get_page_state(parser_obj)),
+                    parser_obj.company_record.written, records, skipped))
+                if metrics:
+                    metrics.add_page(page_num, time.time() - page_start, len(page_text),
+                                     len(parser_obj.horizontal_dict[page_num]), skipped)
+                parser_obj.page_number = page_num
+        return page_results, metrics
+
+    def _stitch_page(self, parser_obj, page_result):
+        """
+        Merges a PageResult into `parser_obj`. When the state the page was
+        parsed from differs from the state left by the previous page (a
+        table was left open at the end of the previous chunk) the page is
+        re-extracted from its text blocks instead. A page the pre-scan
+        skipped is laid out here if the previous page left a table open.
+        """
+        page_num = page_result.page_num
+        page_text = page_result.text
+        parser_obj.page_number = max(page_num - 1, 0)
+        if _page_state_key(parser_obj) != page_result.state_key:
+            if page_result.skipped and _has_open_table(parser_obj):
+                page_text = self._layout_page(parser_obj, page_num)
+            self._add_text_blocks(parser_obj, page_text, page_num)
+            self._populate_tables(parser_obj, page_num)
+        else:
+            parser_obj.horizontal_dict[page_num].update(page_result.rows)
+            parser_obj.company_record.update(page_result.company_fields)
+            for table, records in page_result.records.iteritems():
+                getattr(parser_obj, table).extend(records)
+            for record in page_result.records['shareholder_type_details']:
+                parser_obj.shareholder_type_counts[record.shareholder_type] += 1
+            for attr, value in zip(PAGE_STATE_ATTRS, page_result.state):
+                setattr(parser_obj, attr, value)
+        parser_obj.page_number = page_num
+        parser_obj.parsed_output_text[page_num + 1] = page_text
+
+    def _layout_page(self, parser_obj, page_num):
+        """
+        Returns the text blocks of a single page of the document
+        """
+        with open_pdf_input(parser_obj.input_pdf_file) as file_obj:
+            document_obj = self._open_document(file_obj)
+            pdf_aggregator_obj, interpreter_obj = self._create_interpreter(
+                self._get_laparams(parser_obj), parser_obj.text_device,
+                self._get_resource_manager(parser_obj))
+            for index, page in enumerate(PDFPage.create_pages(document_obj)):
+                if index == page_num:
+                    interpreter_obj.process_page(page)
+                    return self._get_text_blocks(parser_obj, pdf_aggregator_obj)
+        return []
+
+    def _can_skip_page(self, parser_obj, page, page_num, rsrcmgr):
+        """
+        Pre-scan of a page deciding whether its layout analysis can be
+        skipped: no table may be open and the text of the page, read from
+        its content streams, must not contain any section anchor
+        """
+        if _has_open_table(parser_obj):
+            return False
+        page_text = self._prescan_page_text(page, rsrcmgr)
+        if page_text is None:
+            return False
+        for anchor in PRESCAN_ANCHORS:
+            if anchor in page_text:
+                return False
+        logger.info("Skipping layout of page %d of %s: no section anchor and no open table",
+                    page_num + 1, parser_obj.input_name)
+        return True
+
+    def _prescan_page_text(self, page, rsrcmgr):
+        """
+        Returns the text shown by the content streams of `page` with all
+        whitespace removed, the strings decoded by the fonts `rsrcmgr`
+        creates for the page like the interpreter does, or None when the
+        text cannot be read without rendering the page (characters without
+        unicode, unknown fonts or form XObjects)
+        """
+        resources = resolve1(page.resources) or {}
+        fonts = {}
+        for font_id, spec in (resolve1(resources.get('Font')) or {}).iteritems():
+            objid = spec.objid if isinstance(spec, PDFObjRef) else None
+            fonts[font_id] = rsrcmgr.get_font(objid, resolve1(spec))
+        xobjects = resolve1(resources.get('XObject')) or {}
+        try:
+            content_parser = PDFContentParser(page.contents)
+        except PSEOF:
+            return ''
+        strings = []
+        operands = []
+        # font of the graphics state, and of the states saved by q
+        font = None
+        saved_fonts = []
+        while 1:
+            try:
+                (_, obj) = content_parser.nextobject()
+            except PSEOF:
+                break
+            if isinstance(obj, PSKeyword):
+                name = keyword_name(obj)
+                if name in TEXT_OPERATORS and font is not None:
+                    for operand in operands:
+                        if isinstance(operand, list):
+                            texts = [string for string in operand if isinstance(string, str)]
+                        elif isinstance(operand, str):
+                            texts = [operand]
+                        else:
+                            continue
+                        for text in texts:
+                            try:
+                                strings.extend(font.to_unichr(cid) for cid in font.decode(text))
+                            except PDFUnicodeNotDefined:
+                                return None
+                elif name == 'Tf' and operands:
+                    font = fonts.get(getattr(operands[0], 'name', None))
+                    if font is None:
+                        return None
+                elif name == 'q':
+                    saved_fonts.append(font)
+                elif name == 'Q' and saved_fonts:
+                    font = saved_fonts.pop()
+                elif name == 'Do' and operands:
+                    xobject = resolve1(xobjects.get(getattr(operands[-1], 'name', None)))
+                    if getattr(xobject, 'get', None) is None or \
+                            getattr(xobject.get('Subtype'), 'name', None) == 'Form':
+                        return None
+                operands = []
+            else:
+                operands.append(obj)
+        return u''.join(u''.join(strings).split())
 
     """
     To fetch the text from the pdf_aggregator_obj
     """
     def _get_text(self, parser_obj, pdf_aggregator_obj, page_num):
+        metrics = parser_obj.metrics
+        temporary_text = _timed(metrics, "text_blocks", self._get_text_blocks,
+                                parser_obj, pdf_aggregator_obj)
+        _timed(metrics, "rows", self._add_text_blocks, parser_obj, temporary_text, page_num)
+        anchors = _timed(metrics, "extract", self._populate_tables, parser_obj, page_num)
+        return temporary_text, anchors
+
+    def _get_text_blocks(self, parser_obj, pdf_aggregator_obj):
+        if isinstance(pdf_aggregator_obj, TextRunDevice):
+            return pdf_aggregator_obj.get_text_blocks(1000 * parser_obj.page_number)
         temporary_text = []
         layout = pdf_aggregator_obj.get_result()
         for layout_obj in layout:
@@ -156,504 +2607,395 @@ class PdfParserProvider:
                     layout_obj_z = round(layout_obj.height, 2)
                     temporary_text.append( TextBlock(layout_obj.x0, \
                             layout_obj_y1, layout_obj_z, layout_obj.get_text().strip()) )
-                    #TODO: Not the pythonic way to write the code
-                    #Need to fix it
-                    page_nos = parser_obj.horizontal_dict.keys()
-                    keys = [parser_obj.horizontal_dict[pageno].keys() for pageno in page_nos]
-                    if layout_obj_y1 in keys:
-                        parser_obj.horizontal_dict[page_num][layout_obj_y1].append( \
-                                TextBlock(layout_obj.x0, layout_obj_y1, layout_obj_z, layout_obj.get_text().strip()))
-                    elif (layout_obj_y1 + 4) in keys:
-                        parser_obj.horizontal_dict[page_num][layout_obj_y1 + 4].append( \
-                                TextBlock(layout_obj.x0, layout_obj_y1, layout_obj_z, layout_obj.get_text().strip()))
-                    elif (layout_obj_y1 - 4) in keys:
-                        parser_obj.horizontal_dict[page_num][layout_obj_y1 - 4].append( \
-                                TextBlock(layout_obj.x0, layout_obj_y1, layout_obj_z, layout_obj.get_text().strip()))
-                    else:
-                        parser_obj.horizontal_dict[page_num][layout_obj_y1].append(
-                             TextBlock(layout_obj.x0, layout_obj_y1, layout_obj_z, layout_obj.get_text().strip()))
+        return temporary_text
 
-        #Appending the key value pairs in the dictionary
+    def _add_text_blocks(self, parser_obj, text_blocks, page_num):
+        """
+        Groups the text blocks of a page into rows of horizontal_dict
+        """
         page_values = parser_obj.horizontal_dict[page_num]
-        self.populate_company_record_table(parser_obj, page_values)
-        self.populate_charges_record_table(parser_obj, page_values)
-        self.populate_share_capital_table(parser_obj, page_values)
-        self.populate_paidup_capital_table(parser_obj, page_values)
-        self.populate_officers_and_representatives(parser_obj, page_values)
-        self.populate_shareholders_table(parser_obj, page_values)
-        self.populate_shareholder_type_table(parser_obj, page_values)
-        return temporary_text
+        for text_block in text_blocks:
+            row = page_values.row_index.find(text_block.y, parser_obj.row_tolerance)
+            page_values[text_block.y if row is None else row].append(text_block)
 
+    def _populate_tables(self, parser_obj, page_num):
+        """
+        Runs the extractors of the sections anchored on page `page_num`,
+        returns the anchors of the page, see _find_section_anchors
+        """
+        page_values = parser_obj.horizontal_dict[page_num]
+        anchors = self._find_section_anchors(page_values)
+        tracer = parser_obj.tracer
+        if tracer:
+            tracer.anchors(page_num, page_values, anchors)
+        for section, extractor in SECTION_EXTRACTORS:
+            if section in anchors and (parser_obj.sections is None or section in parser_obj.sections):
+                if tracer and tracer.traces(extractor):
+                    tracer.run_extractor(self, parser_obj, extractor, page_values, anchors[section])
+                elif parser_obj.metrics:
+                    self._measure_extractor(parser_obj, extractor, page_values, anchors[section])
+                else:
+                    getattr(self, extractor)(parser_obj, page_values, anchors[section])
+        return anchors
 
+    def _measure_extractor(self, parser_obj, extractor, page_values, anchor_keys):
+        """
+        Runs an extractor recording its time, the rows it looked up, its
+        row index queries and the records it added
+        """
+        counters = parser_obj.metrics.extractors[extractor]
+        visits = page_values.visits
+        probes = page_values.row_index.probes
+        records = sum(len(getattr(parser_obj, table)) for table in PAGE_RESULT_TABLES)
+        start = time.time()
+        try:
+            getattr(self, extractor)(parser_obj, page_values, anchor_keys)
+        finally:
+            parser_obj.metrics.add_time(extractor, time.time() - start)
+            counters["calls"] += 1
+            counters["rows_visited"] += page_values.visits - visits
+            counters["index_probes"] += page_values.row_index.probes - probes
+            counters["records"] += sum(len(getattr(parser_obj, table))
+                                       for table in PAGE_RESULT_TABLES) - records
+
+    def _find_section_anchors(self, page_values):
+        """
+        Single pass over the rows of a page returning the keys of the rows
+        each section has to look at. Every extractor still checks its rows
+        itself, so rows may be routed to sections which end up ignoring
+        them.
+        """
+        anchors = defaultdict(list)
+        for key, list_of_t in page_values.iteritems():
+            sections = set()
+            for t in list_of_t:
+                section = SECTION_ANCHORS.get(t.text)
+                if section:
+                    sections.add(section)
+                if t.text.startswith('Date:'):
+                    sections.add('company_record')
+                if t.text.startswith('Group Share : '):
+                    sections.add('shareholder_type')
+                if '\n' in t.text and OFFICERS_ANCHOR in t.text.split("\n"):
+                    sections.add('officers')
+            for section in sections:
+                anchors[section].append(key)
+        return anchors
+
+
+
+    def walk_table(self, parser_obj, page_values, spec, row, add=None, **fields):
+        """
+        Reads the records of table `spec` from `row`, its first row on the
+        page, to the end of the table and adds them with `add`, the append
+        of the table of the results by default. New records also get
+        `fields`. The pending record of the table is completed first.
+        Returns the record the page ended in, which is left pending when
+        the table has a pending attribute. The rows walked are traced by
+        the Tracer of the parser, if any.
+        """
+        if add is None:
+            add = getattr(parser_obj, spec.table).append
+        tracer = parser_obj.tracer
+        pending = getattr(parser_obj, spec.pending) if spec.pending else None
+        if pending is not None and row is not None:
+            setattr(parser_obj, spec.pending, None)
+            row = self._resume_table_record(page_values, spec, pending, row, tracer)
+            add(pending)
+        if row is None or not self._is_table_line(spec, spec.lines[0], page_values.sort_by_x(row)):
+            return None
+        fields = dict(spec.defaults, **fields)
+        # _read_table_record only returns rows of the first line
+        while row is not None:
+            record = spec.record_class(**fields)
+            row, page_ended = self._read_table_record(page_values, spec, record, 0, row,
+                                                      tracer=tracer)
+            if page_ended:
+                if spec.pending:
+                    setattr(parser_obj, spec.pending, record)
+                return record
+            add(record)
+        return None
+
+    def _first_table_row(self, page_values, spec, key, tracer=None):
+        """
+        Returns the first row of table `spec`, one of its header heights
+        below its anchor at `key`, or None. The row is traced by `tracer`.
+        """
+        for height in spec.header_heights:
+            row = page_values.row_index.find(key - height, ROW_PROBE_TOLERANCE)
+            if row is not None:
+                break
+        if tracer:
+            tracer.table_row(spec, row, anchor=key, header_heights=spec.header_heights)
+        return row
+
+    def _next_table_row(self, page_values, spec, key, lines, tracer=None):
+        """
+        Walks down from the row at `key` to the first row which is one of
+        `lines`, for at most spec.row_gap. Returns that row and its line,
+        (None, None) when the page ends first and (row, None) at the anchor
+        of another section. The row is traced by `tracer`.
+        """
+        row_index = page_values.row_index
+        row = row_index.next_below(key)
+        lowest = key - spec.row_gap - ROW_PROBE_TOLERANCE
+        line = None
+        while row is not None and row >= lowest:
+            cells = page_values[row]
+            if not cells:
+                row = row_index.next_below(row)
+                continue
+            if len(cells) > 1:
+                cells = page_values.sort_by_x(row)
+            # anchors and headings are the first text of their row
+            text = cells[0].text
+            if text in SHAREHOLDER_TYPE_HEADINGS:
+                row = None
+                break
+            if text in SECTION_ANCHORS or text.startswith(TABLE_END_PREFIXES):
+                break
+            for line in lines:
+                if len(cells) in line.cells and self._is_table_line(spec, line, cells):
+                    break
+            else:
+                line = None
+            if line is not None:
+                break
+            row = row_index.next_below(row)
+        else:
+            row = None
+        if tracer:
+            tracer.table_row(spec, row, previous=key, line=line and line.name,
+                             expected=[expected.name for expected in lines])
+        return row, line
+
+    def _is_table_line(self, spec, line, cells):
+        if len(cells) not in line.cells:
+            return False
+        if line.label is not None:
+            return line.label in cells[0].text
+        for other in spec.lines:
+            if other.label is not None and other.label in cells[0].text:
+                return False
+        return True
+
+    def _expected_table_lines(self, spec, line_no, next_line):
+        """
+        Lines the row following line `line_no` - 1 of a record may be: the
+        next lines up to the first one which is not optional, then
+        `next_line`, the first line of what follows the record
+        """
+        # the tables are module constants
+        cache_key = (id(spec), line_no, id(next_line))
+        lines = _table_lines_cache.get(cache_key)
+        if lines is None:
+            lines = []
+            for line in spec.lines[line_no:]:
+                lines.append(line)
+                if not line.optional:
+                    break
+            lines.append(next_line)
+            lines = _table_lines_cache[cache_key] = tuple(lines)
+        return lines
+
+    def _read_table_record(self, page_values, spec, record, line_no, row, next_line=None,
+                           tracer=None):
+        """
+        Reads `record` from line `line_no` of table `spec`, which is the
+        row at `row`, on. Returns the row of `next_line`, the first line of
+        the table by default, following the record, None at the end of the
+        table, and whether the page ended before the first spec.complete
+        lines of the record were read. The rows walked are traced by
+        `tracer`.
+        """
+        if next_line is None:
+            next_line = spec.lines[0]
+        while True:
+            cells = page_values[row]
+            for column, field, value_type in spec.lines[line_no].fields:
+                text = cells[column].text
+                if value_type == 'date':
+                    text = parse_date(text)
+                elif value_type == 'int':
+                    text = int(text)
+                setattr(record, field, text)
+            line_no += 1
+            row, line = self._next_table_row(page_values, spec, row,
+                                             self._expected_table_lines(spec, line_no, next_line),
+                                             tracer)
+            if line is None:
+                return None, row is None and line_no < spec.complete
+            if line is next_line:
+                return row, False
+            line_no = spec.lines.index(line)
+
+    def _resume_table_record(self, page_values, spec, record, row, tracer=None):
+        """
+        Completes `record`, pending from the previous page, from `row`, the
+        first row of its table on this page, when that row is one of the
+        lines following the last one read. Returns the row of the next
+        record. The rows walked are traced by `tracer`.
+        """
+        line_no = 0
+        for index, line in enumerate(spec.lines):
+            for column, field, value_type in line.fields:
+                if record[field] != record.defaults.get(field, ''):
+                    line_no = index + 1
+        cells = page_values.sort_by_x(row)
+        for line in self._expected_table_lines(spec, line_no, spec.lines[0]):
+            if self._is_table_line(spec, line, cells):
+                if line is not spec.lines[0]:
+                    row, _ = self._read_table_record(page_values, spec, record,
+                                                     spec.lines.index(line), row, tracer=tracer)
+                return row
+        return row
 
     """
     Populate the table containing charges
     """
-    def populate_charges_record_table(self, parser_obj, page_values):
-        for key, list_of_t in page_values.iteritems():
-            values = [t.text for t in list_of_t]
-            if 'Charge No.' in values:
-                index = self.get_proper_index(key, 28.34, [28.37], page_values)
-                records_id = 0
-                #To check if the Charges table is empty
-                if index in page_values:
-                    charge_table_fields = \
-                        len(page_values[index])
-                else:
-                    charge_table_fields = 0
-
-                while(charge_table_fields == 4):
-                    charge_ids = [charge['charge_no'] \
-                        for charge in parser_obj.charges]
-                    charge_no = page_values[index][0].text
-                    if index in page_values:
-
-                        charges_dict = {'id':'',
-                                        'charge_no':'',
-                                        'date_registered':'',
-                                        'currency':'',
-                                        'amount_secured':'',
-                                        'charge_org':''}
-
-                        charges_dict['charge_no'] = charge_no
-                        date_registered_str = page_values[index][1].text
-                        charges_dict['date_registered'] = datetime.strptime(date_registered_str, '%d/%m/%Y') if date_registered_str else None
-                        charges_dict['amount_secured'] = page_values[index][2].text
-                        charges_dict['charge_org'] = page_values[index][3].text
-                        parser_obj.charges.append(charges_dict)
-                        records_id = records_id + 1
-                        index = self.get_index(index, 36, [24, 28, 48, 36, 26], page_values)
-                    if index in page_values:
-                        charge_table_fields = \
-                            len(page_values[index])
-                    else:
-                        break
-
-        # remove duplicates of charges
-        parser_obj.charges = [dict(t) for t in set([tuple(d.items()) for d in parser_obj.charges])]
-
-    def get_index(self, index, default_index, possible_deltas, page_values):
-        temp_index = [round(index - delta, 2) for delta in possible_deltas if round(index - delta, 2) in page_values]
-        if temp_index:
-            index = temp_index[0]
-        else:
-            index = round((index-default_index),2)
-        return index
-
-    def update_pending_shareholders_table(self, parser_obj, page_values, index):
-        """
-        updates the pending shareholders table by looking at address and ordinary number consecutively.
-        Also updates the index with the next table row after populating the pending table
-        """
-        pending_table = parser_obj.pending_shareholders_table
-        if index in page_values:
-            if index in page_values and not pending_table['address'] and len(page_values[index]) == 1:
-                pending_table['address'] = page_values[index][0].text
-                index = self.get_index(index, 81, [21, 24, 48, 58, 70, 99, 1495], page_values)
-            if(len(page_values[index]) == 2) and pending_table['ordinary_num'] is None:
-                pending_table['ordinary_num'] = page_values[index][0].text
-                pending_table['currency'] = page_values[index][1].text
-                index = self.get_index(index, 81, [21, 24, 48, 47, 58, 70, 99, 1495], page_values)
-            if(len(page_values[index]) == 2) and pending_table['pref_num'] is None:
-                pending_table['pref_num'] = page_values[index][0].text
-                pending_table['pref_currency'] = page_values[index][1].text
-                index = self.get_index(index, 81, [21, 24, 48, 58, 70, 99, 1495], page_values)
-            parser_obj.shareholders_details.append(pending_table)
-            parser_obj.pending_shareholders_table = None
-        return index
+    def populate_charges_record_table(self, parser_obj, page_values, anchor_keys):
+        for key in anchor_keys:
+            self.walk_table(parser_obj, page_values, CHARGES_TABLE,
+                            self._first_table_row(page_values, CHARGES_TABLE, key,
+                                                  parser_obj.tracer))
 
     """
     Populate the table containing shareholders object
     """
-    def populate_shareholders_table(self, parser_obj, page_values):
-        for key, list_of_t in page_values.iteritems():
-            values = [t.text for t in list_of_t]
-            if 'Shareholder(s)' in values:
-                index = self.get_index(key, 74.34, [97.34, 121.34], page_values)
-                records_id = 0
-                #To check if the Charges table is empty
-                if index in page_values:
-                    shareholders_table_fields = \
-                        len(page_values[index])
-                else:
-                    shareholders_table_fields = 0
-
-                while(shareholders_table_fields in [6, 5, 1, 2]):
-                    if index in page_values:
-                        shareholders_dict = {'name':'',
-                                            'address':'',
-                                            'shareholder_id':'',
-                                            'nationality':'',''
-                                            'source_of_address':'',
-                                            'address_changed':None,
-                                            'currency':'',
-                                            'pref_num': None,
-                                            'pref_currency': None,
-                                            'ordinary_num':None,
-                                            'company_record':''}
-
-                        if parser_obj.pending_shareholders_table is None:
-                            # TODO this is a bad fix to detect table end in one of the pdfs
-                            try:
-                                shareholders_dict['shareholder_id'] = page_values[index][2].text
-                            except:
-                                break
-                        shareholders_table_fields == len(page_values[index])
-                        if(shareholders_table_fields == 6) or \
-                           (shareholders_table_fields == 5):
-                            shareholders_dict['name'] = page_values[index][1].text
-                            shareholders_dict['nationality'] = page_values[index][3].text
-                            shareholders_dict['source_of_address'] = page_values[index][4].text
-                            index = round(index-27.0, 2)
-
-                        if not index in page_values:
-                            index = round(index  - 10, 2)
-
-                        if parser_obj.pending_shareholders_table:
-                            index = self.update_pending_shareholders_table(parser_obj, page_values, index)
-                            if index in page_values:
-                                shareholders_table_fields = len(page_values[index])
-                                continue
-                            else:
-                                break
-
-                        if (index in page_values):
-                            shareholders_table_fields = len(page_values[index])
-                            if (shareholders_table_fields == 1):
-                                shareholders_dict['address'] = page_values[index][0].text
-                        #     elif (shareholders_table_fields == 2):
-                        #         shareholders_dict['ordinary_num'] = page_values[index][0].text
-                        #         shareholders_dict['currency'] = page_values[index][1].text
-
-                        index = self.get_index(index, 81, [21, 31, 24, 48, 43, 54, 58, 70, 99, 1495], page_values)
-
-                        if index not in page_values:
-                            parser_obj.pending_shareholders_table = shareholders_dict
-                            break
-                        if (index in page_values):
-                            shareholders_table_fields = len(page_values[index])
-                            if(shareholders_table_fields == 2):
-                                pref_index = round(index - 47, 2)
-                                if "Ordinary(Number)" in page_values[index][0].text:
-                                    index = round(index - 27, 2)
-                                    shareholders_dict['ordinary_num'] = page_values[index][0].text
-                                    shareholders_dict['currency'] = page_values[index][1].text
-                                if pref_index in page_values and 'Preference(Number)' in page_values[pref_index][0].text:
-                                    index = round(pref_index - 27, 2)
-                                    shareholders_dict['pref_num'] = page_values[index][0].text
-                                    shareholders_dict['pref_currency'] = page_values[index][1].text
-                        else:
-                            parser_obj.pending_shareholders_table = shareholders_dict
-                            break
-
-                        parser_obj.shareholders_details.append(shareholders_dict)
-                        records_id = records_id + 1
-                        index = self.get_index(index, 24, [71], page_values)
+    def populate_shareholders_table(self, parser_obj, page_values, anchor_keys):
+        for key in anchor_keys:
+            self.walk_table(parser_obj, page_values, SHAREHOLDERS_TABLE,
+                            self._first_table_row(page_values, SHAREHOLDERS_TABLE, key,
+                                                  parser_obj.tracer))
 
-                    if index in page_values:
-                        shareholders_table_fields = len(page_values[index])
-                    else:
-                        break
-        parser_obj.shareholders_details = \
-            [dict(t) for t in set([tuple(d.items()) \
-            for d in parser_obj.shareholders_details])]
+    def _add_shareholder_type(self, parser_obj, shareholder_type_record):
+        parser_obj.shareholder_type_details.append(shareholder_type_record)
+        parser_obj.shareholder_type_counts[shareholder_type_record.shareholder_type] += 1
 
     def _find_shareholder_type_and_index(self, list_of_t):
         shareholder_index = None
         shareholder_type = None
         for t in list_of_t:
-            shareholder_type_match = re.match(r"Group Share : ([A-Z]) \(Shares co-owned by shareholders listed under this group\)", t.text)
+            shareholder_type_match = GROUP_SHARE_RE.match(t.text)
             shareholder_type = shareholder_type_match.group(1) if shareholder_type_match else None
             shareholder_index = t.y
         return shareholder_type, shareholder_index
 
-    def update_pending_shareholder_type(self, list_of_t, page_values, parser_obj):
-        """
-        need to fix this function for handling pending table values
-        """
-        if len(list_of_t) == 1:
-            # TODO this should be dynamic instead of hardcoding
-            expected_headings = ["WHILST EVERY ENDEAVOR IS MADE TO ENSURE THAT INFORMATION PROVIDED IS UPDATED AND CORRECT. THE AUTHORITY"]
-            if list_of_t[0].text in expected_headings:
-                temp_index = self.get_index(list_of_t[0].y, 99.73, [48.40, 24.34], page_values)
-                # TODO this function needs to be fixed to hanlde pending table values
-                pending_table = parser_obj.pending_shareholders_type_table
-                temp_page_values = page_values.copy()
-
-                temp_shareholder_type = pending_table['shareholder_type'] if pending_table is not None else parser_obj.shareholder_type
-                if pending_table is not None and temp_index in temp_page_values and not pending_table['address'] and pending_table['name']:
-                    pending_table['address'] = temp_page_values[temp_index][0].text
-                    parser_obj.shareholder_type_details.append(pending_table)
-                    temp_index = round(temp_index - 58, 2)
-                    parser_obj.pending_shareholders_type_table = None
-                elif pending_table is not None and not pending_table['name']:
-                    temp_index = round(list_of_t[0].y - 95.73, 2)
-                    parser_obj.pending_shareholders_type_table = None
-
-                if temp_index in page_values and parser_obj.shareholder_type is not None:
-                    page_values[temp_index].sort()
-                    pending_shareholder = page_values[temp_index]
-                    shareholder_type_table_fields = len(page_values[temp_index])
-                    shareholder_type_values = [shareholder for shareholder in parser_obj.shareholder_type_details if temp_shareholder_type == shareholder['shareholder_type']]
-                    next_shareholder_type = pending_shareholder[0].text
-                    # start of the shareholder type table
-                    if(shareholder_type_table_fields == 2):
-                        if "Ordinary(Number)" in temp_page_values[temp_index][0].text:
-                            temp_index = round(temp_index - 27, 2)
-                        ordinary_num = temp_page_values[temp_index][0].text
-                        currency = temp_page_values[temp_index][1].text
-                        parser_obj.ordinary_num = ordinary_num
-                        parser_obj.currency = currency
-                        temp_index = self.get_index(temp_index, 81, [21, 23, 24, 25, 48, 51, 58, 70, 99, 1495], temp_page_values)
-                        next_shareholder_type = temp_page_values[temp_index][0].text
-                        shareholder_type_table_fields = len(temp_page_values[temp_index])
-                    if int(next_shareholder_type) == len(shareholder_type_values) + 1:
-                        while(shareholder_type_table_fields == 6) or \
-                           (shareholder_type_table_fields == 5):
-                            shareholder_type_dict = {
-                                'name':'',
-                                'address':'',
-                                'shareholder_id':'',
-                                'shareholder_type': temp_shareholder_type,
-                                'nationality':'',
-                                'source_of_address':'',
-                                'address_changed':None,
-                                'currency': parser_obj.currency,
-                                'ordinary_num': parser_obj.ordinary_num,
-                                'company_record':''
-                            }
-                            shareholder_type_details = temp_page_values[temp_index]
-                            shareholder_type_details.sort()
-                            shareholder_type_dict['name'] = shareholder_type_details[1].text
-                            shareholder_type_dict['shareholder_id'] = shareholder_type_details[2].text
-                            shareholder_type_dict['nationality'] = shareholder_type_details[3].text
-                            shareholder_type_dict['source_of_address'] = shareholder_type_details[4].text
-                            temp_index = round(temp_index-27.0, 2)
-                            shareholder_type_dict['address'] = temp_page_values[temp_index][0].text
-                            temp_index = self.get_index(temp_index, 81, [25, 47, 35, 58], temp_page_values)
-                            parser_obj.shareholder_type_details.append(shareholder_type_dict)
-                            shareholder_type_table_fields = len(temp_page_values[temp_index])
+    def _read_group_share(self, parser_obj, page_values, shareholder_type, row, continued=False):
+        """
+        Reads a group share table from `row`: the ordinary shares of the
+        group, then its shareholders. A table `continued` from the previous
+        page may start with the shareholders, which are only read when their
+        numbering goes on from the ones already read.
+        """
+        cells = page_values.sort_by_x(row)
+        shareholder_line = SHAREHOLDER_TYPE_TABLE.lines[0]
+        for line_no, line in enumerate(GROUP_SHARE_TABLE.lines):
+            if self._is_table_line(GROUP_SHARE_TABLE, line, cells):
+                group = ShareholderTypeRecord()
+                row, _ = self._read_table_record(page_values, GROUP_SHARE_TABLE, group, line_no,
+                                                 row, shareholder_line, parser_obj.tracer)
+                parser_obj.ordinary_num = group.ordinary_num
+                parser_obj.currency = group.currency
+                break
+        else:
+            if not continued:
+                return
+        if row is None:
+            return
+        if continued:
+            cells = page_values.sort_by_x(row)
+            number = cells[0].text if cells else ''
+            if not number.isdigit() or \
+               int(number) != parser_obj.shareholder_type_counts.get(shareholder_type, 0) + 1:
+                return
+        pending = self.walk_table(parser_obj, page_values, SHAREHOLDER_TYPE_TABLE, row,
+                                  lambda record: self._add_shareholder_type(parser_obj, record),
+                                  shareholder_type=shareholder_type,
+                                  currency=parser_obj.currency,
+                                  ordinary_num=parser_obj.ordinary_num)
+        if pending is not None:
+            parser_obj.pending_shareholders_type_table = pending
+
+    def _continue_group_share(self, parser_obj, page_values, key):
+        """
+        Goes on with the group share table of the previous page under the
+        page heading at `key`: completes the shareholder pending from the
+        previous page, or reads the group whose anchor ended it, then the
+        next shareholders of the group. A group not going on under the
+        heading is over, it is closed.
+        """
+        pending = parser_obj.pending_shareholders_type_table
+        shareholder_type = pending.shareholder_type if pending is not None \
+            else parser_obj.shareholder_type
+        shareholders = parser_obj.shareholder_type_counts.get(shareholder_type, 0)
+        if pending is not None and not pending.name:
+            parser_obj.pending_shareholders_type_table = None
+            row = self._first_table_row(page_values, GROUP_SHARE_CONTINUED_TABLE, key,
+                                        parser_obj.tracer)
+        else:
+            row = self._first_table_row(page_values, SHAREHOLDER_TYPE_TABLE, key,
+                                        parser_obj.tracer)
+            if pending is not None and row is not None:
+                parser_obj.pending_shareholders_type_table = None
+                row = self._resume_table_record(page_values, SHAREHOLDER_TYPE_TABLE, pending, row,
+                                                parser_obj.tracer)
+                self._add_shareholder_type(parser_obj, pending)
+        if row is not None and parser_obj.shareholder_type is not None:
+            self._read_group_share(parser_obj, page_values, shareholder_type, row, continued=True)
+        if pending is None and parser_obj.pending_shareholders_type_table is None and \
+                parser_obj.shareholder_type_counts.get(shareholder_type, 0) == shareholders:
+            # sections follow each other, so the later pages cannot go on
+            # with it either, and the pages after it parse from the same
+            # state in page workers
+            parser_obj.shareholder_type = None
+            parser_obj.ordinary_num = None
+            parser_obj.currency = None
 
     """
     Populate the table containing shareholder type
     """
-    def populate_shareholder_type_table(self, parser_obj, page_values):
-        temp_page_values = page_values.copy()
-        # sorted(temp_page_values.iteritems(), key=lambda (x, y): float(x))
-        from collections import OrderedDict
-        temp_page_values = OrderedDict(sorted(temp_page_values.iteritems(), key=lambda (x,y): float(x), reverse=True))
-        for key, list_of_t in temp_page_values.iteritems():
-            self.update_pending_shareholder_type(list_of_t, page_values, parser_obj)
+    def populate_shareholder_type_table(self, parser_obj, page_values, anchor_keys):
+        for key in sorted(anchor_keys, reverse=True):
+            list_of_t = page_values[key]
+            if len(list_of_t) == 1 and list_of_t[0].text in SHAREHOLDER_TYPE_HEADINGS:
+                self._continue_group_share(parser_obj, page_values, list_of_t[0].y)
             shareholder_type, shareholder_index = self._find_shareholder_type_and_index(list_of_t)
-            for k, list_of_t in temp_page_values.iteritems():
-                print k, list_of_t
             if shareholder_type:
                 parser_obj.shareholder_type = shareholder_type
-                index = self.get_index(shareholder_index, 23, [23], page_values)
-                shareholder_type_table_fields = len(temp_page_values[index]) if index in temp_page_values else 0
-
-                if shareholder_type_table_fields == 0 and parser_obj.pending_shareholders_type_table is None:
-                    shareholder_type_dict = {
-                        'name': '',
-                        'address': '',
-                        'shareholder_id': '',
-                        'shareholder_type': shareholder_type,
-                        'nationality': '',
-                        'source_of_address': '',
-                        'address_changed':None,
-                        'currency': '',
-                        'ordinary_num': '',
-                        'company_record':''
-                    }
-                    parser_obj.pending_shareholders_type_table = shareholder_type_dict
-
-                # start of the shareholder type table
-                if(shareholder_type_table_fields == 2):
-                    if "Ordinary(Number)" in temp_page_values[index][0].text:
-                        index = round(index - 27, 2)
-                    ordinary_num = temp_page_values[index][0].text
-                    currency = temp_page_values[index][1].text
-                    parser_obj.ordinary_num = ordinary_num
-                    parser_obj.currency = currency
-                    index = self.get_index(index, 81, [21, 23, 24, 25, 48, 51, 58, 70, 99, 1495], temp_page_values)
-                    shareholder_type_table_fields = len(temp_page_values[index])
-
-                    # list of values of shareholder type
-                    while(shareholder_type_table_fields == 6) or \
-                       (shareholder_type_table_fields == 5):
-                        shareholder_type_dict = {
-                            'name':'',
-                            'address':'',
-                            'shareholder_id':'',
-                            'shareholder_type':shareholder_type,
-                            'nationality':'',
-                            'source_of_address':'',
-                            'address_changed':None,
-                            'currency':currency,
-                            'ordinary_num':ordinary_num,
-                            'company_record':''
-                        }
-                        shareholder_type_details = temp_page_values[index]
-                        shareholder_type_details.sort()
-                        shareholder_type_dict['name'] = shareholder_type_details[1].text
-                        shareholder_type_dict['shareholder_id'] = shareholder_type_details[2].text
-                        shareholder_type_dict['nationality'] = shareholder_type_details[3].text
-                        shareholder_type_dict['source_of_address'] = shareholder_type_details[4].text
-                        index = round(index-27.0, 2)
-                        if index in page_values and len(temp_page_values[index]) == 1:
-                            shareholder_type_dict['address'] = temp_page_values[index][0].text
-                            parser_obj.shareholder_type_details.append(shareholder_type_dict)
-                        else:
-                            parser_obj.pending_shareholders_type_table = shareholder_type_dict
-                            break
-                        index = self.get_index(index, 81, [25, 47, 35, 58], temp_page_values)
-                        if index not in temp_page_values:
-                            break
-                        shareholder_type_table_fields = len(temp_page_values[index])
-
+                row = self._first_table_row(page_values, GROUP_SHARE_TABLE, shareholder_index,
+                                            parser_obj.tracer)
+                if row is not None:
+                    self._read_group_share(parser_obj, page_values, shareholder_type, row)
+                elif parser_obj.pending_shareholders_type_table is None:
+                    # the table of the group starts on the next page
+                    parser_obj.pending_shareholders_type_table = ShareholderTypeRecord(
+                        shareholder_type=shareholder_type)
 
     """
     Populate the Capital Details table
     """
-    def populate_share_capital_table(self,parser_obj, page_values):
-        for key, list_of_t in page_values.iteritems():
-            values = [t.text for t in list_of_t]
-            if 'Capital' in values:
-                index = self.get_proper_index(key, 75.34, [75.37], page_values)
-                records_id = 0
-                #To check if the Charges table is empty
-                if index in page_values:
-                    capital_table_fields = \
-                        len(page_values[index])
-                else:
-                    capital_table_fields = 0
-
-                while((capital_table_fields == 4) or \
-                      (capital_table_fields == 3)):
-                    capital_ids = [capital['amount'] \
-                        for capital in parser_obj.capital_details]
-                    amount = page_values[index][0].text
-                    if index in page_values:
-                        capital_dict = {'id':'',
-                                        'capital_type':'capital',
-                                        'amount':'',
-                                        'shares': None,
-                                        'currency':'',
-                                        'share_type':''}
-
-                        capital_dict['amount'] = amount
-                        capital_dict['shares'] = int(page_values[index][0].text)
-                        capital_dict['currency'] = page_values[index][1].text
-                        capital_dict['share_type'] = page_values[index][2].text
-                        parser_obj.capital_details.append(capital_dict)
-                        records_id = records_id + 1
-                        index = round(index - 26, 2)
-                    if index in page_values:
-                        capital_table_fields = \
-                            len(page_values[index])
-                    else:
-                        break
-        parser_obj.capital_details = [dict(t) for t in set([tuple(d.items()) \
-            for d in parser_obj.capital_details])]
+    def populate_share_capital_table(self,parser_obj, page_values, anchor_keys):
+        for key in anchor_keys:
+            self.walk_table(parser_obj, page_values, CAPITAL_TABLE,
+                            self._first_table_row(page_values, CAPITAL_TABLE, key,
+                                                  parser_obj.tracer))
 
     """
     Populate the Paidup Capital Details table
     """
-    def populate_paidup_capital_table(self,parser_obj, page_values):
-        for key, list_of_t in page_values.iteritems():
-            values = [t.text for t in list_of_t]
-            if 'Paid-Up Capital' in values:
-                index = self.get_proper_index(key, 50.34, [50.37], page_values)
-                records_id = 0
-                #To check if the Charges table is empty
-                if index in page_values:
-                    capital_table_fields = len(page_values[index])
-                else:
-                    capital_table_fields = 0
-
-                while(capital_table_fields == 3):
-                    amount = page_values[index][0].text
-                    if index in page_values:
-                        capital_dict = {'id':'',
-                                        'capital_type':'paid_up_capital',
-                                        'amount':'',
-                                        'shares':None,
-                                        'currency':'',
-                                        'share_type':''}
-
-                        capital_dict['amount'] = amount
-                        capital_dict['currency'] = page_values[index][1].text
-                        capital_dict['share_type'] = page_values[index][2].text
-                        parser_obj.paidup_capital_details.append(capital_dict)
-                        records_id = records_id + 1
-                        index = round(index - 26, 2)
-                    if index in page_values:
-                        capital_table_fields = \
-                            len(page_values[index])
-                    else:
-                        break
-        parser_obj.paidup_capital_details = [dict(t) for t in set([tuple(d.items()) \
-            for d in parser_obj.paidup_capital_details])]
-
-
-    def get_proper_index(self, index, default_index, possible_deltas, page_values):
-        temp_index = [round(index - delta, 2) for delta in possible_deltas if round(index - delta, 2) in page_values]
-        if temp_index:
-            index = temp_index[0]
-        else:
-            index = round(index - default_index, 2)
-        return index
-
-    def populate_officers_and_representatives(self, parser_obj, page_values):
-        for key, list_of_t in page_values.iteritems():
-            values = [t.text.split("\n") for t in list_of_t]
-            values = [x for v in values for x in v]
-            if 'Officers/Authorised Representative(s)' in values:
-                index = self.get_proper_index(key, 74.34, [98, 74.37], page_values)
-                if index in page_values:
-                    charge_table_fields = \
-                        len(page_values[index])
-                else:
-                    charge_table_fields = 0
-
-                while(charge_table_fields == 5 or charge_table_fields == 2):
-                    officer_details = page_values[index]
-                    officer_details.sort(key=lambda x:x.x)
-                    if index in page_values:
-                        officers_dict = {
-                            'name': '',
-                            'officer_id': '',
-                            'nationality': '',
-                            'source_of_address': '',
-                            'date_of_appointment': '',
-                            'address': '',
-                            'position': ''
-                        }
-                        if parser_obj.pending_officers_table is None:
-                            officers_dict['name'] = officer_details[0].text
-                            officers_dict['officer_id'] = officer_details[1].text
-                            officers_dict['nationality'] = officer_details[2].text
-                            officers_dict['source_of_address'] = officer_details[3].text
-                            date_of_appointment_str = officer_details[4].text
-                            officers_dict['date_of_appointment'] = datetime.strptime(date_of_appointment_str, '%d/%m/%Y') if date_of_appointment_str else None
-                            index = self.get_proper_index(index, 25, [35], page_values)
-
-                        if parser_obj.pending_officers_table is not None:
-                            officers_dict = parser_obj.pending_officers_table
-                            parser_obj.pending_officers_table = None
-                        elif index not in page_values:
-                            parser_obj.pending_officers_table = officers_dict
-                            break
-
-                        officers_dict['address'] = page_values[index][0].text
-                        officers_dict['position'] = page_values[index][1].text
-                        index = self.get_proper_index(index, 36, [49, 37, 49, 51, 47, 60, 62, 39], page_values)
-                        parser_obj.officers_details.append(officers_dict)
-
-                    if index in page_values:
-                        charge_table_fields = len(page_values[index])
-                    else:
-                        break
+    def populate_paidup_capital_table(self,parser_obj, page_values, anchor_keys):
+        for key in anchor_keys:
+            self.walk_table(parser_obj, page_values, PAIDUP_CAPITAL_TABLE,
+                            self._first_table_row(page_values, PAIDUP_CAPITAL_TABLE, key,
+                                                  parser_obj.tracer))
+
+    def populate_officers_and_representatives(self, parser_obj, page_values, anchor_keys):
+        for key in anchor_keys:
+            self.walk_table(parser_obj, page_values, OFFICERS_TABLE,
+                            self._first_table_row(page_values, OFFICERS_TABLE, key,
+                                                  parser_obj.tracer))
 
     """
     Finds index in a string containing company records
@@ -669,13 +3011,10 @@ class PdfParserProvider:
     """
     Populates records in company records table
     """
-    def populate_company_record_table(self, parser_obj, page_values):
-        temp_page_values = {k: v for k,v in page_values.iteritems() if v}
-
-        for key, list_of_t in temp_page_values.iteritems():
+    def populate_company_record_table(self, parser_obj, page_values, anchor_keys):
+        for key in anchor_keys:
+            list_of_t = page_values[key]
             values = [t.text for t in list_of_t]
-            # #Print statements for debug
-            # print key, "\t", value, "\t"
 
             if ':' in values:
                 values.remove(':')
@@ -684,75 +3023,44 @@ class PdfParserProvider:
                 values.append('')
 
             for v in values:
-                bizfile_date = re.match('^Date:.\d+/\d+/\d+', v if type(v) == str or type(v) == unicode else v.text)
-                if bizfile_date:
-                    bizfile_date_str = bizfile_date.group(0).split(':')[1].strip()
-                    parser_obj.company_record['bizfile_date'] = datetime.strptime(bizfile_date_str, '%d/%m/%Y') if bizfile_date_str else None
-
-            if 'Registration No.' in values:
-                index = self.find_index(parser_obj,'Registration No.',values)
-                parser_obj.company_record['registration_no'] = values[index].replace(':', '').strip()
-            elif 'Company Name.' in values:
-                index = self.find_index(parser_obj,'Company Name.',values)
-                parser_obj.company_record['company_name'] = values[index].replace(':', '').strip()
-            elif 'Former Name if any' in values:
-                index = self.find_index(parser_obj,'Former Name if any',values)
-                parser_obj.company_record['former_name'] = values[index].replace(':', '').strip()
-            elif 'Incorporation Date.' in values:
-                incorp_date_str = values[self.find_index(parser_obj,'Incorporation Date.',values)].replace(':', '').strip()
-                parser_obj.company_record['incorp_date'] = datetime.strptime(incorp_date_str, '%d/%m/%Y') if incorp_date_str else None
-            elif 'Company Type' in values:
-                index = self.find_index(parser_obj,'Company Type',values)
-                parser_obj.company_record['company_type'] = values[index].replace(':', '').strip()
-            elif 'Status' in values:
-                index = self.find_index(parser_obj,'Status',values)
-                parser_obj.company_record['status'] = values[index].replace(':', '').strip()
-            elif 'Status Date' in values:
-                index = self.find_index(parser_obj,'Status Date',values)
-                status_date_str = values[index].replace(':', '').strip()
-                parser_obj.company_record['status_date'] = datetime.strptime(status_date_str, '%d/%m/%Y') if status_date_str else None
-            elif 'Activities (I)' in values:
-                activities_1 = page_values[round(key - 4, 2)][0].text if page_values[round(key - 4, 2)] else ''
-                parser_obj.company_record['activities_1'] = activities_1
-            elif 'Activities (II)' in values:
-                activities_2 = page_values[round(key - 4, 2)][0].text if page_values[round(key - 4, 2)] else ''
-                parser_obj.company_record['activities_2'] = activities_2
-            elif 'Description' in values:
-                activities_desc = page_values[round(key - 4, 2)][0].text if page_values[round(key - 4, 2)] else ''
-                if round(key + 24, 2) in page_values and activities_desc:
-                    parser_obj.company_record['activites_description'] = activities_desc
-                elif activities_desc:
-                    parser_obj.company_record['activites_description_2'] = activities_desc
-
-            elif 'Registered Office Address' in values:
-                registered_office_address = page_values[round(key - 4, 2)][0].text if page_values[round(key - 4, 2)] else ''
-                parser_obj.company_record['registered_office_address'] = registered_office_address
-            elif 'Date of Address' in values:
-                date_of_address_str = page_values[round(key - 4, 2)][0].text if page_values[round(key - 4, 2)] else ''
-                date_of_address = datetime.strptime(date_of_address_str, '%d/%m/%Y') if date_of_address_str else None
-                parser_obj.company_record['date_of_address'] = date_of_address
-            elif 'Date of Last AGM' in values:
-                index = self.find_index(parser_obj,'Date of Last AGM',values)
-                date_of_last_agm_str = values[index].replace(':', '').strip()
-                parser_obj.company_record['date_of_last_agm'] = datetime.strptime(date_of_last_agm_str, '%d/%m/%Y') if date_of_last_agm_str else None
-            elif 'Date of Last AR' in values:
-                date_of_last_ar_str = values[self.find_index(parser_obj,'Date of Last AR',values)].replace(':', '').strip()
-                parser_obj.company_record['date_of_last_ar'] = datetime.strptime(date_of_last_ar_str, '%d/%m/%Y') if date_of_last_ar_str else None
-            elif 'Date of A/C Laid at Last AGM' in values:
-                date_of_ac_at_last_str = values[self.find_index(parser_obj,'Date of A/C Laid at Last AGM',values)].replace(':', '').strip()
-                parser_obj.company_record['date_of_ac_at_last'] = datetime.strptime(date_of_ac_at_last_str, '%d/%m/%Y') if date_of_ac_at_last_str else None
-            elif 'Date of Lodgment of AR, A/C' in values:
-                date_of_lodgment_of_ar_str = values[self.find_index(parser_obj,'Date of Lodgment of AR, A/C',values)].replace(':', '').strip()
-                parser_obj.company_record['date_of_lodgment_of_ar'] = datetime.strptime(date_of_lodgment_of_ar_str, '%d/%m/%Y') if date_of_lodgment_of_ar_str else None
-            elif 'RECEIPT NO.' in values:
-                receipt_no = page_values[round(key + 1, 2)][0].text if page_values[round(key + 1, 2)] else ''
-                parser_obj.company_record['receipt_no'] = receipt_no
-            elif 'Audit Firms' in values:
-                audit_index = round(key - 51.34, 2)
-                if audit_index in page_values:
-                    parser_obj.company_record['audit_firm_name'] = page_values[audit_index][0].text
-
-
+                bizfile_date = BIZFILE_DATE_RE.match(v)
+                if bizfile_date and _selected_field(parser_obj, 'bizfile_date'):
+                    parser_obj.company_record['bizfile_date'] = parse_date(bizfile_date.group(0).split(':')[1].strip())
+
+            label_fields = [COMPANY_RECORD_LABEL_FIELDS[v] for v in values if v in COMPANY_RECORD_LABEL_FIELDS]
+            if parser_obj.fields is not None:
+                label_fields = [(precedence, company_field) for precedence, company_field in label_fields
+                                if _selected_field(parser_obj, company_field.field) or
+                                   (company_field.value_type == 'description' and
+                                    _selected_field(parser_obj, company_field.field + '_2'))]
+            if label_fields:
+                self._read_company_field(parser_obj, page_values, key, values, min(label_fields)[1])
+
+    def _read_company_field(self, parser_obj, page_values, key, values, company_field):
+        """
+        Reads `company_field`, a CompanyRecordField, from the row at `key`
+        holding `values`
+        """
+        if company_field.offset is None:
+            value = values[self.find_index(parser_obj, company_field.label, values)].replace(':', '').strip()
+        else:
+            row_key = round(key + company_field.offset, 2)
+            if company_field.value_type == 'text_if_row' and row_key not in page_values:
+                return
+            # PageRows would add an empty row for a missing key
+            cells = dict.get(page_values, row_key)
+            value = cells[0].text if cells else ''
+
+        if company_field.value_type == 'date':
+            parser_obj.company_record[company_field.field] = parse_date(value)
+        elif company_field.value_type == 'description':
+            if round(key + 24, 2) in page_values and value:
+                if _selected_field(parser_obj, company_field.field):
+                    parser_obj.company_record[company_field.field] = value
+            elif value and _selected_field(parser_obj, company_field.field + '_2'):
+                parser_obj.company_record[company_field.field + '_2'] = value
+        else:
+            parser_obj.company_record[company_field.field] = value
 
     def _build_annotations( self, page):
         for annot in page.annots.resolve():
@@ -775,48 +3083,210 @@ class PdfParserProvider:
             else:
                 raise Exception( "Unknown Annotation" )
 
-def run_pdf_parser():
-    parser_object = PdfParser(conf)
-    provider_object = PdfParserProvider()
-    provider_object.load_pdf_file(parser_object)
-
-    print "\n ##### Company details ###### \n"
-    for key, value in parser_object.company_record.iteritems():
-        print key, "\t", value
-
-    print "\n\nCHARGES TABLE DETAILS"
-    print len(parser_object.charges)
-    for charge_value in parser_object.charges:
-        print charge_value
-
-    print "\n\nCAPITAL TABLE DETAILS\n"
-    print len(parser_object.capital_details)
-    for capital_value in parser_object.capital_details:
-        print capital_value
-
-    print "\n\nPAID-UP CAPITAL TABLE DETAILS\n"
-    print len(parser_object.paidup_capital_details)
-    for paidup_capital in parser_object.paidup_capital_details:
-        print paidup_capital
-
-    print "\n\nSHAREHOLDERS TABLE DETAILS\n"
-    print len(parser_object.shareholders_details)
-    for shareholder_value in parser_object.shareholders_details:
-        print shareholder_value
-        print "\n"
-
-    print "\n\nSHAREHOLDER TYPE TABLE DETAILS\n"
-    print len(parser_object.shareholder_type_details)
-    for shareholder_type_value in parser_object.shareholder_type_details:
-        print shareholder_type_value
-        print "\n"
-
-    print "\n\nOFFICERS TABLE DETAILS\n"
-    print len(parser_object.officers_details)
-    for officer_detail in parser_object.officers_details:
-        print officer_detail
-        print "\n"
+# Provider owned by a batch worker process, created once per worker by
+# _init_batch_worker
+_batch_provider = None
+_batch_conf = None
+
+def _init_batch_worker(worker_conf):
+    global _batch_provider, _batch_conf
+    _batch_provider = PdfParserProvider()
+    # the worker is a daemonic process, which multiprocessing does not
+    # allow to have children of its own
+    _batch_conf = dict(worker_conf, page_processes=1)
+
+def _parse_batch_document(task):
+    # the document is a path or, from the ingestion service, its contents
+    index, document = task
+    path = pdf_input_name(document)
+    doc_conf = dict(_batch_conf)
+    doc_conf["input_pdf_file"] = document
+    try:
+        parser_obj = PdfParser(doc_conf)
+        _batch_provider.load_pdf_file(parser_obj)
+    except Exception as e:
+        return BatchResult(index, path, None, "%s: %s" % (type(e).__name__, e), False, None)
+    return BatchResult(index, path, parser_obj.get_results(), None,
+                       parser_obj.result_cache_hit,
+                       parser_obj.metrics.to_dict() if parser_obj.metrics else None)
+
+def _parse_page_chunk(task):
+    return PdfParserProvider()._parse_page_chunk(*task)
+
+def collect_pdf_files(source):
+    """
+    Expands a directory, glob pattern or manifest file (one path per line)
+    into the list of PDF files to parse
+    """
+    if isinstance(source, (list, tuple)):
+        return list(source)
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.lower().endswith(".pdf"))
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+    if source.lower().endswith(".pdf"):
+        return [source]
+    with open(source) as manifest:
+        return [line.strip() for line in manifest
+                if line.strip() and not line.startswith("#")]
+
+class PdfBatchParser:
+
+    """
+    Parses many PDF files on a pool of worker processes. Every worker owns
+    its own PdfParserProvider and builds a fresh PdfParser per document.
+    """
+    def __init__(self, conf):
+        self.conf = conf
+        self.processes = conf.get("batch_processes", \
+                              DEFAULTS["batch_processes"]) or multiprocessing.cpu_count()
+        self.ordered = conf.get("batch_ordered", DEFAULTS["batch_ordered"])
+        self.chunksize = conf.get("batch_chunksize", DEFAULTS["batch_chunksize"])
+        self.metrics_jsonl = conf.get("metrics_jsonl", DEFAULTS["metrics_jsonl"])
+        self.metrics_prometheus = conf.get("metrics_prometheus", DEFAULTS["metrics_prometheus"])
+        self.profile_dir = conf.get("profile_dir", DEFAULTS["profile_dir"])
+        self.profile_keep = conf.get("profile_keep", DEFAULTS["profile_keep"])
+        self.documents = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.elapsed = 0.0
+        # MetricsSummary of the last run, None unless metrics are enabled
+        self.metrics = None
+
+    def docs_per_sec(self):
+        return self.documents / self.elapsed if self.elapsed else 0.0
+
+    def parse(self, source):
+        """
+        Yields a BatchResult for every document of `source`, in input order
+        or in completion order depending on `batch_ordered`. With metrics
+        enabled the metrics of every document are appended to
+        `metrics_jsonl` and the summary of the run is written to
+        `metrics_prometheus` at the end. With profiling enabled only the
+        profiles of the `profile_keep` slowest documents of all workers are
+        left in `profile_dir` at the end.
+        """
+        tasks = list(enumerate(collect_pdf_files(source)))
+        self.documents = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.metrics = MetricsSummary() if self.conf.get("metrics", DEFAULTS["metrics"]) else None
+        jsonl_file = open(self.metrics_jsonl, 'a') if self.metrics and self.metrics_jsonl else None
+        start = time.time()
+        pool = multiprocessing.Pool(self.processes, _init_batch_worker, (self.conf,))
+        try:
+            if self.ordered:
+                results = pool.imap(_parse_batch_document, tasks, self.chunksize)
+            else:
+                results = pool.imap_unordered(_parse_batch_document, tasks, self.chunksize)
+            for batch_result in results:
+                self.documents += 1
+                if batch_result.error:
+                    self.failures += 1
+                if batch_result.cache_hit:
+                    self.cache_hits += 1
+                if batch_result.metrics:
+                    self.metrics.add(batch_result.metrics)
+                    if jsonl_file:
+                        jsonl_file.write(json.dumps(batch_result.metrics) + "\n")
+                self.elapsed = time.time() - start
+                yield batch_result
+            pool.close()
+            if self.metrics and self.metrics_prometheus:
+                self.metrics.write_prometheus(self.metrics_prometheus)
+            if self.profile_dir:
+                prune_profiles(self.profile_dir, self.profile_keep)
+        finally:
+            pool.terminate()
+            pool.join()
+            if jsonl_file:
+                jsonl_file.close()
+            self.elapsed = time.time() - start
+
+def run_batch_pdf_parser(source, output=None):
+    """
+    Parses the documents of `source`, writing their records to `output`
+    (see open_sink) when given, the registration number of every document
+    to stdout otherwise. Failures and the summary of the run go to stderr,
+    as the sink may write to stdout.
+    """
+    batch_parser = PdfBatchParser(conf)
+    sink = open_sink(output, conf) if output else None
+    try:
+        for batch_result in batch_parser.parse(source):
+            if batch_result.error:
+                print >> sys.stderr, "FAILED", batch_result.path, batch_result.error
+            elif sink:
+                sink.write_results(batch_result.result, batch_result.path)
+            else:
+                print batch_result.path, "\t", \
+                    batch_result.result['company_record']['registration_no']
+    finally:
+        if sink:
+            sink.close()
+
+    print >> sys.stderr, "\nParsed %d documents (%d failed, %d from the result cache) " \
+        "in %.2f s, %.2f docs/sec" % \
+        (batch_parser.documents, batch_parser.failures, batch_parser.cache_hits,
+         batch_parser.elapsed, batch_parser.docs_per_sec())
+    if batch_parser.metrics:
+        print_metrics_summary(batch_parser.metrics)
+    if batch_parser.profile_dir:
+        print >> sys.stderr, "\nSlowest documents, profiles in %s" % batch_parser.profile_dir
+        for profile in prune_profiles(batch_parser.profile_dir, batch_parser.profile_keep):
+            print >> sys.stderr, "%8.2f s %4d pages  %s  %s  %s" % \
+                (profile["seconds"], profile["pages"], profile["sha256"][:16],
+                 profile["profile"], profile["path"])
+
+def print_metrics_summary(summary):
+    latencies = summary.latencies()
+    print >> sys.stderr, "\n%-40s %6s %10s %10s %10s" % ("stage", "count", "p50 ms", "p95 ms", "p99 ms")
+    for stage in METRIC_STAGES + tuple(extractor for _, extractor in SECTION_EXTRACTORS):
+        if stage in latencies:
+            latency = latencies[stage]
+            print >> sys.stderr, "%-40s %6d %10.2f %10.2f %10.2f" % (stage, latency["count"],
+                1000 * latency["p50"], 1000 * latency["p95"], 1000 * latency["p99"])
+
+def run_pdf_parser(output="jsonl:-"):
+    """
+    Streams the records of the configured input file to `output`, JSON
+    lines on stdout by default
+    """
+    with open_sink(output, conf) as sink:
+        export_pdf_file(conf.get("input_pdf_file", DEFAULTS["input_pdf_file"]), sink, conf)
 
 if __name__ == "__main__":
-    run_pdf_parser()
+    # python pdf_parser.py [--output=<format>:<path>]
+    # python pdf_parser.py <directory|glob|manifest> [processes] [--unordered]
+    #                      [--metrics] [--profile=<directory>]
+    #                      [--output=<format>:<path>]
+    # --trace=<info|debug>[:<extractor>,...] logs the extractor trace to stderr
+    # --tables=<table>,... and --fields=<field>,... parse only these tables
+    # and company record fields
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    output = None
+    for arg in sys.argv[1:]:
+        if arg.startswith("--profile="):
+            conf["profile_dir"] = arg[len("--profile="):]
+        if arg.startswith("--output="):
+            output = arg[len("--output="):]
+        if arg.startswith("--tables="):
+            conf["tables"] = arg[len("--tables="):].split(",")
+        if arg.startswith("--fields="):
+            conf["fields"] = arg[len("--fields="):].split(",")
+        if arg.startswith("--trace="):
+            trace_level, _, trace_extractors = arg[len("--trace="):].partition(":")
+            conf["trace_level"] = trace_level
+            conf["trace_extractors"] = trace_extractors.split(",") if trace_extractors else None
+            logging.basicConfig(format="%(message)s")
+            trace_logger.setLevel(TRACE_LEVELS.get(trace_level, logging.INFO))
+    if args:
+        if len(args) > 1:
+            conf["batch_processes"] = int(args[1])
+        conf["batch_ordered"] = "--unordered" not in sys.argv
+        conf["metrics"] = "--metrics" in sys.argv
+        run_batch_pdf_parser(args[0], output)
+    else:
+        run_pdf_parser(output or "jsonl:-")
 
@@ -0,0 +1,330 @@
+"""
+Local HTTP ingestion service for the PDF parser.
+
+Uploaded PDFs are queued to a pool of warm worker processes, each owning a
+PdfParserProvider, and the company record and tables are returned as JSON.
+Uploads are handed to the workers in memory, they are never written to disk.
+A worker still parsing when its request times out is killed, and a worker
+which exits is replaced by a new one.
+
+    POST /parse     body: the PDF file
+                    200 results, 413 upload too large, 422 not a PDF or
+                    parse error, 429 queue full, 500 worker lost,
+                    504 timed out
+    GET  /healthz   status of the service
+    GET  /metrics   request counters and latencies, Prometheus text format
+
+    python pdf_service.py [[host:]port] [processes]
+"""
+import BaseHTTPServer
+import Queue
+import SocketServer
+import json
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+from pdf_parser import DEFAULTS, PDF_HEADER, conf, json_default, percentile, \
+    _init_batch_worker, _parse_batch_document
+
+logger = logging.getLogger(__name__)
+
+class ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def _run_service_worker(conn, worker_conf):
+    """
+    Main loop of a service worker process: parses the documents received
+    on `conn` and sends back their BatchResult
+    """
+    _init_batch_worker(worker_conf)
+    while True:
+        try:
+            pdf_data = conn.recv()
+        except EOFError:
+            return
+        conn.send(_parse_batch_document((0, pdf_data)))
+
+class ServiceWorker:
+
+    """
+    Worker process of the service and the pipe documents are sent to it on.
+    `deadline` is the time the document being parsed is due by, None while
+    the worker is idle.
+    """
+    def __init__(self, worker_conf):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_run_service_worker,
+                                               args=(child_conn, worker_conf))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        self.deadline = None
+
+    def parse(self, pdf_data, deadline):
+        """
+        Returns the BatchResult of `pdf_data`, or None when the worker is
+        still parsing at `deadline`. Raises EOFError or IOError when the
+        worker exits before sending it.
+        """
+        self.deadline = deadline
+        self.conn.send(pdf_data)
+        if not self.conn.poll(max(deadline - time.time(), 0)):
+            return None
+        batch_result = self.conn.recv()
+        self.deadline = None
+        return batch_result
+
+    def stop(self):
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+
+class IngestionService:
+
+    """
+    Owns the worker processes and the HTTP server. At most `queue_depth`
+    documents are queued or being parsed at a time. A request waits for
+    an idle worker and for its results until `timeout` seconds after it
+    was queued; a worker still parsing then is killed and replaced, so
+    the slot and the worker are both given back.
+    """
+    # number of request latencies the /metrics quantiles are computed from
+    LATENCY_WINDOW = 1000
+
+    def __init__(self, conf):
+        self.conf = conf
+        self.host = conf.get("service_host", DEFAULTS["service_host"])
+        self.port = conf.get("service_port", DEFAULTS["service_port"])
+        self.processes = conf.get("service_processes", \
+                              DEFAULTS["service_processes"]) or multiprocessing.cpu_count()
+        self.queue_depth = conf.get("service_queue_depth", DEFAULTS["service_queue_depth"])
+        self.timeout = conf.get("service_timeout", DEFAULTS["service_timeout"])
+        self.max_upload_bytes = conf.get("service_max_upload_bytes", \
+                              DEFAULTS["service_max_upload_bytes"])
+        self.slots = threading.BoundedSemaphore(self.queue_depth)
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.restarts = 0
+        self.responses = defaultdict(int)
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self.started = None
+        self.workers = []
+        self.idle_workers = Queue.Queue()
+        self.server = None
+
+    def start(self):
+        for _ in xrange(self.processes):
+            self._add_worker(ServiceWorker(self.conf))
+        self.server = ThreadingHTTPServer((self.host, self.port), IngestionRequestHandler)
+        self.server.service = self
+        self.port = self.server.server_address[1]
+        self.started = time.time()
+        logger.info("Listening on %s:%d with %d workers", self.host, self.port, self.processes)
+
+    def serve_forever(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self.server:
+            self.server.server_close()
+        with self.lock:
+            workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.stop()
+
+    def _add_worker(self, worker):
+        with self.lock:
+            self.workers.append(worker)
+        self.idle_workers.put(worker)
+
+    def _replace_worker(self, worker):
+        worker.stop()
+        with self.lock:
+            if worker not in self.workers:
+                # the service is stopping
+                return
+            self.workers.remove(worker)
+            self.restarts += 1
+        self._add_worker(ServiceWorker(self.conf))
+
+    def parse(self, pdf_data):
+        """
+        Parses an uploaded document, returns the HTTP status and the JSON
+        serializable response
+        """
+        # anything else would be taken as the path of the document
+        if not pdf_data.startswith(PDF_HEADER):
+            return 422, {"error": "Upload is not a PDF"}
+        if not self.slots.acquire(False):
+            return 429, {"error": "Too many documents queued, retry later"}
+        with self.lock:
+            self.queued += 1
+        try:
+            return self._parse(pdf_data, time.time() + self.timeout)
+        finally:
+            with self.lock:
+                self.queued -= 1
+            self.slots.release()
+
+    def _parse(self, pdf_data, deadline):
+        timed_out = 504, {"error": "Parsing took longer than %s seconds" % self.timeout}
+        while True:
+            try:
+                worker = self.idle_workers.get(True, max(deadline - time.time(), 0))
+            except Queue.Empty:
+                return timed_out
+            if worker.process.is_alive():
+                break
+            logger.error("Worker %d exited while idle, replacing it", worker.process.pid)
+            self._replace_worker(worker)
+        try:
+            batch_result = worker.parse(pdf_data, deadline)
+        except (EOFError, IOError):
+            logger.error("Worker %d exited while parsing a document, replacing it",
+                         worker.process.pid)
+            self._replace_worker(worker)
+            return 500, {"error": "Worker exited while parsing the document"}
+        if batch_result is None:
+            logger.error("Worker %d is still parsing after %s seconds, replacing it",
+                         worker.process.pid, self.timeout)
+            self._replace_worker(worker)
+            return timed_out
+        self.idle_workers.put(worker)
+        if batch_result.error:
+            return 422, {"error": batch_result.error}
+        return 200, batch_result.result
+
+    def record(self, status, seconds):
+        with self.lock:
+            self.responses[status] += 1
+            self.latencies.append(seconds)
+
+    def health(self):
+        """
+        Status of the service, degraded while a worker has exited or is
+        parsing past its deadline and not replaced yet
+        """
+        now = time.time()
+        with self.lock:
+            queued = self.queued
+            restarts = self.restarts
+            workers = list(self.workers)
+        lost = sum(1 for worker in workers if not worker.process.is_alive())
+        overdue = sum(1 for worker in workers
+                      if worker.deadline is not None and worker.deadline < now)
+        return {"status": "degraded" if lost or overdue else "ok",
+                "workers": self.processes, "workers_lost": lost, "workers_overdue": overdue,
+                "worker_restarts": restarts, "queued": queued,
+                "queue_depth": self.queue_depth, "uptime": now - self.started}
+
+    def prometheus_metrics(self):
+        with self.lock:
+            responses = dict(self.responses)
+            latencies = sorted(self.latencies)
+            queued = self.queued
+            restarts = self.restarts
+        lines = ["# HELP pdf_service_responses_total Responses to parse requests by status.",
+                 "# TYPE pdf_service_responses_total counter"]
+        for status, count in sorted(responses.iteritems()):
+            lines.append('pdf_service_responses_total{code="%d"} %d' % (status, count))
+        lines.extend(["# HELP pdf_service_queued Documents queued or being parsed.",
+                      "# TYPE pdf_service_queued gauge",
+                      "pdf_service_queued %d" % queued,
+                      "# TYPE pdf_service_queue_depth gauge",
+                      "pdf_service_queue_depth %d" % self.queue_depth,
+                      "# TYPE pdf_service_workers gauge",
+                      "pdf_service_workers %d" % self.processes,
+                      "# HELP pdf_service_worker_restarts_total Workers replaced after "
+                      "exiting or timing out.",
+                      "# TYPE pdf_service_worker_restarts_total counter",
+                      "pdf_service_worker_restarts_total %d" % restarts,
+                      "# HELP pdf_service_request_seconds Latency of the last %d parse "
+                      "requests." % self.LATENCY_WINDOW,
+                      "# TYPE pdf_service_request_seconds summary"])
+        for quantile in (0.5, 0.95, 0.99):
+            lines.append('pdf_service_request_seconds{quantile="%s"} %r' % \
+                         (quantile, percentile(latencies, quantile)))
+        lines.append("pdf_service_request_seconds_sum %r" % sum(latencies))
+        lines.append("pdf_service_request_seconds_count %d" % len(latencies))
+        return "\n".join(lines) + "\n"
+
+class IngestionRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/healthz":
+            self._send_json(200, service.health())
+        elif self.path == "/metrics":
+            self._send(200, service.prometheus_metrics(), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path != "/parse":
+            self._send_json(404, {"error": "Not found"})
+            return
+        start = time.time()
+        try:
+            length = int(self.headers.getheader("Content-Length") or 0)
+        except ValueError:
+            length = 0
+        if length <= 0:
+            status, response = 411, {"error": "Content-Length required"}
+        elif length > service.max_upload_bytes:
+            status, response = 413, {"error": "Uploads are limited to %d bytes" % \
+                                              service.max_upload_bytes}
+        else:
+            status, response = service.parse(self.rfile.read(length))
+        service.record(status, time.time() - start)
+        self._send_json(status, response)
+
+    def _send_json(self, status, response):
+        self._send(status, json.dumps(response, default=json_default), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        if status in (411, 413):
+            # the body of the request was not read
+            self.send_header("Connection", "close")
+            self.close_connection = 1
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
+
+def run_pdf_service(argv):
+    service_conf = dict(conf)
+    if argv:
+        host, _, port = argv[0].rpartition(":")
+        if host:
+            service_conf["service_host"] = host
+        service_conf["service_port"] = int(port)
+    if len(argv) > 1:
+        service_conf["service_processes"] = int(argv[1])
+    service = IngestionService(service_conf)
+    service.start()
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    run_pdf_service(sys.argv[1:])
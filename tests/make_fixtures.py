@@ -0,0 +1,106 @@
+"""
+Writes the golden fixtures of tests/test_fixtures.py: documents whose
+tables continue on the next page, in the middle of a record or at its
+end, and the results the serial parser gives for them. Check the diff of
+the expected results before committing regenerated fixtures.
+
+    python -m tests.make_fixtures
+"""
+import json
+import os
+
+from pdf_parser import PdfParser, PdfParserProvider, json_default
+from benchmarks import synthetic
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# y1 of the page heading a group share goes on under
+HEADING_Y = 835.0
+
+def group_member(boxes, y, number, group="A", address=True):
+    boxes.extend([(40, y, str(number)), (70, y, "MEMBER %s%d" % (group, number)),
+                  (200, y, "G%07dX" % number), (300, y, "MALAYSIAN"), (420, y, "ACRA")])
+    if address:
+        boxes.append((40, y - 27, "%d GROUP LANE" % number))
+
+def _group_share_first_page():
+    return [(40, 800, "Date: 01/01/2018"), (40, 780, "Registration No."),
+            (180, 780, ":"), (200, 780, "201800001A"),
+            (40, 400, "Group Share : A (Shares co-owned by shareholders listed under "
+                      "this group)"),
+            (40, 377, "Ordinary(Number)"), (200, 377, "Currency"),
+            (40, 350, "500"), (200, 350, "SINGAPORE, DOLLARS")]
+
+def group_share_pages():
+    """
+    Two pages of a group share whose first page ends right after a
+    shareholder, the second page only holds the heading and the next
+    shareholders of the group
+    """
+    first_page = _group_share_first_page()
+    group_member(first_page, 329, 1)
+    group_member(first_page, 277, 2)
+    second_page = [(40, HEADING_Y, synthetic.DISCLAIMER)]
+    group_member(second_page, round(HEADING_Y - 99.73, 2), 3)
+    group_member(second_page, round(HEADING_Y - 99.73 - 52, 2), 4)
+    return [first_page, second_page]
+
+def group_share_split_pages():
+    """
+    Three pages of group shares: the first page ends in the middle of a
+    shareholder whose address goes on under the heading of the second
+    page, the second page ends with the anchor of a group share whose
+    ordinary shares and shareholders are on the third page
+    """
+    first_page = _group_share_first_page()
+    group_member(first_page, 329, 1)
+    group_member(first_page, 277, 2, address=False)
+    second_page = [(40, HEADING_Y, synthetic.DISCLAIMER),
+                   (40, round(HEADING_Y - 48.4, 2), "2 GROUP LANE")]
+    y = round(HEADING_Y - 48.4 - 58, 2)
+    group_member(second_page, y, 3)
+    group_member(second_page, y - 52, 4)
+    second_page.append((40, 300, "Group Share : B (Shares co-owned by shareholders listed "
+                                 "under this group)"))
+    y = round(HEADING_Y - 95.73, 2)
+    third_page = [(40, HEADING_Y, synthetic.DISCLAIMER),
+                  (40, y, "Ordinary(Number)"), (200, y, "Currency"),
+                  (40, y - 27, "42"), (200, y - 27, "SINGAPORE, DOLLARS")]
+    group_member(third_page, y - 48, 1, group="B")
+    return [first_page, second_page, third_page]
+
+# Fixture name: pages of the document
+FIXTURES = {
+    # shareholders and officers split over pages, two group shares
+    "split_tables": synthetic.build_pages(seed=2, charges=12, shareholders=9, officers=9,
+                                          groups=2),
+    # every table running over several pages
+    "long_tables": synthetic.build_pages(seed=4, charges=30, shareholders=25, officers=25,
+                                         groups=3, group_members=3),
+    # pages without any table after the last one
+    "extra_pages": synthetic.build_pages(seed=6, charges=5, shareholders=6, officers=6,
+                                         extra_pages=10),
+    "group_share": group_share_pages(),
+    "group_share_split": group_share_split_pages(),
+}
+
+def fixture_path(name, extension):
+    return os.path.join(FIXTURES_DIR, name + extension)
+
+def results_json(results):
+    return json.dumps(results, default=json_default, sort_keys=True, indent=1)
+
+def main():
+    if not os.path.isdir(FIXTURES_DIR):
+        os.makedirs(FIXTURES_DIR)
+    for name, pages in sorted(FIXTURES.items()):
+        path = fixture_path(name, ".pdf")
+        synthetic.write_pdf(pages, path)
+        parser_obj = PdfParser({"input_pdf_file": path})
+        PdfParserProvider().load_pdf_file(parser_obj)
+        with open(fixture_path(name, ".json"), "w") as f:
+            f.write(results_json(parser_obj.get_results()) + "\n")
+        print path
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+The layout and result caches give the results of a cold parse, expire and
+evict their entries and take corrupt files for misses.
+
+    python -m unittest discover -s tests -t .
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from pdf_parser import LayoutCache, PdfParser, PdfParserProvider, ResultCache, TextBlock
+from tests.make_fixtures import fixture_path
+
+def parse(path, **parser_conf):
+    parser_obj = PdfParser(dict(parser_conf, input_pdf_file=path))
+    PdfParserProvider().load_pdf_file(parser_obj)
+    return parser_obj
+
+def cache_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+def layout_pages(number):
+    return [[TextBlock(40.0, 800.0, 10.0, u"Page %d of document %d" % (page, number))]
+            for page in range(50)]
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_caches")
+        self.path = fixture_path("split_tables", ".pdf")
+        self.results = parse(self.path).get_results()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+class LayoutCacheTest(CacheTest):
+
+    def test_warm_run(self):
+        for run in ("cold", "warm"):
+            parser_obj = parse(self.path, layout_cache_dir=self.directory, metrics=True)
+            self.assertEqual(parser_obj.get_results(), self.results, run)
+            # a warm run lays out no page
+            self.assertEqual("layout" in parser_obj.metrics.timers, run == "cold")
+
+    def test_least_recently_used_evicted(self):
+        layout_cache = LayoutCache(self.directory, 1 << 20)
+        layout_cache.put("size", layout_pages(0))
+        entry_size = cache_size(self.directory)
+        os.remove(layout_cache._path("size"))
+        layout_cache = LayoutCache(self.directory, 3 * entry_size)
+        past = time.time() - 100
+        for number in range(3):
+            key = "entry%d" % number
+            layout_cache.put(key, layout_pages(number))
+            os.utime(layout_cache._path(key), (past + number, past + number))
+        # a hit makes entry0 the most recently used
+        self.assertEqual(len(layout_cache.get("entry0")), 50)
+        for number in range(3, 5):
+            layout_cache.put("entry%d" % number, layout_pages(number))
+            self.assertTrue(cache_size(self.directory) <= layout_cache.max_bytes)
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ["entry%d%s" % (number, LayoutCache.SUFFIX) for number in (0, 3, 4)])
+
+    def test_corrupt_file_is_a_miss(self):
+        layout_cache = LayoutCache(self.directory, 1 << 20)
+        layout_cache.put("document", layout_pages(0))
+        with open(layout_cache._path("document"), 'wb') as cache_file:
+            cache_file.write("not a cache file")
+        self.assertEqual(layout_cache.get("document"), None)
+        # the document is laid out and parsed again
+        os.remove(layout_cache._path("document"))
+        parse(self.path, layout_cache_dir=self.directory)
+        for name in os.listdir(self.directory):
+            with open(os.path.join(self.directory, name), 'wb') as cache_file:
+                cache_file.write("not a cache file")
+        parser_obj = parse(self.path, layout_cache_dir=self.directory, metrics=True)
+        self.assertTrue("layout" in parser_obj.metrics.timers)
+        self.assertEqual(parser_obj.get_results(), self.results)
+
+class ResultCacheTest(CacheTest):
+
+    def test_warm_run(self):
+        cold = parse(self.path, result_cache_dir=self.directory)
+        self.assertFalse(cold.result_cache_hit)
+        warm = parse(self.path, result_cache_dir=self.directory)
+        self.assertTrue(warm.result_cache_hit)
+        self.assertEqual(warm.get_results(), self.results)
+
+    def test_hit_does_not_open_pdf(self):
+        path = os.path.join(self.directory, "document.pdf")
+        shutil.copy(self.path, path)
+        cache_dir = os.path.join(self.directory, "results")
+        cold = parse(path, result_cache_dir=cache_dir)
+        os.remove(path)
+        parser_obj = PdfParser({"input_pdf_file": path, "result_cache_dir": cache_dir})
+        parser_obj.input_sha256 = cold.input_sha256
+        PdfParserProvider().load_pdf_file(parser_obj)
+        self.assertTrue(parser_obj.result_cache_hit)
+        self.assertEqual(parser_obj.get_results(), self.results)
+
+    def test_ttl(self):
+        result_cache = ResultCache(self.directory, 1 << 20, ttl=0.05)
+        result_cache.put("document", self.results)
+        self.assertEqual(result_cache.get("document"), self.results)
+        time.sleep(0.1)
+        self.assertEqual(result_cache.get("document"), None)
+        self.assertEqual(result_cache.stats(), {'hits': 1, 'misses': 1, 'expired': 1})
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_corrupt_file_is_a_miss(self):
+        result_cache = ResultCache(self.directory, 1 << 20)
+        result_cache.put("document", self.results)
+        with open(result_cache._path("document"), 'wb') as cache_file:
+            cache_file.write("not a cache file")
+        self.assertEqual(result_cache.get("document"), None)
+        self.assertEqual(result_cache.stats(), {'hits': 0, 'misses': 1, 'expired': 0})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Extractors reading the rows of a page.
+
+    python -m unittest discover -s tests -t .
+"""
+import logging
+import unittest
+
+from pdf_parser import PageRows, PdfParser, PdfParserProvider, TextBlock, trace_logger
+
+def page_rows(boxes):
+    """
+    PageRows of (x, y, text) boxes, one row per y
+    """
+    page_values = PageRows()
+    for x, y, text in boxes:
+        page_values[y].append(TextBlock(x, y, 10.0, text))
+    return page_values
+
+class CompanyRecordTest(unittest.TestCase):
+
+    def test_missing_value_rows_are_not_added(self):
+        page_values = page_rows([(40, 500.0, "Activities (II)"),
+                                 (40, 470.0, "Description"),
+                                 (40, 440.0, "Registered Office Address"),
+                                 (200, 436.0, "1 MAIN STREET SINGAPORE")])
+        keys = sorted(page_values)
+        parser_obj = PdfParser({})
+        provider = PdfParserProvider()
+        anchors = provider._find_section_anchors(page_values)
+        provider.populate_company_record_table(parser_obj, page_values, anchors['company_record'])
+        self.assertEqual(sorted(page_values), keys)
+        self.assertEqual(list(page_values.row_index), keys)
+        self.assertEqual(parser_obj.company_record['activities_2'], '')
+        self.assertEqual(parser_obj.company_record['registered_office_address'],
+                         "1 MAIN STREET SINGAPORE")
+
+class TableWalkTest(unittest.TestCase):
+
+    def test_empty_rows_are_skipped(self):
+        boxes = [(40, 700.0, "Charge No."), (150, 700.0, "Date Registered")]
+        for number, y in enumerate((671.63, 647.63)):
+            boxes.extend([(40, y, "C%d" % number), (150, y, "01/02/2003"),
+                          (280, y, "ALL MONIES"), (400, y, "BANK")])
+        page_values = page_rows(boxes)
+        page_values[685.0] = []
+        page_values[660.0] = []
+        parser_obj = PdfParser({})
+        parser_obj.horizontal_dict[0] = page_values
+        PdfParserProvider()._populate_tables(parser_obj, 0)
+        self.assertEqual([record.charge_no for record in parser_obj.charges], ["C0", "C1"])
+
+class TraceHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.events = []
+
+    def emit(self, record):
+        self.events.append(record.trace)
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = TraceHandler()
+        self.level = trace_logger.level
+        trace_logger.addHandler(self.handler)
+        trace_logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        trace_logger.removeHandler(self.handler)
+        trace_logger.setLevel(self.level)
+
+    def test_table_rows_of_traced_extractor(self):
+        boxes = [(40, 700.0, "Charge No."), (150, 700.0, "Date Registered")]
+        for number, y in enumerate((671.63, 647.63)):
+            boxes.extend([(40, y, "C%d" % number), (150, y, "01/02/2003"),
+                          (280, y, "ALL MONIES"), (400, y, "BANK")])
+        parser_obj = PdfParser({"trace_level": "debug",
+                                "trace_extractors": ["populate_charges_record_table"]})
+        parser_obj.horizontal_dict[0] = page_rows(boxes)
+        provider = PdfParserProvider()
+        provider._populate_tables(parser_obj, 0)
+        self.assertEqual([record.charge_no for record in parser_obj.charges], ["C0", "C1"])
+        rows = [(event["row"], event.get("line")) for event in self.handler.events
+                if event["event"] == "table_row"]
+        self.assertEqual(rows, [(671.63, None), (647.63, "charge"), (None, None)])
+        self.assertEqual(provider.__dict__.keys(), PdfParserProvider().__dict__.keys())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+The parser gives the golden results of tests/fixtures, whose officers,
+shareholders and group shares continue on the next page. The fixtures are
+written by tests/make_fixtures.py.
+
+    python -m unittest discover -s tests -t .
+"""
+import json
+import unittest
+
+from pdf_parser import PdfParser, PdfParserProvider, json_default
+from tests.make_fixtures import FIXTURES, fixture_path
+
+# Configurations which give the results of the serial parser
+PARSER_CONFS = [{},
+                {"page_processes": 2},
+                {"page_prescan": True},
+                {"page_prescan": True, "page_processes": 3},
+                {"text_device": "runs"}]
+
+def parse(name, **parser_conf):
+    parser_obj = PdfParser(dict(parser_conf, input_pdf_file=fixture_path(name, ".pdf")))
+    PdfParserProvider().load_pdf_file(parser_obj)
+    return json.loads(json.dumps(parser_obj.get_results(), default=json_default))
+
+def expected(name):
+    with open(fixture_path(name, ".json")) as f:
+        return json.load(f)
+
+class FixturesTest(unittest.TestCase):
+
+    def test_results(self):
+        for name in sorted(FIXTURES):
+            for parser_conf in PARSER_CONFS:
+                self.assertEqual(parse(name, **parser_conf), expected(name), (name, parser_conf))
+
+    def test_rows_continued_on_next_page(self):
+        # rows split by a page break are read as one record, no part of
+        # them is lost or read as a record of its own
+        for name in sorted(FIXTURES):
+            results = expected(name)
+            for record in results['officers_details']:
+                self.assertTrue(record['name'] and record['address'] and record['position'],
+                                (name, record))
+            for record in results['shareholders_details']:
+                self.assertTrue(record['name'] and record['address'] and record['ordinary_num'],
+                                (name, record))
+            for record in results['shareholder_type_details']:
+                self.assertTrue(record['name'] and record['address'] and record['currency'],
+                                (name, record))
+
+    def test_group_share_split(self):
+        members = [(record['shareholder_type'], record['name'], record['address'],
+                    record['ordinary_num'])
+                   for record in expected("group_share_split")['shareholder_type_details']]
+        self.assertEqual(members, [("A", "MEMBER A1", "1 GROUP LANE", "500"),
+                                   ("A", "MEMBER A2", "2 GROUP LANE", "500"),
+                                   ("A", "MEMBER A3", "3 GROUP LANE", "500"),
+                                   ("A", "MEMBER A4", "4 GROUP LANE", "500"),
+                                   ("B", "MEMBER B1", "1 GROUP LANE", "42")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Documents given in memory or as file objects parse like their path.
+
+    python -m unittest discover -s tests -t .
+"""
+import mmap
+import os
+import shutil
+import tempfile
+import unittest
+
+from pdf_parser import PdfParser, PdfParserProvider, file_sha256, pdf_input_sha256
+from tests.make_fixtures import fixture_path
+
+def open_fds():
+    """
+    Paths of the files open in this process, None where /proc is missing
+    """
+    fd_dir = "/proc/self/fd"
+    if not os.path.isdir(fd_dir):
+        return None
+    paths = []
+    for fd in os.listdir(fd_dir):
+        try:
+            paths.append(os.readlink(os.path.join(fd_dir, fd)))
+        except OSError:
+            continue
+    return paths
+
+class InputTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_inputs")
+        self.path = fixture_path("split_tables", ".pdf")
+        with open(self.path, "rb") as pdf_file:
+            self.data = pdf_file.read()
+        self.pdf_file = open(self.path, "rb")
+        self.mmap = mmap.mmap(self.pdf_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def tearDown(self):
+        self.mmap.close()
+        self.pdf_file.close()
+        shutil.rmtree(self.directory)
+
+    def inputs(self):
+        self.pdf_file.seek(0)
+        return [("str", self.data),
+                ("bytearray", bytearray(self.data)),
+                ("buffer", buffer(self.data)),
+                ("memoryview", memoryview(self.data)),
+                ("mmap", self.mmap),
+                ("file", self.pdf_file)]
+
+    def parse(self, source, **parser_conf):
+        parser_obj = PdfParser(dict(parser_conf, input_pdf_file=source))
+        PdfParserProvider().load_pdf_file(parser_obj)
+        return parser_obj
+
+    def test_inputs_parse_like_path(self):
+        results = self.parse(self.path).get_results()
+        sha256 = file_sha256(self.path)
+        for name, source in self.inputs():
+            self.assertEqual(pdf_input_sha256(source), sha256, name)
+            self.assertEqual(self.parse(source).get_results(), results, name)
+
+    def test_inputs_with_result_cache(self):
+        results = self.parse(self.path, result_cache_dir=self.directory).get_results()
+        for name, source in self.inputs():
+            parser_obj = self.parse(source, result_cache_dir=self.directory)
+            self.assertTrue(parser_obj.result_cache_hit, name)
+            self.assertEqual(parser_obj.get_results(), results, name)
+        for name, source in self.inputs():
+            cache_dir = os.path.join(self.directory, name)
+            parser_obj = self.parse(source, result_cache_dir=cache_dir)
+            self.assertFalse(parser_obj.result_cache_hit, name)
+            self.assertEqual(parser_obj.get_results(), results, name)
+
+    def test_path_input_closed(self):
+        path = os.path.realpath(self.path)
+        fds = open_fds()
+        if fds is None:
+            self.skipTest("open files are not listed in /proc")
+        for parser_conf in ({}, {"result_cache_dir": self.directory},
+                            {"layout_cache_dir": self.directory}):
+            self.parse(self.path, **parser_conf)
+            self.assertEqual(open_fds().count(path), fds.count(path), parser_conf)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Batch and page-parallel parsing give the results of the serial parser.
+
+    python -m unittest discover -s tests -t .
+"""
+import json
+import shutil
+import tempfile
+import unittest
+
+from pdf_parser import PdfBatchParser, PdfParser, PdfParserProvider, json_default
+from benchmarks import synthetic
+
+def parse(path, **parser_conf):
+    parser_obj = PdfParser(dict(parser_conf, input_pdf_file=path))
+    PdfParserProvider().load_pdf_file(parser_obj)
+    return results_json(parser_obj.get_results())
+
+def results_json(results):
+    return json.dumps(results, default=json_default, sort_keys=True)
+
+class PageProcessesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_parallel")
+        self.paths = synthetic.generate_corpus(self.directory, [
+            dict(seed=2, charges=12, shareholders=9, officers=9, groups=2),
+            dict(seed=4, charges=30, shareholders=25, officers=25, groups=3, group_members=3)])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_page_processes(self):
+        for path in self.paths:
+            for page_processes in (2, 3):
+                self.assertEqual(parse(path, page_processes=page_processes), parse(path))
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_parallel")
+        self.paths = synthetic.generate_corpus(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_batch_with_page_processes(self):
+        # batch workers cannot start page workers, they parse serially
+        batch_parser = PdfBatchParser({"page_processes": 2, "batch_processes": 2})
+        batch_results = list(batch_parser.parse(self.paths))
+        self.assertEqual([batch_result.error for batch_result in batch_results],
+                         [None] * len(self.paths))
+        for batch_result in batch_results:
+            self.assertEqual(results_json(batch_result.result), parse(batch_result.path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+The page pre-scan only skips pages which cannot add to the results.
+
+    python -m unittest discover -s tests -t .
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from pdf_parser import PdfParser, PdfParserProvider
+from benchmarks import synthetic
+from tests.make_fixtures import fixture_path
+
+def parse(path, **parser_conf):
+    parser_obj = PdfParser(dict(parser_conf, input_pdf_file=path))
+    PdfParserProvider().load_pdf_file(parser_obj)
+    return parser_obj.get_results()
+
+class PrescanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_prescan")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def parse(self, **parser_conf):
+        return parse(fixture_path("group_share", ".pdf"), **parser_conf)
+
+    def test_group_share_continued_on_page_without_anchor(self):
+        results = self.parse()
+        self.assertEqual([record.name for record in results['shareholder_type_details']],
+                         ["MEMBER A1", "MEMBER A2", "MEMBER A3", "MEMBER A4"])
+        for parser_conf in ({"page_prescan": True}, {"page_processes": 2},
+                            {"page_prescan": True, "page_processes": 2}):
+            self.assertEqual(self.parse(**parser_conf), results, parser_conf)
+
+    def test_text_decoded_by_page_fonts(self):
+        # the font shows characters by subset codes, only its ToUnicode
+        # CMap tells the anchors
+        path = os.path.join(self.directory, "subset_font.pdf")
+        synthetic.write_pdf(synthetic.build_pages(seed=2, charges=12, shareholders=9,
+                                                  officers=9, groups=2),
+                            path, code_offset=29)
+        results = parse(path)
+        self.assertEqual([len(results[table]) for table in
+                          ('charges', 'shareholders_details', 'shareholder_type_details',
+                           'officers_details')], [12, 9, 4, 9])
+        for parser_conf in ({"page_prescan": True},
+                            {"page_prescan": True, "page_processes": 2}):
+            self.assertEqual(parse(path, **parser_conf), results, parser_conf)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Profiles of the slowest documents are kept without getting in the way of
+the parse.
+
+    python -m unittest discover -s tests -t .
+"""
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from pdf_parser import PdfParser, PdfParserProvider, ProfileCapture, logger, prune_profiles
+from tests.make_fixtures import fixture_path
+
+class ProfileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_profiles")
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+        shutil.rmtree(self.directory)
+
+    def test_slowest_kept(self):
+        for name in ("group_share", "long_tables", "split_tables"):
+            parser_obj = PdfParser({"input_pdf_file": fixture_path(name, ".pdf"),
+                                    "profile_dir": self.directory, "profile_keep": 2})
+            PdfParserProvider().load_pdf_file(parser_obj)
+        profiles = prune_profiles(self.directory, 2)
+        self.assertEqual([os.path.basename(profile["path"]) for profile in profiles],
+                         ["long_tables.pdf", "split_tables.pdf"])
+        self.assertEqual(len(os.listdir(self.directory)), 4)
+
+    def test_keep_at_least_one(self):
+        self.assertRaises(ValueError, PdfParser, {"profile_dir": self.directory,
+                                                  "profile_keep": 0})
+        profile_capture = ProfileCapture(self.directory, 0)
+        parser_obj = PdfParser({"input_pdf_file": fixture_path("group_share", ".pdf")})
+        self.assertEqual(profile_capture.run(parser_obj, lambda: 42), 42)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_parse_error_not_masked(self):
+        # the SHA-256 of the missing input cannot be computed for the dump
+        parser_obj = PdfParser({"input_pdf_file": os.path.join(self.directory, "missing.pdf")})
+        profile_capture = ProfileCapture(self.directory, 2)
+
+        def fail():
+            raise KeyError("parse error")
+        self.assertRaises(KeyError, profile_capture.run, parser_obj, fail)
+        self.assertEqual(profile_capture.run(parser_obj, lambda: 42), 42)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Parsing a selection of tables and company record fields stops once they
+are parsed.
+
+    python -m unittest discover -s tests -t .
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from pdf_parser import COMPANY_RECORD_FIELD_LABELS, PdfParser, PdfParserProvider
+from benchmarks import synthetic
+
+class SelectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_selection")
+        self.path = os.path.join(self.directory, "document.pdf")
+        pages = synthetic.build_pages(seed=1)
+        # a document without the former name row
+        pages[0] = [box for box in pages[0] if box[2] != "Former Name if any"]
+        synthetic.write_pdf(pages, self.path)
+        self.full = self.parse()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def parse(self, **parser_conf):
+        parser_obj = PdfParser(dict(parser_conf, input_pdf_file=self.path))
+        PdfParserProvider().load_pdf_file(parser_obj)
+        return parser_obj
+
+    def test_missing_label_closed_by_first_table(self):
+        parser_obj = self.parse(fields=["registration_no", "former_name"])
+        self.assertEqual(len(parser_obj.parsed_output_text), 1)
+        self.assertEqual(parser_obj.company_record["registration_no"],
+                         self.full.company_record["registration_no"])
+
+    def test_audit_firm_read_to_the_end(self):
+        fields = [field for field in COMPANY_RECORD_FIELD_LABELS if field != "audit_firm_name"]
+        parser_obj = self.parse(fields=fields)
+        self.assertEqual(len(parser_obj.parsed_output_text), 1)
+        parser_obj = self.parse(tables=["company_record"])
+        self.assertEqual(len(parser_obj.parsed_output_text), len(self.full.parsed_output_text))
+        self.assertEqual(parser_obj.company_record, self.full.company_record)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+The ingestion service refuses uploads over its queue depth, and gives its
+slots and workers back when a document times out or its worker exits.
+
+    python -m unittest discover -s tests -t .
+"""
+import httplib
+import json
+import os
+import signal
+import threading
+import time
+import unittest
+
+from pdf_service import IngestionService
+from tests.make_fixtures import fixture_path
+
+def read_fixture(name):
+    with open(fixture_path(name, ".pdf"), "rb") as f:
+        return f.read()
+
+class ServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.service = IngestionService({"service_port": 0, "service_processes": 1,
+                                         "service_queue_depth": 1, "service_timeout": 30})
+        self.service.start()
+        self.thread = threading.Thread(target=self.service.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.service.server.shutdown()
+        self.service.stop()
+
+    def request(self, method, path, body=None):
+        connection = httplib.HTTPConnection(self.service.host, self.service.port)
+        try:
+            connection.request(method, path, body)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def post_in_thread(self, body):
+        responses = []
+        thread = threading.Thread(target=lambda: responses.append(
+            self.request("POST", "/parse", body)))
+        thread.start()
+        return thread, responses
+
+    def wait_for(self, condition):
+        deadline = time.time() + 10
+        while not condition():
+            self.assertTrue(time.time() < deadline)
+            time.sleep(0.005)
+
+    def test_queue_full(self):
+        thread, responses = self.post_in_thread(read_fixture("long_tables"))
+        self.wait_for(lambda: self.service.health()["queued"] == 1)
+        status, response = self.request("POST", "/parse", read_fixture("group_share"))
+        self.assertEqual(status, 429)
+        thread.join()
+        self.assertEqual(responses[0][0], 200)
+        self.assertEqual(len(responses[0][1]["officers_details"]), 25)
+
+    def test_timeout_kills_worker(self):
+        self.service.timeout = 0.05
+        status, response = self.request("POST", "/parse", read_fixture("long_tables"))
+        self.assertEqual(status, 504)
+        self.service.timeout = 30
+        status, response = self.request("POST", "/parse", read_fixture("group_share"))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(response["shareholder_type_details"]), 4)
+        health = self.request("GET", "/healthz")[1]
+        self.assertEqual((health["status"], health["queued"], health["worker_restarts"]),
+                         ("ok", 0, 1))
+
+    def test_worker_lost(self):
+        thread, responses = self.post_in_thread(read_fixture("long_tables"))
+        self.wait_for(lambda: self.service.workers[0].deadline is not None)
+        os.kill(self.service.workers[0].process.pid, signal.SIGKILL)
+        thread.join()
+        self.assertEqual(responses[0][0], 500)
+        status, response = self.request("POST", "/parse", read_fixture("group_share"))
+        self.assertEqual(status, 200)
+        health = self.request("GET", "/healthz")[1]
+        self.assertEqual((health["status"], health["queued"], health["worker_restarts"]),
+                         ("ok", 0, 1))
+
+    def test_idle_worker_lost(self):
+        worker = self.service.workers[0]
+        os.kill(worker.process.pid, signal.SIGKILL)
+        worker.process.join()
+        health = self.request("GET", "/healthz")[1]
+        self.assertEqual((health["status"], health["workers_lost"]), ("degraded", 1))
+        status, response = self.request("POST", "/parse", read_fixture("group_share"))
+        self.assertEqual(status, 200)
+        health = self.request("GET", "/healthz")[1]
+        self.assertEqual((health["status"], health["worker_restarts"]), ("ok", 1))
+
+if __name__ == '__main__':
+    unittest.main()
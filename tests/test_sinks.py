@@ -0,0 +1,161 @@
+"""
+The output sinks write back the records of the parser.
+
+    python -m unittest discover -s tests -t .
+"""
+import csv
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from collections import defaultdict
+
+from pdf_parser import PAGE_RESULT_TABLES, PdfParser, PdfParserProvider, SqliteSink, \
+    export_pdf_file, json_default, logger, open_sink
+from tests.make_fixtures import fixture_path
+
+TABLES = PAGE_RESULT_TABLES + ('company_record',)
+
+def expected_tables(results):
+    """
+    Records of every table of `results` as JSON would give them back
+    """
+    tables = json.loads(json.dumps(results, default=json_default))
+    tables['company_record'] = [tables['company_record']]
+    return tables
+
+class SinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="test_sinks")
+        self.path = fixture_path("split_tables", ".pdf")
+        parser_obj = PdfParser({"input_pdf_file": self.path})
+        PdfParserProvider().load_pdf_file(parser_obj)
+        self.results = parser_obj.get_results()
+        self.tables = expected_tables(self.results)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def export(self, spec, **output_conf):
+        with open_sink(spec, output_conf) as sink:
+            export_pdf_file(self.path, sink)
+        return sink
+
+class FileSinkTest(SinkTest):
+
+    def test_jsonl(self):
+        path = os.path.join(self.directory, "records.jsonl")
+        self.assertEqual(self.export("jsonl:" + path).records,
+                         sum(len(records) for records in self.tables.itervalues()))
+        tables = defaultdict(list)
+        with open(path) as jsonl_file:
+            for line in jsonl_file:
+                written = json.loads(line)
+                self.assertEqual(written["document"], self.path)
+                tables[written["table"]].append(written["record"])
+        self.assertEqual(dict(tables), self.tables)
+        # datetimes are written as ISO 8601 strings
+        self.assertEqual(tables['charges'][0]['date_registered'],
+                         self.results['charges'][0].date_registered.isoformat())
+
+    def test_csv(self):
+        self.export("csv:" + self.directory)
+        for table in TABLES:
+            with open(os.path.join(self.directory, table + ".csv")) as csv_file:
+                rows = list(csv.reader(csv_file))
+            fields = rows[0][1:]
+            self.assertEqual(rows[0][0], "document")
+            expected = [[self.path] + [u'' if record[field] is None else unicode(record[field])
+                                       for field in fields]
+                        for record in self.tables[table]]
+            self.assertEqual([[value.decode('utf-8') for value in row] for row in rows[1:]],
+                             expected, table)
+        company_record = dict(zip(fields, rows[1][1:]))
+        self.assertEqual(company_record['incorp_date'],
+                         self.results['company_record']['incorp_date'].isoformat())
+
+    def test_columnar_blocks(self):
+        self.export("columnar:" + self.directory, output_block_rows=4)
+        for table in TABLES:
+            with open(os.path.join(self.directory, table + ".columns.jsonl")) as columns_file:
+                blocks = [json.loads(line) for line in columns_file]
+            count = len(self.tables[table])
+            self.assertEqual([block["rows"] for block in blocks],
+                             [4] * (count // 4) + ([count % 4] if count % 4 else []), table)
+            records = []
+            for block in blocks:
+                columns = block["columns"]
+                self.assertEqual(columns.pop("document"), [self.path] * block["rows"])
+                records.extend(dict((field, values[row]) for field, values in columns.items())
+                               for row in range(block["rows"]))
+            self.assertEqual(records, self.tables[table], table)
+
+class SqliteSinkTest(SinkTest):
+
+    def setUp(self):
+        SinkTest.setUp(self)
+        self.database = os.path.join(self.directory, "records.sqlite")
+        self.registration_no = self.results['company_record']['registration_no']
+
+    def counts(self):
+        connection = sqlite3.connect(self.database)
+        try:
+            return dict((table,
+                         connection.execute("SELECT COUNT(*) FROM %s" % table).fetchone()[0])
+                        for table in TABLES)
+        finally:
+            connection.close()
+
+    def test_load(self):
+        self.export("sqlite:" + self.database)
+        self.assertEqual(self.counts(),
+                         dict((table, len(records)) for table, records in self.tables.items()))
+        connection = sqlite3.connect(self.database)
+        company = connection.execute("SELECT document, incorp_date FROM company_record "
+                                     "WHERE registration_no = ?", (self.registration_no,))
+        self.assertEqual(company.fetchone(),
+                         (self.path, self.results['company_record']['incorp_date'].isoformat()))
+        connection.close()
+
+    def test_company_loaded_again_replaces_its_rows(self):
+        self.export("sqlite:" + self.database)
+        results = dict(self.results, officers_details=self.results['officers_details'][:2])
+        with SqliteSink(self.database) as sink:
+            sink.write_results(results, "again.pdf")
+        counts = self.counts()
+        self.assertEqual((counts['company_record'], counts['officers_details']), (1, 2))
+        self.assertEqual(counts['charges'], len(self.results['charges']))
+        # a load failing half way leaves the company as it was
+        connection = sqlite3.connect(self.database)
+        connection.execute("CREATE TRIGGER fail BEFORE INSERT ON shareholders_details "
+                           "BEGIN SELECT RAISE(ABORT, 'load failed'); END")
+        connection.commit()
+        connection.close()
+        sink = SqliteSink(self.database)
+        sink.write_results(dict(results, charges=[]), "failed.pdf")
+        self.assertRaises(sqlite3.IntegrityError, sink.flush)
+        sink.connection.close()
+        self.assertEqual(self.counts(), counts)
+
+    def test_documents_without_registration_no_not_loaded(self):
+        level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        try:
+            with SqliteSink(self.database) as sink:
+                # no company record
+                for table in PAGE_RESULT_TABLES:
+                    for record in self.results[table]:
+                        sink.write(table, record, "partial.pdf")
+                company_record = dict(self.results['company_record'], registration_no='')
+                sink.write_results(dict(self.results, company_record=company_record),
+                                   "unregistered.pdf")
+        finally:
+            logger.setLevel(level)
+        self.assertEqual(self.counts(), dict((table, 0) for table in TABLES))
+
+if __name__ == '__main__':
+    unittest.main()